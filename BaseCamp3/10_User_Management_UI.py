@@ -1,6 +1,10 @@
 import streamlit as st
-import requests
 import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from User_Api_Client import UserApiClient
 
 st.set_option('client.showErrorDetails', False)
 
@@ -26,7 +30,7 @@ token_input = st.sidebar.text_input("Bearer token", type="password", help="Enter
 # ----------------------
 # Action selection
 # ----------------------
-action = st.selectbox("Select action", ["user GET", "user PATCH", "add_user POST"])
+action = st.selectbox("Select action", ["user GET", "user PATCH", "add_user POST", "Browse users"])
 
 # ----------------------
 # Helpers
@@ -37,20 +41,113 @@ def pretty(obj):
     except Exception:
         return str(obj)
 
-def get_headers(require_auth: bool):
-    headers = {"Accept": "application/json"}
-    if require_auth and token_input:
-        headers["Authorization"] = f"Bearer {token_input}"
-    return headers
+# One pooled, retrying client per URL, kept across reruns; each session adds its own token
+@st.cache_resource(max_entries=8)
+def get_client(base_url: str) -> UserApiClient:
+    return UserApiClient(base_url, timeout=10)
 
-def show_response(resp):
-    st.write("Status:", resp.status_code)
-    try:
-        data = resp.json()
-        st.json(data)
-        # st.text_area("Raw response (JSON)", pretty(data), height=240)
-    except Exception:
-        st.text_area("Raw response (text)", str(resp), height=200)
+def show_response(res, cached=False):
+    if res.error:
+        st.error(f"Request failed: {res.error}")
+        return
+    st.write("Status:", res.status_code)
+    if cached:
+        st.caption("served from cache (no API call)")
+    else:
+        st.caption(f"{res.elapsed_ms:.0f} ms, {res.attempts} attempt(s)")
+    if isinstance(res.data, (dict, list)):
+        st.json(res.data)
+        # st.text_area("Raw response (JSON)", pretty(res.data), height=240)
+    else:
+        st.text_area("Raw response (text)", str(res.data), height=200)
+
+client = get_client(BASE_URL).with_token(token_input or None)
+
+# ----------------------
+# GET /user cache (per session, TTL, dropped on PATCH / POST of the same id)
+# ----------------------
+USER_CACHE_TTL = 60      # seconds
+USER_CACHE_SIZE = 500    # user records kept per session
+
+if "user_cache" not in st.session_state:
+    st.session_state.user_cache = OrderedDict()   # user_id -> (stored_at, ApiResult), LRU
+    st.session_state.user_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+def cached_get_user(user_id):
+    """
+    Returns (result, served_from_cache).
+    """
+    cache = st.session_state.user_cache
+    stats = st.session_state.user_cache_stats
+    entry = cache.get(user_id)
+    if entry is not None and time.monotonic() - entry[0] < USER_CACHE_TTL:
+        cache.move_to_end(user_id)
+        stats["hits"] += 1
+        return entry[1], True
+
+    stats["misses"] += 1
+    res = client.get_user(user_id)
+    # cache found users only ("Data not found" is a plain string)
+    if res.ok and isinstance(res.data, dict):
+        cache[user_id] = (time.monotonic(), res)
+        cache.move_to_end(user_id)
+        while len(cache) > USER_CACHE_SIZE:
+            cache.popitem(last=False)
+    else:
+        cache.pop(user_id, None)
+    return res, False
+
+def invalidate_user(user_id):
+    if st.session_state.user_cache.pop(user_id, None) is not None:
+        st.session_state.user_cache_stats["invalidations"] += 1
+    # cached browse pages may hold the old row as well
+    if "browse_pages" in st.session_state:
+        st.session_state.browse_pages.clear()
+
+# ----------------------
+# Browse helpers (bounded page cache + background prefetch)
+# ----------------------
+PAGE_CACHE_SIZE = 20   # pages kept per session
+PAGE_SIZES = [25, 50, 100, 200]
+
+# Shared worker threads for prefetching; they only call the client, never st.*
+@st.cache_resource
+def get_prefetch_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="page-prefetch")
+
+def init_browse_state(reset: bool = False):
+    if reset or "browse_pages" not in st.session_state:
+        st.session_state.browse_pages = OrderedDict()   # (cursor, limit) -> ApiResult, LRU
+        st.session_state.browse_prefetch = {}           # (cursor, limit) -> Future
+        st.session_state.browse_cursors = [None]        # cursor of each visited page
+
+def fetch_page(cursor, limit):
+    """
+    Page from the session cache, else from a finished / running prefetch, else from the API.
+    """
+    key = (cursor, limit)
+    pages = st.session_state.browse_pages
+    if key in pages:
+        pages.move_to_end(key)
+        return pages[key]
+
+    future = st.session_state.browse_prefetch.pop(key, None)
+    res = future.result() if future is not None else client.list_users(cursor, limit)
+    if res.ok:
+        pages[key] = res
+        while len(pages) > PAGE_CACHE_SIZE:
+            pages.popitem(last=False)
+    return res
+
+def prefetch_page(cursor, limit):
+    key = (cursor, limit)
+    prefetch = st.session_state.browse_prefetch
+    if key in st.session_state.browse_pages or key in prefetch:
+        return
+    # keep only the latest prefetch in flight
+    for stale in list(prefetch):
+        prefetch.pop(stale).cancel()
+    prefetch[key] = get_prefetch_pool().submit(client.list_users, cursor, limit)
 
 
 # ----------------------
@@ -60,13 +157,8 @@ if action == "user GET":
     st.subheader("GET /user")
     user_id = st.text_input("user_id", value="")
     if st.button("Fetch user"):
-        params = {"user_id": user_id}
-        try:
-            resp = requests.get(f"{BASE_URL}/user", params=params, headers=get_headers(False), timeout=10)
-            show_response(resp)
-        except requests.RequestException as e:
-            st.error(f"Request failed: {e}")
-            pass
+        res, cached = cached_get_user(user_id)
+        show_response(res, cached=cached)
 
 elif action == "user PATCH":
     st.subheader("PATCH /user")
@@ -93,11 +185,49 @@ elif action == "user PATCH":
         payload = {k : v for k, v in payload.items () if v != ""}
         # print ("After cleaning : \n", payload)
         
-        try:
-            resp = requests.patch(f"{BASE_URL}/user", json=payload, headers=get_headers(require_auth=True), timeout=10)
-            show_response(resp)
-        except requests.RequestException as e:
-            st.error(f"Request failed: {e}")
+        payload.pop("user_id", None)
+        res = client.update_user(user_id, **payload)
+        if res.ok:
+            invalidate_user(user_id)
+        show_response(res)
+
+elif action == "Browse users":
+    st.subheader("GET /users")
+    init_browse_state()
+
+    limit = st.selectbox("Rows per page", PAGE_SIZES, index=1)
+    if st.session_state.get("browse_limit") != limit:
+        st.session_state.browse_limit = limit
+        init_browse_state(reset=True)
+
+    cursors = st.session_state.browse_cursors
+    col_first, col_prev, col_next = st.columns(3)
+    go_first = col_first.button("⏮ First")
+    go_prev = col_prev.button("◀ Prev", disabled=len(cursors) <= 1)
+    go_next = col_next.button("Next ▶")
+
+    if go_first:
+        del cursors[1:]
+    elif go_prev and len(cursors) > 1:
+        cursors.pop()
+
+    res = fetch_page(cursors[-1], limit)
+    if go_next and res.ok and res.data.get("next_cursor"):
+        cursors.append(res.data["next_cursor"])
+        res = fetch_page(cursors[-1], limit)
+
+    if not res.ok:
+        show_response(res)
+    else:
+        page = res.data
+        start = (len(cursors) - 1) * limit
+        st.caption(f"Page {len(cursors)} · rows {start + 1}–{start + len(page['users'])} "
+                   f"of {page['total']} · {res.elapsed_ms:.0f} ms")
+        # only the current page is handed to the table
+        st.dataframe(page["users"], width="stretch", hide_index=True)
+
+        if page.get("next_cursor"):
+            prefetch_page(page["next_cursor"], limit)
 
 else:  # add_user POST
     st.subheader("POST /add_user")
@@ -116,11 +246,27 @@ else:  # add_user POST
             "phone_number": phone_number,
             "email": email,
         }
-        try:
-            resp = requests.post(f"{BASE_URL}/add_user", json=payload, headers=get_headers(require_auth=True), timeout=10)
-            show_response(resp)
-        except requests.RequestException as e:
-            st.error(f"Request failed: {e}")
+        res = client.add_user(payload)
+        if res.ok and isinstance(res.data, dict) and res.data.get("user_id"):
+            invalidate_user(res.data["user_id"])
+        show_response(res)
+
+# ----------------------
+# Cache stats (rendered last, so they include this run)
+# ----------------------
+with st.sidebar:
+    st.markdown("---")
+    st.subheader("GET cache")
+    stats = st.session_state.user_cache_stats
+    lookups = stats["hits"] + stats["misses"]
+    col_hit, col_miss = st.columns(2)
+    col_hit.metric("Hits", stats["hits"])
+    col_miss.metric("Misses", stats["misses"])
+    hit_rate = f"{stats['hits'] / lookups:.0%}" if lookups else "-"
+    st.caption(f"Hit rate {hit_rate} · {len(st.session_state.user_cache)} cached · "
+               f"{stats['invalidations']} invalidated · TTL {USER_CACHE_TTL}s")
+    if st.button("Clear cache"):
+        st.session_state.user_cache.clear()
 
 # ----------------------
 # Footer
@@ -0,0 +1,113 @@
+"""
+Round-trip cost: one-off requests calls vs the pooled User_Api_Client
+
+Starts FastAPI_App with uvicorn in a separate process and issues the same
+GET /user calls three ways:
+  1. requests.get per call (new TCP connection each time, as the UIs used to do)
+  2. UserApiClient (sync, keep-alive pool)
+  3. AsyncUserApiClient.get_users (batch, bounded concurrency)
+
+Example:
+    python 10a_Client_Benchmark.py --calls 500
+    python 10a_Client_Benchmark.py --url http://127.0.0.1:5603   # use a running app
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+from User_Api_Client import UserApiClient, AsyncUserApiClient
+
+
+def start_app(port: int) -> subprocess.Popen:
+    app_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "FastAPI_App")
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app",
+                             "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+                            cwd=app_dir)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/readyz", timeout=1).status_code == 200:
+                return proc
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("app did not become ready")
+
+
+def summarize(name: str, per_call_ms, wall_s: float) -> str:
+    per_call_ms = sorted(per_call_ms)
+    p95 = per_call_ms[int(0.95 * (len(per_call_ms) - 1))]
+    return (f"{name:<28}{len(per_call_ms):>7}{wall_s:>9.2f}"
+            f"{statistics.mean(per_call_ms):>10.2f}{statistics.median(per_call_ms):>10.2f}{p95:>10.2f}")
+
+
+def bench_requests(url: str, user_ids):
+    times = []
+    t0 = time.perf_counter()
+    for uid in user_ids:
+        t = time.perf_counter()
+        requests.get(f"{url}/user", params={"user_id": uid}, timeout=10)
+        times.append((time.perf_counter() - t) * 1000)
+    return times, time.perf_counter() - t0
+
+
+def bench_pooled(url: str, user_ids):
+    times = []
+    with UserApiClient(url) as client:
+        client.get_user(user_ids[0])  # open the connection once
+        t0 = time.perf_counter()
+        for uid in user_ids:
+            times.append(client.get_user(uid).elapsed_ms)
+        return times, time.perf_counter() - t0
+
+
+def bench_async_batch(url: str, user_ids, concurrency: int):
+    async def run():
+        async with AsyncUserApiClient(url, pool_size=concurrency) as client:
+            await client.get_user(user_ids[0])
+            t0 = time.perf_counter()
+            results = await client.get_users(user_ids, concurrency=concurrency)
+            return [r.elapsed_ms for r in results], time.perf_counter() - t0
+
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="User API client round-trip benchmark")
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16, help="for the async batch run")
+    parser.add_argument("--url", default=None, help="use an already running app instead of starting one")
+    parser.add_argument("--port", type=int, default=5660)
+    args = parser.parse_args()
+
+    proc = None
+    url = args.url
+    if url is None:
+        proc = start_app(args.port)
+        url = f"http://127.0.0.1:{args.port}"
+
+    user_ids = [f"U_{(i % 200) + 1:04d}" for i in range(args.calls)]
+    try:
+        rows = [
+            summarize("requests.get per call", *bench_requests(url, user_ids)),
+            summarize("UserApiClient (pooled)", *bench_pooled(url, user_ids)),
+            summarize(f"Async batch (x{args.concurrency})",
+                      *bench_async_batch(url, user_ids, args.concurrency)),
+        ]
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    header = f"{'client':<28}{'calls':>7}{'wall s':>9}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(row)
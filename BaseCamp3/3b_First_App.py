@@ -1,10 +1,46 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query
 import uvicorn
+import asyncio
+import random
 import time
+import os
 from datetime import datetime
 
 app = FastAPI()
 
+# Simulated latency settings for /test_async (overridable per request)
+LATENCY_DIST = os.environ.get("LATENCY_DIST", "fixed")
+LATENCY_SECONDS = float(os.environ.get("LATENCY_SECONDS", 5))
+LATENCY_SPREAD = float(os.environ.get("LATENCY_SPREAD", 1))
+MAX_DELAY_SECONDS = 300             # longest delay a request may ask for (and sampled delays are capped at)
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "exponential", "lognormal")
+
+
+def sample_latency(dist: str, seconds: float, spread: float) -> float:
+    """
+    Draw one delay (in seconds) from the chosen distribution.
+    fixed       : always `seconds`
+    uniform     : seconds +/- spread
+    normal      : mean `seconds`, std dev `spread`
+    exponential : mean `seconds`
+    lognormal   : median `seconds`, shape (sigma) `spread` - long tail
+    """
+    if dist == "fixed":
+        delay = seconds
+    elif dist == "uniform":
+        delay = random.uniform(seconds - spread, seconds + spread)
+    elif dist == "normal":
+        delay = random.gauss(seconds, spread)
+    elif dist == "exponential":
+        delay = random.expovariate(1 / seconds) if seconds > 0 else 0.0
+    elif dist == "lognormal":
+        delay = seconds * random.lognormvariate(0, spread)
+    else:
+        raise ValueError(f"dist must be one of {LATENCY_DISTRIBUTIONS}")
+    return min(max(0.0, delay), MAX_DELAY_SECONDS)
+
+
 # End Point definition with a GET method
 @app.get("/welcome")
 def welcome (name : str):
@@ -18,12 +54,33 @@ def welcome (name : str):
 # End Point definition with a GET method
 # This function simulates a delay
 @app.get("/test")
-def test ():
+def test (seconds : float = Query(5, ge=0, le=MAX_DELAY_SECONDS)):
     """
     Simulates a delay and return a string
+    The sleep holds one threadpool thread for the whole delay.
     """
     st = datetime.now ()
-    time.sleep (5)
+    time.sleep (seconds)
+    en = datetime.now ()
+
+    return "Entry : "+str(st)+" | Exit : "+str(en)
+
+# Async version of the delay end point
+# The wait is an event loop timer, so no thread is held while waiting
+@app.get("/test_async")
+async def test_async (dist : str = LATENCY_DIST,
+                      seconds : float = Query(LATENCY_SECONDS, ge=0, le=MAX_DELAY_SECONDS),
+                      spread : float = Query(LATENCY_SPREAD, ge=0, le=MAX_DELAY_SECONDS)):
+    """
+    Simulates a delay drawn from a latency distribution and return a string
+    """
+    try:
+        delay = sample_latency(dist, seconds, spread)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    st = datetime.now ()
+    await asyncio.sleep (delay)
     en = datetime.now ()
 
     return "Entry : "+str(st)+" | Exit : "+str(en)
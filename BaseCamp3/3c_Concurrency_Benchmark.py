@@ -0,0 +1,179 @@
+"""
+Concurrency benchmark for the delay end points of 3b_First_App.py
+
+Starts the app with uvicorn in a separate process, fires N concurrent
+requests at the sync /test and the async /test_async end points and reports
+for each: total completion time, latency percentiles, peak server threads
+and peak server RSS.
+
+Example:
+    python 3c_Concurrency_Benchmark.py --requests 1000 --seconds 1
+    python 3c_Concurrency_Benchmark.py --requests 10000 --seconds 2 --endpoints test_async
+
+Note: 10k open connections need a high open-file limit (ulimit -n 20000).
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+
+try:
+    import psutil
+except ImportError:  # fall back to /proc on Linux
+    psutil = None
+
+
+# -------------------------
+# Server process helpers
+# -------------------------
+def start_server(port: int) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "uvicorn", "3b_First_App:app",
+           "--host", "127.0.0.1", "--port", str(port),
+           "--backlog", "16384", "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    # wait until the app answers
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/welcome", params={"name": "bench"}, timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+def process_stats(pid: int):
+    """
+    (thread count, RSS bytes) of the server process.
+    """
+    if psutil is not None:
+        p = psutil.Process(pid)
+        return p.num_threads(), p.memory_info().rss
+
+    threads, rss = 0, 0
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("Threads:"):
+                threads = int(line.split()[1])
+            elif line.startswith("VmRSS:"):
+                rss = int(line.split()[1]) * 1024
+    return threads, rss
+
+
+class PeakSampler(threading.Thread):
+    """
+    Samples server threads / RSS in the background and keeps the peak values.
+    """
+
+    def __init__(self, pid: int, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_threads = 0
+        self.peak_rss = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            threads, rss = process_stats(self.pid)
+            self.peak_threads = max(self.peak_threads, threads)
+            self.peak_rss = max(self.peak_rss, rss)
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# -------------------------
+# Load generator
+# -------------------------
+async def fire(url: str, n: int, params: dict, timeout: float):
+    """
+    Send n requests at once; return (wall time, sorted latencies, error count).
+    """
+    limits = httpx.Limits(max_connections=n, max_keepalive_connections=n)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+
+        async def one():
+            t0 = time.perf_counter()
+            try:
+                r = await client.get(url, params=params)
+                ok = r.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            return time.perf_counter() - t0, ok
+
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(n)))
+        wall = time.perf_counter() - t0
+
+    latencies = sorted(lat for lat, ok in results if ok)
+    errors = sum(1 for _, ok in results if not ok)
+    return wall, latencies, errors
+
+
+def percentile(values, q: float) -> float:
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_endpoint(port: int, endpoint: str, n: int, seconds: float, timeout: float):
+    params = {"seconds": seconds}
+    if endpoint == "test_async":
+        params["dist"] = "fixed"
+
+    proc = start_server(port)
+    try:
+        idle_threads, idle_rss = process_stats(proc.pid)
+        sampler = PeakSampler(proc.pid)
+        sampler.start()
+        wall, latencies, errors = asyncio.run(
+            fire(f"http://127.0.0.1:{port}/{endpoint}", n, params, timeout))
+        sampler.stop()
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    return {
+        "endpoint": "/" + endpoint,
+        "requests": n,
+        "errors": errors,
+        "wall_s": wall,
+        "p50_s": percentile(latencies, 0.50),
+        "p99_s": percentile(latencies, 0.99),
+        "threads": f"{idle_threads} -> {sampler.peak_threads}",
+        "rss_mb": f"{idle_rss / 2**20:.0f} -> {sampler.peak_rss / 2**20:.0f}",
+    }
+
+
+# -------------------------
+# Main
+# -------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync vs async delay end point benchmark")
+    parser.add_argument("--requests", type=int, default=1000, help="concurrent requests per run")
+    parser.add_argument("--seconds", type=float, default=1.0, help="simulated delay per request")
+    parser.add_argument("--endpoints", nargs="+", default=["test", "test_async"],
+                        choices=["test", "test_async"])
+    parser.add_argument("--port", type=int, default=5650)
+    parser.add_argument("--timeout", type=float, default=600.0, help="client timeout per request")
+    args = parser.parse_args()
+
+    rows = [run_endpoint(args.port, ep, args.requests, args.seconds, args.timeout)
+            for ep in args.endpoints]
+
+    header = f"{'endpoint':<12}{'requests':>9}{'errors':>8}{'wall s':>9}{'p50 s':>8}{'p99 s':>8}{'threads':>12}{'RSS MB':>12}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(f"{r['endpoint']:<12}{r['requests']:>9}{r['errors']:>8}{r['wall_s']:>9.2f}"
+              f"{r['p50_s']:>8.2f}{r['p99_s']:>8.2f}{r['threads']:>12}{r['rss_mb']:>12}")
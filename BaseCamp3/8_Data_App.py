@@ -1,24 +1,75 @@
-import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import streamlit as st
 
-# ---------- Data Loading ----------
-@st.cache_data
-def load_data(csv_path: str = "index.csv") -> pd.DataFrame:
-    df = pd.read_csv(csv_path, parse_dates=["Date"])
-    df = df.sort_values("Date").reset_index(drop=True)
-    return df
+from Chart_Decimation import POINTS_PER_PIXEL, cached_decimation, decimate_surface, lttb_indices
+from Index_Store import get_index_store
+from Live_Index import LiveSeries
+
+SEED_CSV = "index.csv"      # loaded into an empty store on first run
+TAIL_ROWS = 15              # newest bars shown in the live panel
+CHART_WIDTHS = [600, 900, 1200, 1800, 2400]     # px; the browser width is not sent to the server
+
 
-df = load_data()
+# ---------- Data Loading ----------
+# Data lives in a per-symbol store (Index_Store): only the symbols picked in the
+# sidebar are read, and at most max_entries of them stay in memory.
+# cache_resource: one shared LiveSeries per symbol, not a pickled copy per rerun.
+# It computes Day_Trend and returns once for the history, then only for new bars
+# (appended with `python Live_Index.py append|simulate ...`).
+@st.cache_resource(max_entries=8)
+def load_data(symbol: str) -> LiveSeries:
+    return LiveSeries(symbol, get_index_store())
+
+
+def date_bounds(index: pd.DatetimeIndex, start_date, end_date) -> tuple:
+    """
+    Positions [lo, hi) of the rows with start_date <= date <= end_date: two
+    binary searches on the sorted DatetimeIndex (O(log n)). end_date=None: to the end.
+    """
+    lo = index.searchsorted(pd.Timestamp(start_date), side="left")
+    if end_date is None:
+        return int(lo), len(index)
+    hi = index.searchsorted(pd.Timestamp(end_date) + pd.Timedelta(days=1), side="left")
+    return int(lo), int(hi)
+
+
+store = get_index_store()
+if not store.exists():
+    store.ingest_csv(SEED_CSV)
 
 st.title("Index Data anlysis")
 
 # ---------- Sidebar Controls ----------
 st.sidebar.header("Controls")
 
-min_date = df["Date"].min().date()
-max_date = df["Date"].max().date()
+# Symbol list comes from the manifest alone; no data file is opened for it
+symbol = st.sidebar.selectbox("Symbol", store.symbols())
+symbol_info = store.info(symbol)
+st.sidebar.caption(f"{symbol_info['rows']} rows · {symbol_info['start'][:10]} .. "
+                   f"{symbol_info['end'][:10]} · {len(store.symbols())} symbols in store")
+
+# Live updates: new bars in the store are picked up by the panels below on a timer,
+# without rerunning the whole page
+live_updates = st.sidebar.toggle("Live updates", value=False,
+                                 help="Poll the store for new bars and refresh the latest-bars "
+                                      "table and the surface")
+refresh_s = st.sidebar.number_input("Refresh every (s)", min_value=1, max_value=300, value=5,
+                                    disabled=not live_updates)
+run_every = refresh_s if live_updates else None
+
+# Charts get about one point per pixel (Chart_Decimation): the selected date range is
+# the zoom level, this is the resolution. Decimated series are cached per (range, width).
+chart_width = st.sidebar.selectbox("Chart width (px)", CHART_WIDTHS, index=2,
+                                   help="Points sent to the charts are bounded by this width")
+
+live = load_data(symbol)
+live.refresh()
+df = live.frame()       # views over the live buffers - read-only
+
+# Sorted index: first and last row are the bounds
+min_date = df.index[0].date()
+max_date = df.index[-1].date()
 
 # Date range selection
 date_range = st.sidebar.date_input(
@@ -44,9 +95,11 @@ else:
 if start_date > end_date:
     start_date, end_date = end_date, start_date
 
-# Range mask (for Tab 1 & 2 views)
-mask = (df["Date"].dt.date >= start_date) & (df["Date"].dt.date <= end_date)
-df_range = df.loc[mask].copy()
+# Range slice (for Tab 1 view): a positional slice, no copy
+range_lo, range_hi = date_bounds(df.index, start_date, end_date)
+df_range = df.iloc[range_lo:range_hi]
+# A range ending on the last bar follows the live tail
+follow_tail = end_date == max_date
 
 # ---------- Tabs ----------
 tab1, tab2 = st.tabs(
@@ -62,88 +115,103 @@ with tab1:
     if df_range.empty:
         st.warning("No data available for the selected date range.")
     else:
-        # 0.25% threshold:
-        # Green: Close >= Open * (1 + 0.0025)
-        # Red  : Close <= Open * (1 - 0.0025)
-        # Amber: otherwise
-        threshold = 0.0025  # 0.25%
-
-        up_level = df_range["Open"] * (1 + threshold)
-        down_level = df_range["Open"] * (1 - threshold)
-
-        is_green = df_range["Close"] >= up_level
-        is_red = df_range["Close"] <= down_level
-
-        conditions = [
-            is_green,
-            is_red,
-        ]
-        choices_text = ["Green", "Red"]
-        candle_text = np.select(conditions, choices_text, default="Amber")
-
-        # Circle indicators: 🟢, 🔴, 🟡
-        choices_circle = ["🟢", "🔴"]
-        candle_circle = np.select(conditions, choices_circle, default="🟡")
-
-        df_range["Day_Trend"] = candle_circle
-        df_range["Day_Trend_Text"] = candle_text
-
+        # Day_Trend was computed when the bars were loaded (Live_Index.trend_codes)
         st.markdown(
             "- **🟢 Green**: Close ≥ Open × (1 + 0.25%)  \n"
             "- **🔴 Red**: Close ≤ Open × (1 − 0.25%)  \n"
             "- **🟡 Amber**: Within ±0.25% of Open"
         )
-        
-        # Reorder columns 
-        df_range['Date_Str'] = df_range['Date'].dt.strftime ("%d-%b-%y")
-        cols_order = ["Date_Str", "Open", "High", "Low", "Close", "Day_Trend"]
-        # other_cols = [c for c in df_range.columns if c not in cols_order]
+
+        # Close price, LTTB-decimated to the chart width: the line keeps its shape
+        # (peaks, troughs) with at most chart_width points whatever the range length
+        keep = cached_decimation(
+            (symbol, live.base_version, range_lo, range_hi, chart_width, "lttb"),
+            lambda: lttb_indices(df_range.index.asi8, df_range["Close"].to_numpy(), chart_width),
+        )
+        fig_close = go.Figure(go.Scattergl(x=df_range.index[keep],
+                                           y=df_range["Close"].to_numpy()[keep], mode="lines"))
+        fig_close.update_layout(yaxis_title="Close", margin=dict(l=0, r=0, b=0, t=30))
+        st.plotly_chart(fig_close, width="stretch")
+        st.caption(f"{len(keep):,} of {len(df_range):,} bars plotted")
+
+        # Reorder columns; the date index is formatted by the table, not per row in Python
+        cols_order = ["Open", "High", "Low", "Close", "Day_Trend"]
         display_df = df_range[cols_order]
 
-        st.dataframe(display_df, width="stretch")
+        st.dataframe(
+            display_df,
+            width="stretch",
+            column_config={"_index": st.column_config.DatetimeColumn("Date", format="DD-MMM-YY")},
+        )
+
+    # Newest bars: this fragment alone reruns on the timer
+    @st.fragment(run_every=run_every)
+    def latest_bars():
+        added = live.refresh()
+        tail = live.frame().iloc[-TAIL_ROWS:]
+        st.markdown(f"**Latest bars** · last {live.last_bar():%d-%b-%y}"
+                    + (f" · {added} new" if added else ""))
+        st.dataframe(
+            tail[["Open", "High", "Low", "Close", "Day_Trend"]],
+            width="stretch",
+            column_config={"_index": st.column_config.DatetimeColumn("Date", format="DD-MMM-YY")},
+        )
 
+    latest_bars()
 
 
 # =========================================================
-# TAB 2: Rolling Volatility Surface (entire data range)
+# TAB 2: Rolling Volatility Surface (selected date range)
 # =========================================================
 with tab2:
-    st.subheader("Rolling Volatility Surface (for Close Price)")
-
-    # Compute returns from Close
-    returns = df["Close"].pct_change()
-
-    # Choose a set of windows for the surface
-    vol_windows = [5, 10, 20, 30, 60]
-
-    vol_matrix = []
-    for w in vol_windows:
-        # Rolling std; scaled to annualized volatility (approx 250 trading days)
-        vol = returns.rolling(w).std() * np.sqrt(250)
-        vol_matrix.append(vol.values)
-
-    z = np.array(vol_matrix)  # shape: (len(vol_windows), len(df))
-
-    # X-axis: dates, Y-axis: window sizes
-    x = df["Date"]
-    y = vol_windows
-
-    surface = go.Surface(
-        z=z,
-        x=x,
-        y=y,
-        colorscale="Viridis",
-        colorbar=dict(title="Volatility"),
-    )
-
-    fig_vol = go.Figure(data=[surface])
-    fig_vol.update_layout(
-        scene=dict(
-            xaxis_title="Date",
-            yaxis_title="Window (days)",
-            zaxis_title="Rolling Volatility (annualized)",
-        ),
-        margin=dict(l=0, r=0, b=0, t=30),
-    )
-
-    st.plotly_chart(fig_vol, width='stretch')
\ No newline at end of file
+    st.subheader(f"Rolling Volatility Surface (for {symbol} Close Price)")
+
+    # Choose a set of windows for the surface (any range, e.g. 2..250 step 1)
+    w_col1, w_col2 = st.columns([3, 1])
+    w_min, w_max = w_col1.slider("Windows (days)", min_value=2, max_value=250, value=(5, 60))
+    w_step = w_col2.number_input("Step", min_value=1, max_value=50, value=5)
+    vol_windows = list(range(w_min, w_max + 1, w_step))
+
+    # The chart is a fragment too: on the timer only it reruns, with the new columns
+    @st.fragment(run_every=run_every)
+    def vol_surface(vol_windows: list):
+        live.refresh()
+        # Rolling std for all windows, annualized (approx 250 trading days): computed in
+        # one pass for the history on first use, then O(windows) per new bar (LiveSeries)
+        z = live.surface(vol_windows)  # shape: (len(vol_windows), rows)
+        dates = live.frame().index
+
+        # Zoom to the date range, then min/max per pixel bucket along the dates: every
+        # spike of every window row survives, in at most chart_width columns
+        lo, hi = date_bounds(dates, start_date, None if follow_tail else end_date)
+        cols, z_plot = cached_decimation(
+            (symbol, live.base_version, tuple(vol_windows), lo, hi, chart_width, "minmax"),
+            lambda: decimate_surface(z[:, lo:hi], chart_width // POINTS_PER_PIXEL),
+        )
+
+        # X-axis: dates, Y-axis: window sizes
+        x = dates[lo:hi][cols]
+        y = vol_windows
+
+        surface = go.Surface(
+            z=z_plot,
+            x=x,
+            y=y,
+            colorscale="Viridis",
+            colorbar=dict(title="Volatility"),
+        )
+
+        fig_vol = go.Figure(data=[surface])
+        fig_vol.update_layout(
+            scene=dict(
+                xaxis_title="Date",
+                yaxis_title="Window (days)",
+                zaxis_title="Rolling Volatility (annualized)",
+            ),
+            margin=dict(l=0, r=0, b=0, t=30),
+        )
+
+        st.plotly_chart(fig_vol, width='stretch')
+        st.caption(f"{len(cols):,} of {hi - lo:,} dates plotted · {len(vol_windows)} windows")
+
+    vol_surface(vol_windows)
\ No newline at end of file
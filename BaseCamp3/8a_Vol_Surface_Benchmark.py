@@ -0,0 +1,65 @@
+"""
+Volatility surface: pandas rolling().std() per window vs Vol_Engine
+
+Builds a synthetic daily close series of --rows bars (or uses index.csv with
+--csv), computes the annualized rolling volatility for every window in
+--windows both ways and reports time, the largest difference to pandas and
+the cost of a cache hit.
+
+Example:
+    python 8a_Vol_Surface_Benchmark.py --rows 100000 --windows 2:250
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from Vol_Engine import TRADING_DAYS, cached_vol_surface, pct_returns, rolling_vol_surface
+
+
+def parse_windows(text: str) -> list:
+    # "2:250" (every window), "5:60:5" (with step) or "5,10,20"
+    if ":" in text:
+        parts = [int(p) for p in text.split(":")]
+        return list(range(parts[0], parts[1] + 1, parts[2] if len(parts) > 2 else 1))
+    return [int(p) for p in text.split(",")]
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling volatility surface benchmark")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--windows", default="2:250")
+    parser.add_argument("--csv", help="use the Close column of this file instead of synthetic data")
+    args = parser.parse_args()
+
+    if args.csv:
+        close = pd.read_csv(args.csv)["Close"].to_numpy()[::-1]
+    else:
+        rng = np.random.default_rng(0)
+        close = 10000 * np.exp(np.cumsum(rng.normal(0, 0.01, args.rows)))
+    windows = parse_windows(args.windows)
+    returns = pd.Series(close).pct_change()
+
+    ref, t_pandas = timed(lambda: np.array(
+        [(returns.rolling(w).std() * np.sqrt(TRADING_DAYS)).values for w in windows]))
+    z, t_engine = timed(lambda: rolling_vol_surface(pct_returns(close), windows))
+
+    same_nan = np.array_equal(np.isnan(ref), np.isnan(z))
+    valid = ~np.isnan(ref)
+    max_abs = float(np.abs(z[valid] - ref[valid]).max()) if valid.any() else 0.0
+
+    _, t_miss = timed(lambda: cached_vol_surface(pct_returns(close), windows))
+    _, t_hit = timed(lambda: cached_vol_surface(pct_returns(close), windows))
+
+    print(f"surface      {len(windows)} windows x {len(close)} rows")
+    print(f"pandas       {t_pandas:.3f}s  (rolling().std() per window)")
+    print(f"Vol_Engine   {t_engine:.3f}s  ({t_pandas / t_engine:.1f}x)")
+    print(f"difference   max abs {max_abs:.2e} · NaN pattern {'identical' if same_nan else 'DIFFERENT'}")
+    print(f"cache        miss {t_miss * 1000:.1f} ms · hit {t_hit * 1000:.2f} ms")
@@ -0,0 +1,88 @@
+"""
+Index_Store vs one big CSV as the symbol universe grows
+
+Writes a synthetic universe of --symbols symbols x --rows daily bars, once
+as a single long CSV (what load_data used to read) and once into an
+Index_Store, then measures for each layout:
+  - time to list the symbols
+  - time and memory to get one symbol's bars
+
+Example:
+    python 8b_Index_Store_Benchmark.py --symbols 500 --rows 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from Index_Store import DATE_FORMAT, IndexStore
+
+
+def universe(n_symbols: int, n_rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end="2025-11-28", periods=n_rows)
+    parts = []
+    for i in range(n_symbols):
+        close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, n_rows)))
+        open_ = close * (1 + rng.normal(0, 0.003, n_rows))
+        parts.append(pd.DataFrame({
+            "Index Name": f"SYM {i:05d}", "Date": dates,
+            "Open": open_, "High": np.maximum(open_, close) * 1.002,
+            "Low": np.minimum(open_, close) * 0.998, "Close": close,
+        }))
+    return pd.concat(parts, ignore_index=True)
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-symbol store benchmark")
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    df = universe(args.symbols, args.rows)
+    pick = f"SYM {args.symbols // 2:05d}"
+    with tempfile.TemporaryDirectory() as folder:
+        csv_path = os.path.join(folder, "universe.csv")
+        df.assign(Date=df["Date"].dt.strftime(DATE_FORMAT)).to_csv(csv_path, index=False)
+        store = IndexStore(os.path.join(folder, "store"))
+        _, t_ingest, _ = measure(lambda: store.ingest_csv(csv_path))
+        del df
+
+        def csv_symbols():
+            return sorted(pd.read_csv(csv_path, usecols=["Index Name"])["Index Name"].unique())
+
+        def csv_one():
+            full = pd.read_csv(csv_path)
+            part = full[full["Index Name"] == pick].copy()
+            part["Date"] = pd.to_datetime(part["Date"], format=DATE_FORMAT)
+            return part.set_index("Date")
+
+        cold = IndexStore(store.root)       # nothing cached yet, as at app start
+        rows = [
+            ("list symbols", measure(csv_symbols), measure(cold.symbols)),
+            ("load 1 symbol", measure(csv_one), measure(lambda: cold.load(pick))),
+        ]
+        store_mb = sum(e.stat().st_size for e in os.scandir(store.root)) / 1024 / 1024
+        csv_mb = os.path.getsize(csv_path) / 1024 / 1024
+
+    print(f"universe     {args.symbols} symbols x {args.rows} rows · CSV {csv_mb:.1f} MB · "
+          f"store {store_mb:.1f} MB (ingest {t_ingest:.1f}s)")
+    header = f"{'':<15}{'CSV s':>9}{'CSV MB':>9}{'store s':>10}{'store MB':>10}"
+    print("\n" + header)
+    print("-" * len(header))
+    for name, (_, t_csv, m_csv), (_, t_store, m_store) in rows:
+        print(f"{name:<15}{t_csv:>9.3f}{m_csv:>9.1f}{t_store:>10.4f}{m_store:>10.2f}")
@@ -0,0 +1,100 @@
+"""
+Live tail ingestion: incremental refresh vs recomputing everything per bar
+
+Stores --rows bars of synthetic history for one symbol, opens a LiveSeries
+with a volatility surface over --windows, then appends --bars new bars one
+at a time. For each bar it times:
+  - Index_Store.append (segment write + manifest)
+  - LiveSeries.refresh (read the tail, returns, trend, O(windows) surface update)
+  - the old way: reload the symbol and recompute the whole surface
+and checks the final live surface against a full recompute.
+
+Example:
+    python 8c_Live_Tail_Benchmark.py --rows 100000 --bars 200 --windows 2:250
+"""
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from Index_Store import IndexStore
+from Live_Index import LiveSeries
+from Vol_Engine import pct_returns, rolling_vol_surface
+
+
+def parse_windows(text: str) -> list:
+    parts = [int(p) for p in text.split(":")]
+    return list(range(parts[0], parts[1] + 1, parts[2] if len(parts) > 2 else 1))
+
+
+def bars(start: pd.Timestamp, count: int, close: float, rng) -> pd.DataFrame:
+    dates = pd.bdate_range(start=start, periods=count)
+    closes = close * np.exp(np.cumsum(rng.normal(0, 0.01, count)))
+    opens = closes * (1 + rng.normal(0, 0.003, count))
+    return pd.DataFrame({"Date": dates, "Open": opens, "High": np.maximum(opens, closes) * 1.002,
+                         "Low": np.minimum(opens, closes) * 0.998, "Close": closes})
+
+
+def ms(values: list) -> str:
+    values = sorted(values)
+    return (f"p50 {statistics.median(values) * 1000:8.2f} ms · "
+            f"p95 {values[int(0.95 * (len(values) - 1))] * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Live tail ingestion benchmark")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--bars", type=int, default=200)
+    parser.add_argument("--windows", default="2:250")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    windows = parse_windows(args.windows)
+    with tempfile.TemporaryDirectory() as folder:
+        store = IndexStore(folder)
+        history = bars(pd.Timestamp("1900-01-01"), args.rows, 1000.0, rng)
+        store.write_symbol("SYM", history)
+
+        live = LiveSeries("SYM", store)
+        t0 = time.perf_counter()
+        live.surface(windows)
+        t_first = time.perf_counter() - t0
+
+        t_append, t_refresh, t_full = [], [], []
+        last_date, last_close = history["Date"].iloc[-1], history["Close"].iloc[-1]
+        for _ in range(args.bars):
+            bar = bars(last_date + pd.offsets.BDay(1), 1, last_close, rng)
+            last_date, last_close = bar["Date"].iloc[0], bar["Close"].iloc[0]
+
+            t0 = time.perf_counter()
+            store.append("SYM", bar)
+            t_append.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            live.refresh()
+            live.surface(windows)
+            t_refresh.append(time.perf_counter() - t0)
+
+            if len(t_full) < 5:     # a few samples are enough: it does not depend on the bar
+                t0 = time.perf_counter()
+                full = store.load("SYM")
+                ref = rolling_vol_surface(pct_returns(full["Close"].to_numpy()), windows)
+                t_full.append(time.perf_counter() - t0)
+
+        full = store.load("SYM")
+        ref = rolling_vol_surface(pct_returns(full["Close"].to_numpy()), windows)
+        z = live.surface(windows)
+        valid = ~np.isnan(ref)
+        max_abs = float(np.abs(z[valid] - ref[valid]).max())
+        same_nan = np.array_equal(np.isnan(z), np.isnan(ref))
+
+    print(f"history      {args.rows} bars · {len(windows)} windows · {args.bars} bars appended")
+    print(f"first surface {t_first:.2f}s (whole history, once)")
+    print(f"append       {ms(t_append)}")
+    print(f"refresh      {ms(t_refresh)}  (tail read + O(windows) update)")
+    print(f"full reload  {ms(t_full)}  (load + recompute, the old way)")
+    print(f"check        max abs vs full recompute {max_abs:.2e} · NaN pattern "
+          f"{'identical' if same_nan else 'DIFFERENT'}")
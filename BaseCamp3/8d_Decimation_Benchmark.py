@@ -0,0 +1,83 @@
+"""
+Chart decimation: points sent to the browser for a long series and a surface
+
+Builds --rows bars of synthetic prices with a few one-day spikes, the
+volatility surface over --windows, and for each chart width measures:
+  - figure JSON size and build time, full vs decimated
+  - decimation time (first call, then cached)
+  - shape checks: the spikes are still plotted, and each surface row keeps
+    its min and max
+
+Example:
+    python 8d_Decimation_Benchmark.py --rows 200000 --windows 5:60:5 --widths 600,1200,2400
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from Chart_Decimation import (POINTS_PER_PIXEL, cached_decimation, decimate_surface,
+                              lttb_indices, minmax_indices)
+from Vol_Engine import pct_returns, rolling_vol_surface
+
+
+def figure_size(trace) -> tuple:
+    t0 = time.perf_counter()
+    size = len(go.Figure(trace).to_json())
+    return size, time.perf_counter() - t0
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chart decimation benchmark")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--windows", default="5:60:5")
+    parser.add_argument("--widths", default="600,1200,2400")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("1300-01-01", periods=args.rows, unit="us")
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, args.rows)))
+    spikes = rng.choice(args.rows, 5, replace=False)
+    close[spikes] *= 1.5
+    parts = [int(p) for p in args.windows.split(":")]
+    windows = list(range(parts[0], parts[1] + 1, parts[2] if len(parts) > 2 else 1))
+    z = rolling_vol_surface(pct_returns(close), windows)
+    x = dates.asi8
+
+    full_line, t_line = figure_size(go.Scattergl(x=dates, y=close, mode="lines"))
+    full_surf, t_surf = figure_size(go.Surface(z=z, x=dates, y=windows))
+    print(f"series       {args.rows} bars · surface {len(windows)} x {args.rows}")
+    print(f"full         line {full_line / 1e6:8.2f} MB ({t_line:.2f}s) · "
+          f"surface {full_surf / 1e6:8.2f} MB ({t_surf:.2f}s)")
+
+    header = (f"{'width':>6}{'method':>8}{'points':>9}{'MB':>8}{'decimate s':>12}"
+              f"{'cached s':>10}{'figure s':>10}  shape")
+    print("\n" + header)
+    print("-" * len(header))
+    for width in [int(w) for w in args.widths.split(",")]:
+        n_buckets = width // POINTS_PER_PIXEL
+        for method, pick in (("lttb", lambda: lttb_indices(x, close, width)),
+                             ("minmax", lambda: minmax_indices(close, n_buckets))):
+            keep, t_dec = timed(lambda: cached_decimation((method, width), pick))
+            _, t_hit = timed(lambda: cached_decimation((method, width), pick))
+            size, t_fig = figure_size(go.Scattergl(x=dates[keep], y=close[keep], mode="lines"))
+            shape = f"{np.isin(spikes, keep).sum()}/{len(spikes)} spikes"
+            print(f"{width:>6}{method:>8}{len(keep):>9}{size / 1e6:>8.3f}{t_dec:>12.4f}"
+                  f"{t_hit:>10.6f}{t_fig:>10.3f}  {shape}")
+
+        (cols, z_plot), t_dec = timed(
+            lambda: cached_decimation(("surface", width), lambda: decimate_surface(z, n_buckets)))
+        _, t_hit = timed(lambda: cached_decimation(("surface", width), lambda: None))
+        size, t_fig = figure_size(go.Surface(z=z_plot, x=dates[cols], y=windows))
+        kept = (np.allclose(np.nanmax(z_plot, axis=1), np.nanmax(z, axis=1))
+                and np.allclose(np.nanmin(z_plot, axis=1), np.nanmin(z, axis=1)))
+        print(f"{width:>6}{'surface':>8}{len(cols):>9}{size / 1e6:>8.3f}{t_dec:>12.4f}"
+              f"{t_hit:>10.6f}{t_fig:>10.3f}  row min/max {'kept' if kept else 'LOST'}")
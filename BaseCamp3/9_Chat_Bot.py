@@ -1,5 +1,17 @@
 import streamlit as st
-from groq import Groq
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from LLM_Clients import key_limiter
+from LLM_Resilience import get_resilient_llm
+from LLM_Telemetry import get_telemetry
+from Response_Cache import get_response_cache
+from Chat_Context import ConversationContext, count_tokens
+from Chat_History import ChatLog, new_session_id, valid_session_id
+from Chat_Engine import (CHARACTER_SYSTEM_PROMPTS, MODEL, FALLBACK_MODEL, ERROR_REPLY,
+                         GROUNDED_PERSONAS, DOC_TOKEN_BUDGET,
+                         cacheable_reply, chat, chat_stream, format_stats,
+                         reply_cache_key)
 
 # -------------------------------------------------------
 # App config
@@ -10,75 +22,120 @@ st.set_page_config(
     layout="wide",
 )
 
-# System prompt for Various Characters
-CHARACTER_SYSTEM_PROMPTS = {
-    "Philosopher": (
-        "You are a thoughtful philosopher. "
-        "Respond in a reflective, calm, and sometimes abstract terms, "
-        "providing analogies and deeper meaning."
-    ),
-    "Techie": (
-        "You are a practical, detail-oriented engineer. "
-        "Repond with explaining things clearly, with examples, and keep a technical tone."
-    ),
-    "Politician": (
-        "You are a diplomatic politician, who has a societal and patriotic view"
-        "You always spean in a careful, optimistic, and often in a balanced, "
-        "non-committal way."
-    ),
-    "Friend": (
-        "You are a warm, supportive friend. You are eager to understand and participate."
-        "You respond casually, with empathy and encouragement & some times witty"
-    ),
-    "Kid": (
-        "You are a curious kid. "
-        "You ask simple questions, use simple words, and sound playful."
-    ),
-}
-
-# Chat Function
-def chat(api_key: str, character: str, prompt: str) -> str:
-
-    system_prompt = CHARACTER_SYSTEM_PROMPTS.get(character, "Respond to User Query")
 
-    # Client Created with the API provided
-    Client = Groq (api_key = api_key)
-
-    messages=[
-        {
-            "role": "system",
-            "content": system_prompt,
-        },
-        # {
-        #     "role": "system",
-        #     "content": "where ncessary provide response as markdown text",
-        # },        
-        {
-            "role": "user",
-            "content": prompt,
-        }
-    ]
-    try :
-        
-        completion = Client.chat.completions.create(
-            messages=messages,    
-            model="llama-3.3-70b-versatile",
-            # model="openai/gpt-oss-120b",
-            stop=None,
-        )
-
-        return completion.choices[0].message.content
-    
+# Chat calls, personas and model settings live in Chat_Engine
+def stream_reply(api_key: str, character: str, prompt: str, on_complete=None, history: list = None):
+    """
+    Render the reply into the current chat message while it streams.
+    Returns (reply text, stats caption). Partial output is kept if the stream fails.
+    on_complete(text, stats) is called only when the whole reply arrived.
+    """
+    stats = {}
+    reply = f"**{character}**:  "
+    body = ""
+    placeholder = st.empty()
+    try:
+        for piece in chat_stream(api_key, character, prompt, stats, history=history):
+            body += piece
+            placeholder.markdown(reply + body + "▌")
+        if on_complete is not None:
+            on_complete(body, stats)
     except Exception:
+        body += f"\n\n⚠️ {ERROR_REPLY}" + (" (reply is partial)" if "ttft" in stats else "")
+    reply += body
+    placeholder.markdown(reply)
+
+    caption = format_stats(stats)
+    if caption:
+        st.caption(caption)
+    return reply, caption
+
+
+def fan_out_reply(api_key: str, prompt: str, use_cache: bool):
+    """
+    Send the prompt to every persona at once and render the answers side by
+    side as each one completes. Calls run on a thread pool, capped per API key
+    by key_limiter, so wall time is the slowest persona, not the sum.
+    Returns (combined reply text, stats caption).
+    """
+    personas = list(CHARACTER_SYSTEM_PROMPTS)
+    cache = get_response_cache() if use_cache else None
+
+    slots = {}
+    for col, name in zip(st.columns(len(personas)), personas):
+        with col:
+            st.markdown(f"**{name}**")
+            slots[name] = (st.empty(), st.empty())
+            slots[name][0].markdown("_thinking ..._")
+
+    limiter = key_limiter(api_key)
+
+    # runs on a worker thread: no st.* calls in here
+    def ask(name):
+        t0 = time.perf_counter()
+        key = reply_cache_key(name, prompt, []) if cache else None
+        reply = cache.get(key) if cache else None
+        if reply is not None:
+            return name, reply, time.perf_counter() - t0, True
+        with limiter:
+            # time waiting for a per-key slot is reported as queue time
+            stats = {"queue_s": time.perf_counter() - t0}
+            reply = chat(api_key=api_key, character=name, prompt=prompt, stats=stats)
+        if cache and cacheable_reply(reply, stats):
+            cache.put(key, MODEL, reply)
+        return name, reply, time.perf_counter() - t0, False
 
-        return "Error invoking LLM"
+    t0 = time.perf_counter()
+    replies, seconds = {}, {}
+    with ThreadPoolExecutor(max_workers=len(personas)) as pool:
+        for future in as_completed([pool.submit(ask, name) for name in personas]):
+            name, reply, secs, cached = future.result()
+            replies[name], seconds[name] = reply, secs
+            body, caption = slots[name]
+            body.markdown(reply)
+            caption.caption("⚡ from cache" if cached else f"{secs:.2f}s")
+    wall = time.perf_counter() - t0
+
+    stats = f"⏱ all {len(personas)} personas in {wall:.2f}s (sum of calls {sum(seconds.values()):.2f}s)"
+    st.caption(stats)
+    combined = "\n\n".join(f"**{name}**:  {replies[name]}" for name in personas)
+    return combined, stats
 
 
 # -------------------------------------------------------
 # Session state for chat history
 # -------------------------------------------------------
-if "messages" not in st.session_state:
-    st.session_state.messages = []  # list of dicts: {role: "user"/"assistant", "content": str}
+# Messages are appended to a per-session log on disk (Chat_History); the
+# session id is kept in the URL (?session=...) so a refresh restores the chat.
+# Only the last `show_count` messages are read and rendered on each rerun.
+RENDER_LAST = 30            # messages shown when a session is opened
+PAGE_SIZE = 30              # older messages loaded per "Load older" click
+CONTEXT_RESTORE = 200       # most recent messages replayed into the context on restore
+
+
+def open_session(session_id: str) -> None:
+    log = ChatLog(session_id)
+    st.session_state.session_id = session_id
+    st.session_state.chat_log = log
+    st.session_state.show_count = RENDER_LAST
+    st.query_params["session"] = session_id
+
+    # Turns sent to the model, within a token budget (older turns folded into a summary).
+    # Rebuilt from a bounded tail of the log: entries carry "ctx" when they went into the context
+    context = ConversationContext()
+    for msg in log.tail(CONTEXT_RESTORE):
+        if msg.get("ctx"):
+            context.add(msg["role"], msg["ctx"])
+    st.session_state.context = context
+
+
+def load_older() -> None:
+    st.session_state.show_count += PAGE_SIZE
+
+
+if "chat_log" not in st.session_state:
+    session_id = st.query_params.get("session")
+    open_session(session_id if valid_session_id(session_id) else new_session_id())
 
 
 # Sidebar: API key + character
@@ -97,6 +154,60 @@ with st.sidebar:
         index=0,  # default to Techie
     )
 
+    streaming = st.toggle("Stream replies", value=True,
+                          help="Show tokens as they arrive, with time-to-first-token and tokens/sec")
+
+    compare_all = st.toggle("Compare all personas", value=False,
+                            help="Ask every character at once and show the answers side by side "
+                                 "(no conversation history is sent in this mode)")
+
+    context = st.session_state.context
+    context.budget = st.number_input("Context budget (tokens)", min_value=200, max_value=32000,
+                                     value=context.budget, step=200,
+                                     help="Upper bound on prompt size: recent turns that fit are sent, "
+                                          "older ones are folded into a summary")
+    ctx = context.stats()
+    st.caption(f"Context: {ctx['turns']} turns · {ctx['turn_tokens']} tokens · "
+               f"summary {ctx['summary_tokens']} tokens ({ctx['folded_turns']} turns folded)")
+
+    use_cache = st.toggle("Cache replies", value=False,
+                          help="Answer a repeated (character, prompt) from the local response cache, "
+                               "without calling the API")
+    if use_cache:
+        cache_stats = get_response_cache().stats()
+        st.caption(f"Cache: {cache_stats['entries']} replies · "
+                   f"{cache_stats['bytes'] / 1024:.0f} KB · {cache_stats['hits']} hits")
+
+    # Circuit breaker state and recent latency per model (shared by all sessions)
+    llm_stats = get_resilient_llm([MODEL, FALLBACK_MODEL]).stats()
+    for model in (MODEL, FALLBACK_MODEL):
+        m = llm_stats[model]
+        st.caption(f"{model}: {m['state']} · p95 {m['p95_s']:.2f}s · errors {m['error_rate']:.0%}")
+
+    # Recent calls by persona and model: is the time ours (queue) or the provider's (TTFT, tok/s)?
+    with st.expander("LLM telemetry"):
+        rows = get_telemetry().summary()
+        if rows:
+            st.dataframe([{
+                "persona": r["persona"], "model": r["model"],
+                "calls": r["calls"], "errors": r["errors"],
+                "p50 s": r["p50_s"], "p95 s": r["p95_s"],
+                "TTFT p50 s": r["ttft_p50_s"], "queue p50 s": r["queue_p50_s"],
+                "tok/s": None if r["tokens_per_sec"] is None else round(r["tokens_per_sec"], 1),
+                "tokens": r["prompt_tokens"] + r["completion_tokens"],
+                "cost $": round(r["cost_usd"], 5),
+            } for r in rows], hide_index=True)
+            st.caption(f"Last {len(get_telemetry().calls)} calls · full log in "
+                       f"{get_telemetry().path or 'memory only'}")
+        else:
+            st.caption("No calls yet")
+
+    chat_log = st.session_state.chat_log
+    st.caption(f"Session {chat_log.session_id[:8]} · {len(chat_log)} messages")
+    if st.button("New chat"):
+        open_session(new_session_id())
+        st.rerun()
+
     st.markdown("---")
     st.caption(
         "Tip: Change the character and send another message to see how tone changes."
@@ -113,29 +224,90 @@ st.write(
 )
 st.markdown("---")
 
-# Show chat history
-for msg in st.session_state.messages:
+# Show chat history: only the newest show_count messages, older ones on demand
+chat_log = st.session_state.chat_log
+if len(chat_log) > st.session_state.show_count:
+    hidden = len(chat_log) - st.session_state.show_count
+    st.button(f"Load older messages ({hidden} not shown)", on_click=load_older)
+
+for msg in chat_log.tail(st.session_state.show_count):
     with st.chat_message(msg["role"]):
         st.markdown(msg["content"])
+        if msg.get("stats"):
+            st.caption(msg["stats"])
 
 # Chat input (Enter to send)
 user_prompt = st.chat_input("Type your message and press Enter...")
 
 if user_prompt:
     #  Show user message
-    st.session_state.messages.append({"role": "user", "content": user_prompt})
+    # "ctx": this message also goes into the model context (not in compare mode)
+    chat_log.append({"role": "user", "content": user_prompt,
+                     **({} if compare_all else {"ctx": user_prompt})})
     with st.chat_message("user"):
         st.markdown(user_prompt)
 
+if user_prompt and compare_all:
+    with st.chat_message("assistant"):
+        if not api_key:
+            assistant_reply, reply_stats = "⚠️ Please provide an API key in the sidebar.", ""
+            st.markdown(assistant_reply)
+        else:
+            assistant_reply, reply_stats = fan_out_reply(api_key, user_prompt, use_cache)
+    chat_log.append({"role": "assistant", "content": assistant_reply, "stats": reply_stats})
+
+elif user_prompt:
+    # Earlier turns that fit the budget, next to the system prompt and this prompt
+    system_prompt = CHARACTER_SYSTEM_PROMPTS.get(character, "Respond to User Query")
+    reserve = count_tokens(system_prompt) + count_tokens(user_prompt)
+    if character in GROUNDED_PERSONAS:
+        reserve += DOC_TOKEN_BUDGET     # room for the doc passages added by Chat_Engine
+    history = context.history(reserve=reserve)
+
+    # Response cache lookup (opt-in): a hit skips the API call entirely
+    cache = get_response_cache() if use_cache else None
+    cache_key = reply_cache_key(character, user_prompt, history) if cache else None
+    t0 = time.perf_counter()
+    cached_reply = cache.get(cache_key) if cache else None
+
+    completed = []   # the reply text, once it arrived in full
+
+    def save_reply(text, stats):
+        if text and text != ERROR_REPLY:
+            completed.append(text)
+            if cache and cacheable_reply(text, stats):
+                cache.put(cache_key, MODEL, text)
+
     # Check API key
-    if not api_key:
-        assistant_reply = "⚠️ Please provide an API key in the sidebar."
-    else:
-        # Call backend chat()
-        assistant_reply = chat(api_key=api_key, character=character, prompt=user_prompt)
-        assistant_reply = f"**{character}**:  "+assistant_reply
-
-    # Show assistant reply
-    st.session_state.messages.append({"role": "assistant", "content": assistant_reply})
     with st.chat_message("assistant"):
-        st.markdown(assistant_reply)
+        reply_stats = ""
+        if cached_reply is not None:
+            completed.append(cached_reply)
+            assistant_reply = f"**{character}**:  " + cached_reply
+            reply_stats = f"⚡ from cache · {(time.perf_counter() - t0) * 1000:.1f} ms"
+            st.markdown(assistant_reply)
+            st.caption(reply_stats)
+        elif not api_key:
+            assistant_reply = "⚠️ Please provide an API key in the sidebar."
+            st.markdown(assistant_reply)
+        elif streaming:
+            # Tokens are rendered as they arrive
+            assistant_reply, reply_stats = stream_reply(api_key, character, user_prompt,
+                                                        on_complete=save_reply, history=history)
+        else:
+            # Call backend chat()
+            call_stats = {}
+            reply_text = chat(api_key=api_key, character=character, prompt=user_prompt,
+                              history=history, stats=call_stats)
+            save_reply(reply_text, call_stats)
+            assistant_reply = f"**{character}**:  "+reply_text
+            st.markdown(assistant_reply)
+
+    # Keep assistant reply in history
+    chat_log.append({"role": "assistant", "content": assistant_reply, "stats": reply_stats,
+                     **({"ctx": completed[0]} if completed else {})})
+
+    # Update the model context (token counts are added incrementally)
+    context.add("user", user_prompt)
+    if completed:
+        context.add("assistant", completed[0])
@@ -0,0 +1,89 @@
+"""
+Per-turn latency: new Groq client per message vs the shared pooled client
+
+Starts Fake_LLM_Server.py locally and runs the same chat turn repeatedly:
+  1. Groq(api_key=...) built for every turn (what chat() used to do)
+  2. LLM_Clients.get_groq_client() - one cached client, keep-alive connections
+
+Example:
+    python 9a_Client_Pool_Benchmark.py --turns 200
+    python 9a_Client_Pool_Benchmark.py --turns 200 --stream
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from groq import Groq
+
+from LLM_Clients import get_groq_client
+
+
+MESSAGES = [
+    {"role": "system", "content": "You are a practical, detail-oriented engineer."},
+    {"role": "user", "content": "What is a connection pool?"},
+]
+
+
+def start_fake_server(port: int) -> subprocess.Popen:
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.Popen([sys.executable, "Fake_LLM_Server.py", "--port", str(port)], cwd=here)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("fake server did not start")
+
+
+def one_turn(client: Groq, stream: bool) -> None:
+    if stream:
+        for _ in client.chat.completions.create(messages=MESSAGES, model="fake", stream=True):
+            pass
+    else:
+        client.chat.completions.create(messages=MESSAGES, model="fake")
+
+
+def bench(make_client, turns: int, stream: bool):
+    times = []
+    for _ in range(turns):
+        t0 = time.perf_counter()
+        one_turn(make_client(), stream)
+        times.append((time.perf_counter() - t0) * 1000)
+    return sorted(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Groq client reuse benchmark")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--stream", action="store_true", help="use stream=True turns")
+    parser.add_argument("--port", type=int, default=5700)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    proc = start_fake_server(args.port)
+    try:
+        # warm up imports and the server once
+        one_turn(Groq(api_key="bench", base_url=base_url), args.stream)
+
+        per_turn = bench(lambda: Groq(api_key="bench", base_url=base_url), args.turns, args.stream)
+        pooled = bench(lambda: get_groq_client("bench", base_url=base_url), args.turns, args.stream)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    header = f"{'client':<26}{'turns':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, times in (("new Groq() per turn", per_turn), ("shared pooled client", pooled)):
+        p95 = times[int(0.95 * (len(times) - 1))]
+        print(f"{name:<26}{len(times):>7}{statistics.mean(times):>10.2f}"
+              f"{statistics.median(times):>10.2f}{p95:>10.2f}")
+    saved = statistics.mean(per_turn) - statistics.mean(pooled)
+    print(f"\nSaved per turn: {saved:.2f} ms")
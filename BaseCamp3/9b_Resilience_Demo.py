@@ -0,0 +1,89 @@
+"""
+Retries, circuit breaker and model fallback against a faulty local server
+
+Starts Fake_LLM_Server.py with errors injected on the primary model only,
+then sends chat turns through LLM_Resilience and reports how many turns got
+a reply, from which model, and what the retry / failover counters did.
+
+Example:
+    python 9b_Resilience_Demo.py --turns 100 --error-rate 0.3
+    python 9b_Resilience_Demo.py --turns 100 --error-rate 0.0 --jitter 1.5 --p95 0.5
+    python 9b_Resilience_Demo.py --turns 50 --429-rate 0.5 --rpm 600
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+from LLM_Clients import get_groq_client
+from LLM_Resilience import AllModelsFailed, ResilientLLM
+
+
+PRIMARY = "llama-3.3-70b-versatile"
+FALLBACK = "openai/gpt-oss-120b"
+MESSAGES = [
+    {"role": "system", "content": "You are a practical, detail-oriented engineer."},
+    {"role": "user", "content": "What is a circuit breaker?"},
+]
+
+
+def start_fake_server(port: int, args) -> subprocess.Popen:
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.Popen([sys.executable, "Fake_LLM_Server.py", "--port", str(port),
+                             "--tokens", "10", "--jitter", str(args.jitter),
+                             "--error-rate", str(args.error_rate),
+                             "--429-rate", str(args.rate_limit_rate),
+                             "--fault-models", PRIMARY], cwd=here)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("fake server did not start")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM resilience demo")
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.3, help="503s on the primary model")
+    parser.add_argument("--429-rate", dest="rate_limit_rate", type=float, default=0.0,
+                        help="429s on the primary model")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra latency on the primary")
+    parser.add_argument("--p95", type=float, default=20.0, help="p95 threshold for failover (s)")
+    parser.add_argument("--rpm", type=float, default=0, help="client-side rate limit, 0 = off")
+    parser.add_argument("--port", type=int, default=5701)
+    args = parser.parse_args()
+
+    proc = start_fake_server(args.port, args)
+    try:
+        client = get_groq_client("demo", base_url=f"http://127.0.0.1:{args.port}")
+        llm = ResilientLLM([PRIMARY, FALLBACK], rpm=args.rpm, p95_threshold=args.p95)
+
+        used, times, failed = Counter(), [], 0
+        for _ in range(args.turns):
+            t0 = time.perf_counter()
+            try:
+                _, model = llm.complete(client, MESSAGES)
+                used[model] += 1
+            except AllModelsFailed:
+                failed += 1
+            times.append((time.perf_counter() - t0) * 1000)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    times.sort()
+    print(f"turns {args.turns} · replied {args.turns - failed} · failed {failed}")
+    print(f"latency ms: mean {statistics.mean(times):.1f} · "
+          f"p50 {statistics.median(times):.1f} · p95 {times[int(0.95 * (len(times) - 1))]:.1f}")
+    print("replies by model:", dict(used))
+    print(json.dumps(llm.stats(), indent=2))
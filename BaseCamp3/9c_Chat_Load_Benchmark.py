@@ -0,0 +1,135 @@
+"""
+Load test of the chat stack with N concurrent sessions, fully offline
+
+Each session is a thread that runs `--turns` streamed turns through
+Chat_Engine.chat_stream with its own ConversationContext, as the chat bot
+does. The backend is the in-process FakeProvider (no key, no network), or
+with --server the real GroqProvider path (pooled client + LLM_Resilience)
+against a local Fake_LLM_Server.py.
+
+Reports throughput (turns/s, tokens/s), errors and the TTFT / turn latency
+distribution over all turns.
+
+Example:
+    python 9c_Chat_Load_Benchmark.py --sessions 20 --turns 10 --ttft 0.2 --tps 100
+    python 9c_Chat_Load_Benchmark.py --sessions 20 --turns 10 --error-rate 0.05
+    python 9c_Chat_Load_Benchmark.py --sessions 20 --turns 10 --server
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from Chat_Context import ConversationContext, count_tokens
+from Chat_Engine import CHARACTER_SYSTEM_PROMPTS, FALLBACK_MODEL, MODEL, chat_stream
+from LLM_Providers import FakeProvider, GroqProvider
+
+
+PROMPTS = [
+    "What is a connection pool?",
+    "Why does latency matter more than throughput for chat?",
+    "Explain backpressure in one paragraph.",
+    "How would you load test a web service?",
+]
+
+
+def start_fake_server(port: int, args) -> subprocess.Popen:
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.Popen([sys.executable, "Fake_LLM_Server.py", "--port", str(port),
+                             "--ttft", str(args.ttft), "--tps", str(args.tps),
+                             "--tokens", str(args.tokens), "--error-rate", str(args.error_rate)],
+                            cwd=here)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("fake server did not start")
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))]
+
+
+def run_session(session: int, turns: int, provider, results: list, lock: threading.Lock) -> None:
+    character = list(CHARACTER_SYSTEM_PROMPTS)[session % len(CHARACTER_SYSTEM_PROMPTS)]
+    context = ConversationContext()
+    for turn in range(turns):
+        prompt = PROMPTS[(session + turn) % len(PROMPTS)]
+        system_prompt = CHARACTER_SYSTEM_PROMPTS[character]
+        history = context.history(reserve=count_tokens(system_prompt) + count_tokens(prompt))
+        stats, ok, text = {}, True, ""
+        try:
+            for piece in chat_stream("bench", character, prompt, stats, history=history,
+                                     provider=provider):
+                text += piece
+        except Exception:
+            ok = False
+        context.add("user", prompt)
+        if ok:
+            context.add("assistant", text)
+        with lock:
+            results.append((ok, stats))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent chat sessions benchmark")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=10, help="turns per session")
+    parser.add_argument("--ttft", type=float, default=0.2, help="fake time to first token (s)")
+    parser.add_argument("--tps", type=float, default=100, help="fake tokens/sec, 0 = instant")
+    parser.add_argument("--tokens", type=int, default=40, help="tokens per reply")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--server", action="store_true",
+                        help="GroqProvider against a local Fake_LLM_Server.py instead of FakeProvider")
+    parser.add_argument("--port", type=int, default=5702)
+    args = parser.parse_args()
+
+    proc = None
+    if args.server:
+        proc = start_fake_server(args.port, args)
+        provider = GroqProvider("bench", [MODEL, FALLBACK_MODEL],
+                                base_url=f"http://127.0.0.1:{args.port}")
+        provider.llm.rpm = 0                        # no client-side throttling in the benchmark
+    else:
+        provider = FakeProvider(ttft=args.ttft, tokens_per_sec=args.tps, reply_tokens=args.tokens,
+                                error_rate=args.error_rate, seed=0)
+
+    results, lock = [], threading.Lock()
+    t0 = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+            for s in range(args.sessions):
+                pool.submit(run_session, s, args.turns, provider, results, lock)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    wall = time.perf_counter() - t0
+
+    done = [stats for ok, stats in results if ok]
+    ttft = [s["ttft"] * 1000 for s in done if "ttft" in s]
+    total = [s["total"] * 1000 for s in done]
+    tokens = sum(s.get("tokens", 0) for s in done)
+
+    print(f"backend      {'GroqProvider + Fake_LLM_Server' if args.server else 'FakeProvider'}")
+    print(f"sessions     {args.sessions} x {args.turns} turns in {wall:.2f}s")
+    print(f"turns        {len(done)} ok · {len(results) - len(done)} failed")
+    print(f"throughput   {len(done) / wall:.1f} turns/s · {tokens / wall:.0f} tokens/s")
+    header = f"{'ms':<8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print("\n" + header)
+    print("-" * len(header))
+    for name, values in (("TTFT", ttft), ("turn", total)):
+        print(f"{name:<8}{percentile(values, 0.50):>9.1f}{percentile(values, 0.95):>9.1f}"
+              f"{percentile(values, 0.99):>9.1f}{max(values, default=0):>9.1f}")
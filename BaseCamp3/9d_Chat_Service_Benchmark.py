@@ -0,0 +1,131 @@
+"""
+Load test of the chat service (FastAPI_Chat_App) with hundreds of users
+
+Starts the service with the offline fake provider (LLM_PROVIDER=fake) and
+opens --users concurrent SSE streams, each user sending --turns messages.
+The service holds at most --max-concurrency provider calls in flight;
+the rest wait in its queue. Reports throughput, TTFT / turn latency
+percentiles, 429 / 503 responses and the peak in-flight count seen on /stats.
+
+Example:
+    python 9d_Chat_Service_Benchmark.py --users 300 --turns 3 --max-concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+# the benchmark acts as a trusted front-end, so each simulated user gets its own quota
+SERVICE_TOKEN = secrets.token_hex(16)
+
+def start_service(port: int, args) -> subprocess.Popen:
+    here = os.path.join(os.path.dirname(os.path.abspath(__file__)), "FastAPI_Chat_App")
+    env = {**os.environ, "LLM_PROVIDER": "fake",
+           "FAKE_LLM_TTFT": str(args.ttft), "FAKE_LLM_TOKENS_PER_SEC": str(args.tps),
+           "CHAT_MAX_CONCURRENCY": str(args.max_concurrency), "CHAT_QUEUE_TIMEOUT": "120",
+           "CHAT_SERVICE_TOKEN": SERVICE_TOKEN}
+    # access lines for every request would bury the results table
+    cmd = [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port),
+           "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=here, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/healthz", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("chat service did not start")
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[int(q * (len(values) - 1))] if values else 0.0
+
+
+async def user_session(client: httpx.AsyncClient, user: int, turns: int, results: list):
+    for turn in range(turns):
+        body = {"character": "Techie", "prompt": f"user {user} question {turn}"}
+        t0 = time.perf_counter()
+        ttft = None
+        try:
+            async with client.stream("POST", "/chat/stream", json=body,
+                                     headers={"X-User-Id": f"user-{user}",
+                                              "Authorization": f"Bearer {SERVICE_TOKEN}"}) as resp:
+                if resp.status_code != 200:
+                    await resp.aread()
+                    results.append((resp.status_code, None, None))
+                    continue
+                async for line in resp.aiter_lines():
+                    if ttft is None and line.startswith("data:"):
+                        ttft = time.perf_counter() - t0
+        except httpx.HTTPError as exc:
+            results.append((type(exc).__name__, None, None))
+            continue
+        results.append((200, ttft, time.perf_counter() - t0))
+
+
+async def watch_in_flight(client: httpx.AsyncClient, peak: list, stop: asyncio.Event):
+    while not stop.is_set():
+        stats = (await client.get("/stats")).json()
+        peak[0] = max(peak[0], stats["in_flight"])
+        await asyncio.sleep(0.1)
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.users + 10, max_keepalive_connections=args.users + 10)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits,
+                                 timeout=300) as client:
+        results, peak, stop = [], [0], asyncio.Event()
+        watcher = asyncio.create_task(watch_in_flight(client, peak, stop))
+        t0 = time.perf_counter()
+        await asyncio.gather(*(user_session(client, u, args.turns, results)
+                               for u in range(args.users)))
+        wall = time.perf_counter() - t0
+        stop.set()
+        await watcher
+    return results, wall, peak[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chat service load test")
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    parser.add_argument("--ttft", type=float, default=0.2, help="fake time to first token (s)")
+    parser.add_argument("--tps", type=float, default=200, help="fake tokens/sec")
+    parser.add_argument("--port", type=int, default=5705)
+    args = parser.parse_args()
+
+    proc = start_service(args.port, args)
+    try:
+        results, wall, peak = asyncio.run(main(args))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    ok = [r for r in results if r[0] == 200]
+    codes = {}
+    for code, _, _ in results:
+        codes[code] = codes.get(code, 0) + 1
+    ttft = [r[1] * 1000 for r in ok if r[1] is not None]
+    total = [r[2] * 1000 for r in ok]
+
+    print(f"users        {args.users} x {args.turns} turns in {wall:.2f}s")
+    print(f"responses    {json.dumps(codes)}")
+    print(f"throughput   {len(ok) / wall:.1f} turns/s")
+    print(f"in flight    peak {peak} (limit {args.max_concurrency})")
+    header = f"{'ms':<8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print("\n" + header)
+    print("-" * len(header))
+    for name, values in (("TTFT", ttft), ("turn", total)):
+        print(f"{name:<8}{percentile(values, 0.50):>9.1f}{percentile(values, 0.95):>9.1f}"
+              f"{percentile(values, 0.99):>9.1f}{max(values, default=0):>9.1f}")
@@ -0,0 +1,249 @@
+"""
+Batch evaluation of the persona prompts over a JSONL file of prompts
+
+Reads prompts one line at a time ({"id": ..., "prompt": ..., "character": ...};
+id and character are optional - without a character every persona is asked),
+runs them concurrently under a requests-per-minute and tokens-per-minute
+budget, and appends one JSON line per (prompt, persona) to the output file:
+
+    {"key", "id", "character", "prompt", "ok", "reply", "error", "model",
+     "latency_s", "prompt_tokens", "completion_tokens"}
+
+The output file is the checkpoint: on start, keys already in it are skipped,
+so an interrupted run (Ctrl+C, crash) continues where it stopped. Failed
+rows are retried on the next run with --retry-failed. A summary (latency
+percentiles, tokens, effective RPM / TPM) is printed and written next to
+the output as <output>.summary.json.
+
+Examples:
+    python 9e_Batch_Eval.py --make-sample eval_prompts.jsonl --count 2000
+    python 9e_Batch_Eval.py eval_prompts.jsonl eval_out.jsonl --provider fake --rpm 6000 --tpm 2000000
+    python 9e_Batch_Eval.py eval_prompts.jsonl eval_out.jsonl --provider groq --rpm 30 --tpm 6000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, Set
+
+from Chat_Context import count_tokens
+from Chat_Engine import CHARACTER_SYSTEM_PROMPTS, FALLBACK_MODEL, MODEL, SAMPLING_PARAMS, build_messages
+from LLM_Providers import ChatProvider, FakeProvider, GroqProvider
+from LLM_Resilience import TokenBucket
+
+
+EXPECTED_COMPLETION_TOKENS = 256    # TPM estimate per call until real replies are seen
+LARGEST_REQUEST_TOKENS = 2048       # prompt (with doc passages) + completion, for the TPM burst
+
+
+# -------------------------
+# Input / checkpoint
+# -------------------------
+def read_jobs(path: str, characters: list) -> Iterator[Dict]:
+    """
+    Stream (prompt, character) jobs from the JSONL file, one line at a time.
+    """
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            prompt_id = str(row.get("id", n))
+            for character in ([row["character"]] if row.get("character") else characters):
+                yield {"key": f"{prompt_id}:{character}", "id": prompt_id,
+                       "character": character, "prompt": row["prompt"]}
+
+
+def done_keys(path: str, retry_failed: bool) -> Set[str]:
+    """
+    Keys already in the output file (only successful ones with retry_failed).
+    A torn last line from an interrupted write is ignored.
+    """
+    keys = set()
+    if not os.path.exists(path):
+        return keys
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            if row.get("ok") or not retry_failed:
+                keys.add(row["key"])
+    return keys
+
+
+def make_sample(path: str, count: int) -> None:
+    topics = ["recursion", "virtual environments", "git rebase", "HTTP caching", "unit tests",
+              "async IO", "hash maps", "rate limiting", "pandas groupby", "REST APIs"]
+    asks = ["Explain {} to a beginner.", "What is the biggest mistake people make with {}?",
+            "Give one example of {} in real life.", "Why does {} matter?"]
+    rng = random.Random(0)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            prompt = rng.choice(asks).format(rng.choice(topics))
+            f.write(json.dumps({"id": f"p{i:05d}", "prompt": prompt}) + "\n")
+    print(f"wrote {count} prompts to {path}")
+
+
+# -------------------------
+# Runner
+# -------------------------
+class BatchRunner:
+
+    def __init__(self, provider, rpm: float, tpm: float, concurrency: int):
+        self.provider = provider
+        self.concurrency = concurrency
+        # small bursts only: the budget is spread over the minute. The TPM burst fits one
+        # large request but never more than the whole per-minute budget
+        self.rpm = TokenBucket(rpm / 60, max(1.0, rpm / 60))
+        self.tpm = TokenBucket(tpm / 60, min(tpm, max(tpm / 60, LARGEST_REQUEST_TOKENS)))
+        self.completion_avg = float(EXPECTED_COMPLETION_TOKENS)
+
+    def estimate(self, messages: list) -> float:
+        return sum(count_tokens(m["content"]) for m in messages) + self.completion_avg
+
+    def run_one(self, job: Dict) -> Dict:
+        messages = build_messages(job["character"], job["prompt"])
+        estimate = self.estimate(messages)
+        self.rpm.acquire()
+        self.tpm.acquire(min(estimate, self.tpm.capacity))
+
+        stats, row = {}, {**job, "ok": False, "reply": None, "error": None}
+        t0 = time.perf_counter()
+        try:
+            row["reply"] = self.provider.complete(messages, stats, **SAMPLING_PARAMS)
+            row["ok"] = True
+        except Exception as exc:
+            row["error"] = f"{type(exc).__name__}: {exc}"
+        row["latency_s"] = round(time.perf_counter() - t0, 4)
+        row["model"] = stats.get("model")
+        row["prompt_tokens"] = stats.get("prompt_tokens")
+        row["completion_tokens"] = stats.get("tokens")
+
+        if row["ok"]:
+            used = (row["prompt_tokens"] or 0) + (row["completion_tokens"] or 0)
+            self.tpm.charge(used - min(estimate, self.tpm.capacity))   # settle the estimate
+            if row["completion_tokens"]:
+                self.completion_avg = 0.9 * self.completion_avg + 0.1 * row["completion_tokens"]
+        return row
+
+    def run(self, jobs: Iterator[Dict], out_path: str, skip: Set[str]) -> Dict:
+        summary = {"written": 0, "ok": 0, "failed": 0, "skipped": 0, "interrupted": False}
+        latencies, prompt_tokens, completion_tokens = [], 0, 0
+        t0 = time.perf_counter()
+
+        with open(out_path, "a", encoding="utf-8") as out, \
+                ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            pending = set()
+
+            def drain(block: bool) -> None:
+                nonlocal prompt_tokens, completion_tokens
+                done, _ = wait(pending, return_when=FIRST_COMPLETED) if block else (
+                    {f for f in pending if f.done()}, None)
+                for future in done:
+                    pending.discard(future)
+                    row = future.result()
+                    # one line per result, flushed: this is the resume checkpoint
+                    out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                    out.flush()
+                    summary["written"] += 1
+                    summary["ok" if row["ok"] else "failed"] += 1
+                    if row["ok"]:
+                        latencies.append(row["latency_s"])
+                        prompt_tokens += row["prompt_tokens"] or 0
+                        completion_tokens += row["completion_tokens"] or 0
+                    if summary["written"] % 100 == 0:
+                        rate = summary["written"] / (time.perf_counter() - t0)
+                        print(f"  {summary['written']} done · {summary['failed']} failed · "
+                              f"{rate:.1f}/s", file=sys.stderr)
+
+            try:
+                for job in jobs:
+                    if job["key"] in skip:
+                        summary["skipped"] += 1
+                        continue
+                    # bounded window: prompts are read only as fast as they are served
+                    while len(pending) >= self.concurrency * 2:
+                        drain(block=True)
+                    pending.add(pool.submit(self.run_one, job))
+                    drain(block=False)
+                while pending:
+                    drain(block=True)
+            except KeyboardInterrupt:
+                summary["interrupted"] = True
+                print("interrupted - finishing calls in flight, run again to resume", file=sys.stderr)
+                for future in pending:
+                    future.cancel()
+                pending = {f for f in pending if not f.cancelled()}
+                while pending:
+                    drain(block=True)
+
+        wall = time.perf_counter() - t0
+        latencies.sort()
+        summary.update({
+            "wall_s": round(wall, 2),
+            "latency_p50_s": round(statistics.median(latencies), 4) if latencies else None,
+            "latency_p95_s": round(latencies[int(0.95 * (len(latencies) - 1))], 4) if latencies else None,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "effective_rpm": round(summary["written"] / wall * 60, 1) if wall else 0.0,
+            "effective_tpm": round((prompt_tokens + completion_tokens) / wall * 60, 1) if wall else 0.0,
+        })
+        return summary
+
+
+def build_provider(args) -> ChatProvider:
+    if args.provider == "fake":
+        return FakeProvider(ttft=args.ttft, tokens_per_sec=args.tps, reply_tokens=args.tokens,
+                            error_rate=args.error_rate, seed=0)
+    api_key = os.environ.get("GROQ_API_KEY")
+    if not api_key:
+        sys.exit("GROQ_API_KEY is not set")
+    provider = GroqProvider(api_key, [MODEL, FALLBACK_MODEL])
+    provider.llm.rpm = 0            # the runner's RPM / TPM budget paces the calls
+    return provider
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch evaluation of persona prompts")
+    parser.add_argument("input", help="JSONL prompts file (or the file to create with --make-sample)")
+    parser.add_argument("output", nargs="?", default="eval_results.jsonl")
+    parser.add_argument("--make-sample", action="store_true", help="write a sample prompts file and exit")
+    parser.add_argument("--count", type=int, default=1000, help="prompts in the sample file")
+    parser.add_argument("--characters", default=",".join(CHARACTER_SYSTEM_PROMPTS),
+                        help="personas for prompts without a character")
+    parser.add_argument("--provider", choices=["fake", "groq"], default="fake")
+    parser.add_argument("--rpm", type=float, default=30, help="requests per minute budget")
+    parser.add_argument("--tpm", type=float, default=6000, help="tokens per minute budget")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--retry-failed", action="store_true", help="re-run rows that failed before")
+    parser.add_argument("--ttft", type=float, default=0.05, help="fake provider: time to first token")
+    parser.add_argument("--tps", type=float, default=0, help="fake provider: tokens/sec")
+    parser.add_argument("--tokens", type=int, default=40, help="fake provider: reply tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake provider: failure rate")
+    args = parser.parse_args()
+
+    if args.make_sample:
+        make_sample(args.input, args.count)
+        sys.exit(0)
+
+    characters = [c for c in args.characters.split(",") if c]
+    unknown = [c for c in characters if c not in CHARACTER_SYSTEM_PROMPTS]
+    if unknown:
+        sys.exit(f"unknown characters: {unknown}")
+
+    skip = done_keys(args.output, args.retry_failed)
+    if skip:
+        print(f"resuming: {len(skip)} results already in {args.output}", file=sys.stderr)
+
+    runner = BatchRunner(build_provider(args), args.rpm, args.tpm, args.concurrency)
+    summary = runner.run(read_jobs(args.input, characters), args.output, skip)
+
+    with open(args.output + ".summary.json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,96 @@
+"""
+Doc_Retrieval at scale: build, incremental update, save / load and query latency
+
+Writes --docs synthetic Markdown files (paragraphs resampled from the real
+BaseCamp1 docs) into a temp folder, then measures:
+  - full build, and an incremental update after editing a few files
+  - binary index size and save / load time
+  - top-k query latency (p50 / p95) over a set of questions
+
+Example:
+    python 9f_Retrieval_Benchmark.py --docs 20000
+"""
+import argparse
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+
+from Doc_Retrieval import DocIndex, default_roots, read_doc
+
+
+QUERIES = [
+    "how to create a virtual environment", "git rebase vs merge", "install packages with pip",
+    "resolve merge conflicts", "activate venv on windows", "python version not found",
+    "push a branch to remote", "requirements txt freeze", "undo last commit", "python path variable",
+]
+
+
+def paragraphs() -> list:
+    paras = []
+    for root in default_roots():
+        for dirpath, _, names in os.walk(root):
+            for name in names:
+                if name.endswith((".md", ".html")):
+                    text = read_doc(os.path.join(dirpath, name))
+                    paras += [p.strip() for p in re.split(r"\n\s*\n", text) if len(p.split()) > 5]
+    return paras
+
+
+def write_corpus(folder: str, n_docs: int, paras: list, rng: random.Random) -> list:
+    paths = []
+    for i in range(n_docs):
+        path = os.path.join(folder, f"doc_{i:06d}.md")
+        body = [f"# Note {i}: {rng.choice(paras)[:60]}"] + rng.sample(paras, k=min(6, len(paras)))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n\n".join(body))
+        paths.append(path)
+    return paths
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BM25 retrieval benchmark")
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--edits", type=int, default=20, help="files changed before the incremental update")
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    paras = paragraphs()
+    with tempfile.TemporaryDirectory() as folder:
+        paths, t_write = timed(lambda: write_corpus(folder, args.docs, paras, rng))
+        index = DocIndex([folder])
+        counts, t_build = timed(index.update)
+        stats = index.stats()
+
+        for path in rng.sample(paths, k=min(args.edits, len(paths))):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n\n" + rng.choice(paras))
+        counts2, t_update = timed(index.update)
+
+        index_path = os.path.join(folder, "index.bm25")
+        size, t_save = timed(lambda: index.save(index_path))
+        loaded, t_load = timed(lambda: DocIndex.load(index_path))
+
+        times = []
+        for _ in range(20):
+            for q in QUERIES:
+                _, dt = timed(lambda: loaded.search(q, args.k))
+                times.append(dt * 1000)
+        times.sort()
+
+    print(f"corpus       {args.docs} files · {stats['passages']} passages · {stats['terms']} terms "
+          f"(written in {t_write:.1f}s)")
+    print(f"build        {t_build:.2f}s  {counts}")
+    print(f"incremental  {t_update * 1000:.0f} ms  {counts2}")
+    print(f"index file   {size / 1024 / 1024:.2f} MB · save {t_save:.2f}s · load {t_load:.2f}s")
+    print(f"query top-{args.k}  p50 {statistics.median(times):.2f} ms · "
+          f"p95 {times[int(0.95 * (len(times) - 1))]:.2f} ms · max {times[-1]:.2f} ms")
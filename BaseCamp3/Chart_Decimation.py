@@ -0,0 +1,154 @@
+"""
+Decimation of long series before they are sent to the browser
+
+A chart cannot show more than about one point per horizontal pixel, so
+sending more only costs payload and render time. These functions pick the
+points to keep for a given pixel width:
+
+lttb_indices(x, y, n_out)     Largest-Triangle-Three-Buckets: keeps the
+                              point of each bucket that forms the largest
+                              triangle with its neighbours - lines keep
+                              their visual shape (peaks, troughs, slopes)
+minmax_indices(y, n_buckets)  the min and the max of each bucket, in time
+                              order - no spike is ever dropped
+decimate_surface(z, n_buckets)
+                              the same min / max bucketing along the date
+                              axis of a (windows x dates) surface: for every
+                              window row, each bucket keeps its low and its high
+
+cached_decimation() memoises a result on (data version, zoom range, pixel
+width, method), so reruns and auto-refreshes at the same zoom are free.
+"""
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Tuple
+
+import numpy as np
+
+
+POINTS_PER_PIXEL = 2        # min/max: two points per bucket, one bucket per pixel
+CACHE_SIZE = 32
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of the n_out points LTTB keeps (always the first and the last).
+    NaN values are never selected while a bucket has a finite one.
+    """
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    n_out = max(n_out, 3)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(y)
+    y0 = np.where(finite, y, 0.0)
+
+    # the n - 2 inner points in n_out - 2 buckets: bucket i is [edges[i], edges[i + 1])
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # each bucket's average point is the far corner of the triangle for the bucket before it
+    count = np.add.reduceat(finite[:n - 1], edges[:-1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / np.diff(edges)
+        avg_y = np.add.reduceat(y0[:n - 1], edges[:-1]) / count
+    avg_x = np.append(avg_x, x[-1])
+    avg_y = np.append(np.where(count > 0, avg_y, np.nan), y0[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y0[a]
+        cx, cy = avg_x[i + 1], avg_y[i + 1]
+        if cy != cy:                # next bucket is all NaN: aim level
+            cy = ay
+        # twice the triangle area (a, candidate, next bucket average)
+        area = np.abs((ax - cx) * (y0[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        a = lo + int(np.argmax(np.where(finite[lo:hi], area, -1.0)))
+        out[i + 1] = a
+    return out
+
+
+def _bucket_edges(n: int, n_buckets: int) -> np.ndarray:
+    return np.unique(np.linspace(0, n, n_buckets + 1).astype(np.int64)[:-1])
+
+
+def _bucket_extremes(z: np.ndarray, edges: np.ndarray):
+    """
+    Per row and bucket of columns: min, max (NaN for an all-NaN bucket) and
+    the first column position of each. O(rows * n), no sorting.
+    """
+    n = z.shape[1]
+    sizes = np.diff(np.append(edges, n))
+    nan = np.isnan(z)
+    low_key = np.where(nan, np.inf, z)
+    high_key = np.where(nan, -np.inf, z)
+    low = np.minimum.reduceat(low_key, edges, axis=1)
+    high = np.maximum.reduceat(high_key, edges, axis=1)
+    pos = np.arange(n)
+    at_low = np.minimum.reduceat(np.where(low_key == np.repeat(low, sizes, axis=1), pos, n),
+                                 edges, axis=1)
+    at_high = np.minimum.reduceat(np.where(high_key == np.repeat(high, sizes, axis=1), pos, n),
+                                  edges, axis=1)
+    empty = np.isinf(low) & np.isinf(high) & (low > high)
+    low[empty] = np.nan
+    high[empty] = np.nan
+    return low, high, at_low, at_high
+
+
+def minmax_indices(y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """
+    Indices of the min and max of each of n_buckets equal buckets, in order -
+    at most 2 * n_buckets points.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+    _, _, at_low, at_high = _bucket_extremes(y.reshape(1, -1), _bucket_edges(n, n_buckets))
+    return np.unique(np.concatenate((at_low[0], at_high[0])))
+
+
+def decimate_surface(z: np.ndarray, n_buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reduce a (rows x n) surface to at most 2 * n_buckets columns. For every
+    bucket of columns two columns are emitted, at the bucket's first and last
+    position; in each row they hold the bucket's min and max, in the order
+    they occur. Returns (column positions, decimated z).
+    """
+    n = z.shape[1]
+    if 2 * n_buckets >= n:
+        return np.arange(n), z
+    edges = _bucket_edges(n, n_buckets)
+    low, high, at_low, at_high = _bucket_extremes(z, edges)
+    low_first = at_low <= at_high
+
+    out = np.empty((z.shape[0], 2 * len(edges)))
+    out[:, 0::2] = np.where(low_first, low, high)
+    out[:, 1::2] = np.where(low_first, high, low)
+    cols = np.empty(2 * len(edges), dtype=np.int64)
+    cols[0::2] = edges
+    cols[1::2] = np.append(edges[1:], n) - 1
+    return cols, out
+
+
+_CACHE: "OrderedDict[Hashable, object]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def cached_decimation(key: Hashable, compute: Callable[[], object]):
+    """
+    compute() behind a small LRU keyed on `key` - by convention (data
+    version, zoom range, pixel width, method). Results are shared, read-only.
+    """
+    with _CACHE_LOCK:
+        if key in _CACHE:
+            _CACHE.move_to_end(key)
+            return _CACHE[key]
+    result = compute()
+    with _CACHE_LOCK:
+        _CACHE[key] = result
+        while len(_CACHE) > CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    return result
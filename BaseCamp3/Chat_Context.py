@@ -0,0 +1,108 @@
+"""
+Token-budgeted conversation context for multi-turn chat
+
+Keeps the recent turns of a session with a running token count and folds
+turns that no longer fit the budget into a short rolling summary. Each turn
+is counted once when it is added, so building the next prompt only walks
+the turns that fit - prompt size per turn stays bounded however long the
+conversation gets.
+
+Token counts are an estimate (~4 characters per token), which is close
+enough for budgeting without shipping a tokenizer.
+"""
+import re
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD = 4          # role / separators per chat message
+
+
+def count_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD
+
+
+def extractive_summary(summary: str, role: str, content: str, max_words: int = 30) -> str:
+    """
+    Default folding: keep the first sentence (up to max_words) of the old turn.
+    Cheap and local - no extra LLM call per turn.
+    """
+    first = re.split(r"(?<=[.!?])\s", content.strip(), maxsplit=1)[0]
+    words = first.split()
+    line = " ".join(words[:max_words]) + (" ..." if len(words) > max_words else "")
+    who = "User" if role == "user" else "Assistant"
+    return (summary + "\n" if summary else "") + f"- {who}: {line}"
+
+
+class ConversationContext:
+    """
+    Recent turns + rolling summary, kept within `budget` tokens.
+
+    budget          tokens allowed for history (recent turns + summary) per request
+    summary_budget  cap for the rolling summary; its oldest lines are dropped past it
+    summarizer      f(summary, role, content) -> new summary, for folding a turn
+    """
+
+    def __init__(self, budget: int = 3000, summary_budget: int = 400,
+                 summarizer: Optional[Callable[[str, str, str], str]] = None):
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.summarizer = summarizer or extractive_summary
+
+        self.turns: deque = deque()     # (role, content, tokens)
+        self.turn_tokens = 0            # running sum over self.turns
+        self.summary = ""
+        self.summary_tokens = 0
+        self.folded_turns = 0
+
+    def add(self, role: str, content: str) -> None:
+        """
+        Append a turn and fold the oldest ones into the summary while over budget.
+        """
+        tokens = count_tokens(content)
+        self.turns.append((role, content, tokens))
+        self.turn_tokens += tokens
+        while len(self.turns) > 1 and self.turn_tokens + self.summary_tokens > self.budget:
+            self._fold_oldest()
+
+    def _fold_oldest(self) -> None:
+        role, content, tokens = self.turns.popleft()
+        self.turn_tokens -= tokens
+        self.folded_turns += 1
+
+        summary = self.summarizer(self.summary, role, content)
+        # keep the summary itself bounded: drop its oldest lines
+        lines = summary.split("\n")
+        while len(lines) > 1 and count_tokens("\n".join(lines)) > self.summary_budget:
+            lines.pop(0)
+        self.summary = "\n".join(lines)
+        self.summary_tokens = count_tokens(self.summary)
+
+    def history(self, reserve: int = 0) -> List[Dict[str, str]]:
+        """
+        Messages to send before the new user prompt: the summary (if any) and
+        as many recent turns as fit in budget - reserve tokens.
+        """
+        available = self.budget - reserve - self.summary_tokens
+        picked = []
+        for role, content, tokens in reversed(self.turns):
+            if tokens > available:
+                break
+            picked.append({"role": role, "content": content})
+            available -= tokens
+        picked.reverse()
+
+        if self.summary:
+            picked.insert(0, {"role": "system",
+                              "content": "Summary of the earlier conversation:\n" + self.summary})
+        return picked
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "turns": len(self.turns),
+            "turn_tokens": self.turn_tokens,
+            "summary_tokens": self.summary_tokens,
+            "folded_turns": self.folded_turns,
+            "budget": self.budget,
+        }
@@ -0,0 +1,112 @@
+"""
+Append-only chat log per session, with constant-time tail reads
+
+Each session is two files in CHAT_SESSIONS_DIR (default ./chat_sessions):
+    <session_id>.jsonl  one JSON message per line, only ever appended to
+    <session_id>.idx    byte offset of every message, 8 bytes each
+
+Message i starts at offset idx[i], so the count is the .idx size / 8 and
+the last N messages (or any page) are read with two seeks - restoring a
+10k-message session costs the same as a 10-message one, with no replay.
+
+The .jsonl line is written before its offset, so after a crash the index
+never points past the log; a torn trailing offset is dropped on open.
+"""
+import json
+import os
+import re
+import struct
+import threading
+import uuid
+from typing import Dict, List, Optional
+
+
+SESSIONS_DIR = os.environ.get("CHAT_SESSIONS_DIR", "chat_sessions")
+OFFSET = struct.Struct("<Q")
+SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def valid_session_id(session_id: Optional[str]) -> bool:
+    # session ids come from the URL and become file names
+    return bool(session_id) and bool(SESSION_ID_RE.match(session_id))
+
+
+class ChatLog:
+    """
+    One session's messages: append(), len(), tail(n), page(start, stop).
+    """
+
+    def __init__(self, session_id: str, root: str = SESSIONS_DIR):
+        if not valid_session_id(session_id):
+            raise ValueError(f"invalid session id: {session_id!r}")
+        os.makedirs(root, exist_ok=True)
+        self.session_id = session_id
+        self.log_path = os.path.join(root, f"{session_id}.jsonl")
+        self.idx_path = os.path.join(root, f"{session_id}.idx")
+        self._lock = threading.Lock()
+        self._count = self._recover()
+
+    def _recover(self) -> int:
+        """
+        Count from the index size, dropping a torn or dangling last offset.
+        """
+        if not os.path.exists(self.idx_path):
+            return 0
+        size = os.path.getsize(self.idx_path)
+        count = size // OFFSET.size
+        log_size = os.path.getsize(self.log_path) if os.path.exists(self.log_path) else 0
+        with open(self.idx_path, "r+b") as f:
+            while count:
+                f.seek((count - 1) * OFFSET.size)
+                if OFFSET.unpack(f.read(OFFSET.size))[0] < log_size:
+                    break
+                count -= 1
+            if count * OFFSET.size != size:
+                f.truncate(count * OFFSET.size)
+        return count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, message: Dict) -> None:
+        line = (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            with open(self.log_path, "ab") as log:
+                offset = log.tell()
+                log.write(line)
+            with open(self.idx_path, "ab") as idx:
+                idx.write(OFFSET.pack(offset))
+            self._count += 1
+
+    def page(self, start: int, stop: int) -> List[Dict]:
+        """
+        Messages [start, stop) - reads only those lines.
+        """
+        with self._lock:
+            count = self._count
+        start, stop = max(0, start), min(stop, count)
+        if start >= stop:
+            return []
+
+        with open(self.idx_path, "rb") as idx:
+            idx.seek(start * OFFSET.size)
+            first = OFFSET.unpack(idx.read(OFFSET.size))[0]
+            end = None
+            if stop < count:
+                idx.seek(stop * OFFSET.size)
+                end = OFFSET.unpack(idx.read(OFFSET.size))[0]
+
+        with open(self.log_path, "rb") as log:
+            log.seek(first)
+            data = log.read() if end is None else log.read(end - first)
+        # a line appended after `count` was read may be in `data` - keep only the page
+        lines = data.splitlines()[:stop - start]
+        return [json.loads(line) for line in lines]
+
+    def tail(self, n: int) -> List[Dict]:
+        count = len(self)
+        return self.page(count - n, count)
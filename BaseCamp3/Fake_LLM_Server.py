@@ -0,0 +1,142 @@
+"""
+Local OpenAI-compatible stub of the Groq chat completions API
+
+Answers POST /openai/v1/chat/completions (the path the Groq SDK uses) and
+/v1/chat/completions, streaming (SSE) and non-streaming, with a canned reply.
+No API key or network is needed, so chat code can be benchmarked locally.
+
+Latency is set with environment variables (or the command line flags):
+    FAKE_LLM_TTFT            seconds before the first token      (default 0.0)
+    FAKE_LLM_TOKENS_PER_SEC  streaming rate, 0 = no delay         (default 0)
+    FAKE_LLM_REPLY_TOKENS    words in the canned reply            (default 40)
+
+Fault injection, for testing retries and failover (LLM_Resilience):
+    FAKE_LLM_JITTER          extra random delay, 0..JITTER seconds (default 0.0)
+    FAKE_LLM_ERROR_RATE      fraction of calls answered with 503   (default 0.0)
+    FAKE_LLM_429_RATE        fraction answered with 429 + Retry-After (default 0.0)
+    FAKE_LLM_FAULT_MODELS    comma separated models the faults and jitter
+                             apply to, empty = every model         (default "")
+
+Run:
+    python Fake_LLM_Server.py --port 5700 --ttft 0.2 --tps 200
+    python Fake_LLM_Server.py --error-rate 0.5 --fault-models llama-3.3-70b-versatile
+Point the Groq client at it:
+    Groq(api_key="any", base_url="http://127.0.0.1:5700")   # or GROQ_BASE_URL
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+TTFT = float(os.environ.get("FAKE_LLM_TTFT", 0.0))
+TOKENS_PER_SEC = float(os.environ.get("FAKE_LLM_TOKENS_PER_SEC", 0))
+REPLY_TOKENS = int(os.environ.get("FAKE_LLM_REPLY_TOKENS", 40))
+JITTER = float(os.environ.get("FAKE_LLM_JITTER", 0.0))
+ERROR_RATE = float(os.environ.get("FAKE_LLM_ERROR_RATE", 0.0))
+RATE_LIMIT_RATE = float(os.environ.get("FAKE_LLM_429_RATE", 0.0))
+FAULT_MODELS = {m for m in os.environ.get("FAKE_LLM_FAULT_MODELS", "").split(",") if m}
+
+WORDS = ("this is a canned reply from the local fake model used for "
+         "benchmarks and tests of the chat stack").split()
+
+app = FastAPI(title="Fake LLM")
+
+
+def canned_reply(n_tokens: int) -> list:
+    return [WORDS[i % len(WORDS)] + " " for i in range(n_tokens)]
+
+
+def usage_block(messages, n_tokens: int) -> dict:
+    # rough prompt size: 1 token ~ 4 characters
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4 + 1
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": n_tokens,
+            "total_tokens": prompt_tokens + n_tokens}
+
+
+def injected_fault(model: str):
+    """
+    Error response to send instead of a reply, or None.
+    """
+    if FAULT_MODELS and model not in FAULT_MODELS:
+        return None
+    roll = random.random()
+    if roll < RATE_LIMIT_RATE:
+        return JSONResponse({"error": {"message": "Rate limit reached (fake)", "type": "rate_limit"}},
+                            status_code=429, headers={"retry-after": "0.2"})
+    if roll < RATE_LIMIT_RATE + ERROR_RATE:
+        return JSONResponse({"error": {"message": "Service unavailable (fake)", "type": "server"}},
+                            status_code=503)
+    return None
+
+
+def chunk(cid: str, model: str, delta: dict, finish=None, usage=None) -> str:
+    body = {"id": cid, "object": "chat.completion.chunk", "created": int(time.time()),
+            "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+    if usage is not None:
+        body["x_groq"] = {"id": cid, "usage": usage}
+    return f"data: {json.dumps(body)}\n\n"
+
+
+@app.post("/openai/v1/chat/completions")
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "fake-model")
+    messages = body.get("messages", [])
+    tokens = canned_reply(int(body.get("max_tokens") or REPLY_TOKENS))
+    usage = usage_block(messages, len(tokens))
+    cid = f"chatcmpl-{uuid.uuid4().hex}"
+    per_token = 1 / TOKENS_PER_SEC if TOKENS_PER_SEC > 0 else 0
+
+    if JITTER and (not FAULT_MODELS or model in FAULT_MODELS):
+        await asyncio.sleep(random.uniform(0, JITTER))
+    fault = injected_fault(model)
+    if fault is not None:
+        return fault
+
+    if body.get("stream"):
+        async def events():
+            await asyncio.sleep(TTFT)
+            yield chunk(cid, model, {"role": "assistant", "content": ""})
+            for tok in tokens:
+                yield chunk(cid, model, {"content": tok})
+                if per_token:
+                    await asyncio.sleep(per_token)
+            yield chunk(cid, model, {}, finish="stop", usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(TTFT + per_token * len(tokens))
+    return {
+        "id": cid, "object": "chat.completion", "created": int(time.time()), "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": "".join(tokens).strip()}}],
+        "usage": usage,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible fake LLM server")
+    parser.add_argument("--port", type=int, default=5700)
+    parser.add_argument("--ttft", type=float, default=TTFT)
+    parser.add_argument("--tps", type=float, default=TOKENS_PER_SEC)
+    parser.add_argument("--tokens", type=int, default=REPLY_TOKENS)
+    parser.add_argument("--jitter", type=float, default=JITTER)
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE)
+    parser.add_argument("--429-rate", dest="rate_limit_rate", type=float, default=RATE_LIMIT_RATE)
+    parser.add_argument("--fault-models", default=",".join(sorted(FAULT_MODELS)))
+    args = parser.parse_args()
+
+    TTFT, TOKENS_PER_SEC, REPLY_TOKENS = args.ttft, args.tps, args.tokens
+    JITTER, ERROR_RATE, RATE_LIMIT_RATE = args.jitter, args.error_rate, args.rate_limit_rate
+    FAULT_MODELS = {m for m in args.fault_models.split(",") if m}
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
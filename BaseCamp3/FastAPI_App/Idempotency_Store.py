@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+
+class IdempotencyConflict(Exception):
+    """
+    Raised when an Idempotency-Key is reused with a different request payload.
+    """
+
+
+# -------------------------
+# Helpers
+# -------------------------
+def fingerprint(payload: Any) -> str:
+    """
+    Stable hash of a request payload, used to detect key reuse with other data.
+    """
+    raw = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def store_path_for(csv_path: str, file_name: str = "idempotency_keys.jsonl") -> str:
+    """
+    Path of the key store, kept next to the user data file.
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), file_name)
+
+
+# -------------------------
+# Store
+# -------------------------
+class IdempotencyStore:
+    """
+    Bounded, TTL-evicted map of idempotency key -> stored response.
+
+    Entries are held in memory (an LRU ordered dict) so a replay is an O(1)
+    lookup, and appended to a JSONL file so they survive a restart. The file
+    is compacted once it grows well past the number of live entries.
+    Concurrent requests with the same key are coalesced: the first one runs,
+    the others wait for its result.
+    """
+
+    def __init__(self, path: str,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._file_lines = 0
+        self._load()
+
+    # ---- persistence ----
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        now = time.time()
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                self._file_lines += 1
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn write at the end of the file
+                if now - rec["created"] > self.ttl_seconds:
+                    continue
+                self._entries[rec["key"]] = rec
+                self._entries.move_to_end(rec["key"])
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _append(self, rec: Dict[str, Any]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec) + "\n")
+        self._file_lines += 1
+        if self._file_lines > 2 * self.max_entries:
+            self._compact()
+
+    def _compact(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for rec in self._entries.values():
+                f.write(json.dumps(rec) + "\n")
+        os.replace(tmp, self.path)
+        self._file_lines = len(self._entries)
+
+    # ---- lookup ----
+    def _get_live(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        rec = self._entries.get(key)
+        if rec is None:
+            return None
+        if now - rec["created"] > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return rec
+
+    def _put(self, rec: Dict[str, Any]) -> None:
+        self._entries[rec["key"]] = rec
+        self._entries.move_to_end(rec["key"])
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._append(rec)
+
+    # ---- public API ----
+    def run(self, key: str, request_hash: str,
+            fn: Callable[[], Tuple[int, Any]]) -> Tuple[int, Any, bool]:
+        """
+        Execute fn once per key and return (status_code, body, replayed).
+
+        fn returns (status_code, body). Only successful (2xx) results are
+        stored; if fn raises, the key is released so a retry can run again.
+        """
+        while True:
+            with self._lock:
+                rec = self._get_live(key, time.time())
+                if rec is not None:
+                    if rec["request_hash"] != request_hash:
+                        raise IdempotencyConflict(
+                            f"Idempotency-Key {key!r} was already used with a different payload")
+                    return rec["status_code"], rec["body"], True
+
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    done = threading.Event()
+                    self._inflight[key] = done
+                    break
+
+            # Another request with this key is running: wait, then re-check
+            waiter.wait()
+
+        try:
+            status_code, body = fn()
+            if 200 <= status_code < 300:
+                with self._lock:
+                    self._put({
+                        "key": key,
+                        "request_hash": request_hash,
+                        "status_code": status_code,
+                        "body": body,
+                        "created": time.time(),
+                    })
+            return status_code, body, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            done.set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
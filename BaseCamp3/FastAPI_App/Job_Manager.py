@@ -0,0 +1,262 @@
+import asyncio
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, Optional
+
+
+# -------------------------
+# Job states
+# -------------------------
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a job is submitted while its queue is at capacity.
+    """
+
+
+class UnknownTaskError(ValueError):
+    """
+    Raised for a task name that is not registered, or invalid task params.
+    """
+
+
+# -------------------------
+# Task functions
+# -------------------------
+def cpu_chunk(start: int, stop: int) -> float:
+    """
+    One slice of the CPU heavy loop from 12_Process.py's cpu_task.
+    Runs inside a worker process, so it must stay a top-level function.
+    """
+    res = 0.0
+    for i in range(start, stop):
+        res = res + (((i ** 2) + 2.0) * 1.45)
+    return res
+
+
+async def run_cpu_task(job: "Job", ctx: "JobContext") -> Dict[str, Any]:
+    """
+    cpu_task split into chunks on the process pool.
+    Progress is reported per chunk and cancellation is honoured between chunks.
+    """
+    counter = int(job.params.get("counter", 10_000_000))
+    if not 1 <= counter <= 1_000_000_000:
+        raise UnknownTaskError("counter must be between 1 and 1,000,000,000")
+
+    chunk = max(100_000, counter // 100)
+    total = 0.0
+    for start in range(0, counter, chunk):
+        stop = min(start + chunk, counter)
+        total += await ctx.run_cpu(cpu_chunk, start, stop)
+        job.progress = round(stop / counter, 4)
+    return {"counter": counter, "result": total}
+
+
+async def run_delay_task(job: "Job", ctx: "JobContext") -> Dict[str, Any]:
+    """
+    I/O style wait (the /test delay) that only holds an event-loop timer.
+    """
+    seconds = float(job.params.get("seconds", 5))
+    if not 0 <= seconds <= 3600:
+        raise UnknownTaskError("seconds must be between 0 and 3600")
+
+    steps = max(1, int(seconds * 10))
+    st = time.time()
+    for i in range(steps):
+        await asyncio.sleep(seconds / steps)
+        job.progress = round((i + 1) / steps, 4)
+    return {"entry": st, "exit": time.time()}
+
+
+# name -> (kind, coroutine). kind selects the queue: "cpu" or "io"
+TASKS: Dict[str, Any] = {
+    "cpu_task": ("cpu", run_cpu_task),
+    "delay": ("io", run_delay_task),
+}
+
+
+# -------------------------
+# Job model
+# -------------------------
+@dataclass
+class Job:
+    task: str
+    kind: str
+    params: Dict[str, Any]
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    progress: float = 0.0
+    result: Any = None
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class JobContext:
+    """
+    Executors handed to a running task.
+    """
+
+    def __init__(self, process_pool: ProcessPoolExecutor):
+        self._process_pool = process_pool
+
+    async def run_cpu(self, fn: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._process_pool, fn, *args)
+
+    async def run_io(self, fn: Callable, *args) -> Any:
+        # blocking I/O goes to the default thread executor
+        return await asyncio.to_thread(fn, *args)
+
+
+# -------------------------
+# Manager
+# -------------------------
+class JobManager:
+    """
+    Runs registered tasks in the background of the event loop.
+
+    CPU jobs and I/O jobs have their own bounded queue and worker coroutines;
+    CPU work itself executes on a process pool, so neither kind occupies the
+    threads that serve requests. Finished jobs are kept for result_ttl seconds.
+    """
+
+    def __init__(self, cpu_workers: Optional[int] = None, io_workers: int = 32,
+                 queue_size: int = 100, result_ttl: float = 600.0):
+        self.cpu_workers = cpu_workers or multiprocessing.cpu_count()
+        self.io_workers = io_workers
+        self.queue_size = queue_size
+        self.result_ttl = result_ttl
+
+        self.jobs: Dict[str, Job] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._ctx: Optional[JobContext] = None
+
+    # ---- lifecycle ----
+    async def start(self) -> None:
+        # 'spawn' keeps worker processes clean of the server's threads and locks
+        self._pool = ProcessPoolExecutor(max_workers=self.cpu_workers,
+                                         mp_context=multiprocessing.get_context("spawn"))
+        self._ctx = JobContext(self._pool)
+        self._queues = {"cpu": asyncio.Queue(self.queue_size),
+                        "io": asyncio.Queue(self.queue_size)}
+        for kind, n in (("cpu", self.cpu_workers), ("io", self.io_workers)):
+            for _ in range(n):
+                self._workers.append(asyncio.create_task(self._worker(kind)))
+        self._workers.append(asyncio.create_task(self._janitor()))
+
+    async def stop(self) -> None:
+        for t in list(self._running.values()) + self._workers:
+            t.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # ---- public API ----
+    def submit(self, task: str, params: Optional[Dict[str, Any]] = None) -> Job:
+        if task not in TASKS:
+            raise UnknownTaskError(f"unknown task {task!r}, expected one of {sorted(TASKS)}")
+        kind, _ = TASKS[task]
+        job = Job(task=task, kind=kind, params=dict(params or {}))
+        try:
+            self._queues[kind].put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError(f"{kind} job queue is full ({self.queue_size})")
+        self.jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job is not None and self._expired(job, time.time()):
+            self.jobs.pop(job_id, None)
+            return None
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        if job.status == QUEUED:
+            # the worker skips it when dequeued
+            self._finish(job, CANCELLED)
+        else:
+            task = self._running.get(job_id)
+            if task is not None:
+                task.cancel()
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "jobs": counts,
+            "queued": {k: q.qsize() for k, q in self._queues.items()},
+            "queue_size": self.queue_size,
+        }
+
+    # ---- internals ----
+    def _finish(self, job: Job, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished = time.time()
+
+    def _expired(self, job: Job, now: float) -> bool:
+        return job.finished is not None and now - job.finished > self.result_ttl
+
+    async def _worker(self, kind: str) -> None:
+        queue = self._queues[kind]
+        while True:
+            job = await queue.get()
+            try:
+                if job.status == QUEUED:
+                    await self._run(job)
+            finally:
+                queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        _, fn = TASKS[job.task]
+        job.status = RUNNING
+        job.started = time.time()
+        task = asyncio.create_task(fn(job, self._ctx))
+        self._running[job.job_id] = task
+        try:
+            result = await task
+            self._finish(job, SUCCEEDED, result=result)
+        except asyncio.CancelledError:
+            self._finish(job, CANCELLED)
+            # propagate only if the worker itself is being stopped
+            if asyncio.current_task().cancelling():
+                raise
+        except Exception as e:
+            self._finish(job, FAILED, error=str(e))
+        finally:
+            self._running.pop(job.job_id, None)
+
+    async def _janitor(self, interval: float = 5.0) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            now = time.time()
+            for job_id in [j for j, job in self.jobs.items() if self._expired(job, now)]:
+                self.jobs.pop(job_id, None)
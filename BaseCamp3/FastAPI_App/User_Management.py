@@ -1,7 +1,9 @@
 # from __future__ import annotations
 import pandas as pd
 import os
-from typing import Optional, Dict, Any
+import bisect
+import threading
+from typing import Optional, Dict, Any, Tuple, List, Iterable
 
 
 DEFAULT_CSV_PATH = "user_db.csv"
@@ -63,6 +65,79 @@ def _read_df(csv_path: str) -> pd.DataFrame:
     return pd.read_csv(csv_path, dtype=str)
 
 
+# -------------------------
+# CSV write helper
+# -------------------------
+# Every read-modify-write of the CSV holds _WRITE_LOCK, so concurrent writers
+# (e.g. batch chunks sent in parallel) never lose each other's rows. The file
+# is written to a temp name and renamed: readers never see a half-written CSV.
+_WRITE_LOCK = threading.Lock()
+
+
+def _write_df(df: pd.DataFrame, csv_path: str) -> None:
+    tmp = f"{csv_path}.tmp{os.getpid()}"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, csv_path)
+    invalidate_table()
+
+
+# -------------------------
+# In-memory table & index
+# -------------------------
+# The table is loaded once and kept in memory together with a
+# user_id -> row position index and the sorted list of user_ids (used for
+# cursor pagination). It is re-read only when the CSV changes on disk
+# (mtime / size), or after a write through this module.
+_TABLE_LOCK = threading.Lock()
+_TABLE_CACHE: Dict[str, Any] = {"key": None, "df": None, "index": None, "order": None}
+
+
+def _file_key(csv_path: str):
+    try:
+        st = os.stat(csv_path)
+    except FileNotFoundError:
+        return (csv_path, None, None)
+    return (csv_path, st.st_mtime_ns, st.st_size)
+
+
+def _build_index(df: pd.DataFrame) -> Dict[str, int]:
+    """
+    Build user_id -> row position lookup for O(1) reads.
+    """
+    if df.empty:
+        return {}
+    return {uid: pos for pos, uid in enumerate(df["user_id"].tolist())}
+
+
+def load_table(csv_path: str = DEFAULT_CSV_PATH) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Return the cached (dataframe, index) pair for the user table,
+    loading it from disk when it is missing or stale.
+    """
+    key = _file_key(csv_path)
+    with _TABLE_LOCK:
+        if _TABLE_CACHE["key"] != key or _TABLE_CACHE["df"] is None:
+            df = _read_df(csv_path).astype(str)
+            index = _build_index(df)
+            _TABLE_CACHE.update(key=key, df=df, index=index, order=sorted(index))
+        return _TABLE_CACHE["df"], _TABLE_CACHE["index"]
+
+
+def _load_order(csv_path: str = DEFAULT_CSV_PATH) -> Tuple[pd.DataFrame, Dict[str, int], List[str]]:
+    # (df, index, sorted user_ids) taken from one consistent cache snapshot
+    load_table(csv_path)
+    with _TABLE_LOCK:
+        return _TABLE_CACHE["df"], _TABLE_CACHE["index"], _TABLE_CACHE["order"]
+
+
+def invalidate_table() -> None:
+    """
+    Drop the cached table so the next read reloads it from disk.
+    """
+    with _TABLE_LOCK:
+        _TABLE_CACHE.update(key=None, df=None, index=None, order=None)
+
+
 # -------------------------
 # Public API
 # -------------------------
@@ -71,15 +146,16 @@ def read_user(user_id: str) -> Optional[Dict[str, Any]]:
     Read details for user_id and return a dict with masked email and phone.
     Returns Error if user not found.
     """
-    df = _read_df(DEFAULT_CSV_PATH)
-    if df.empty:
+    df, index = load_table(DEFAULT_CSV_PATH)
+    pos = index.get(user_id)
+    if pos is None:
         return "Data not found"
-    df = df.astype(str)
-    row = df.loc[df["user_id"] == user_id]
-    if row.empty:
-        return "Data not found"
-    r = row.iloc[0].to_dict()
-    
+    return _masked_row(df, pos)
+
+
+def _masked_row(df: pd.DataFrame, pos: int) -> Dict[str, Any]:
+    r = df.iloc[pos].to_dict()
+
     # mask email and phone in the returned payload
     r["email"] = mask_email(r.get("email", ""))
     r["phone_number"] = mask_phone(r.get("phone_number", ""))
@@ -87,6 +163,25 @@ def read_user(user_id: str) -> Optional[Dict[str, Any]]:
     return r
 
 
+def list_users(cursor: Optional[str] = None, limit: int = 50) -> Dict[str, Any]:
+    """
+    Return one page of masked users ordered by user_id, starting after `cursor`.
+    The page is located by binary search on the sorted ids, so the cost does
+    not depend on how deep into the table the cursor is.
+    Returns {"users": [...], "next_cursor": id or None, "total": n}
+    """
+    df, index, order = _load_order(DEFAULT_CSV_PATH)
+    start = bisect.bisect_right(order, cursor) if cursor else 0
+    page_ids = order[start:start + limit]
+    users = [_masked_row(df, index[uid]) for uid in page_ids]
+    has_more = start + limit < len(order)
+    return {
+        "users": users,
+        "next_cursor": page_ids[-1] if page_ids and has_more else None,
+        "total": len(order),
+    }
+
+
 def update_user(user_id: str, **fields) -> str:
     """
     Update user identified by user_id with provided keyword fields.
@@ -100,20 +195,21 @@ def update_user(user_id: str, **fields) -> str:
     if not update_fields:
         return "No updatable fields provided."
 
-    df = _read_df(DEFAULT_CSV_PATH)
-    if df.empty:
-        raise ValueError(f"user {user_id} not found")
+    with _WRITE_LOCK:
+        df = _read_df(DEFAULT_CSV_PATH)
+        if df.empty:
+            raise ValueError(f"user {user_id} not found")
 
-    mask = df["user_id"] == user_id
-    if not mask.any():
-        raise ValueError(f"user {user_id} not found")
+        mask = df["user_id"] == user_id
+        if not mask.any():
+            raise ValueError(f"user {user_id} not found")
 
-    # Update values (convert everything to str for CSV consistency)
-    for col, val in update_fields.items():
-        df.loc[mask, col] = str(val)
+        # Update values (convert everything to str for CSV consistency)
+        for col, val in update_fields.items():
+            df.loc[mask, col] = str(val)
 
-    # write data
-    df.to_csv (DEFAULT_CSV_PATH, index=False)
+        # write data
+        _write_df(df, DEFAULT_CSV_PATH)
     return f"user {user_id} updated successfully."
 
 
@@ -128,41 +224,107 @@ def add_user(user: Dict[str, Any]) -> str:
         missing = required - set(user.keys())
         raise ValueError(f"Missing fields for add_user: {missing}")
 
-    df = _read_df(DEFAULT_CSV_PATH)
+    with _WRITE_LOCK:
+        df = _read_df(DEFAULT_CSV_PATH)
 
-    # Determine next id
-    if df.empty:
-        next_num = 1
-    else:
-        # Extract numeric part of user_id starting after 'U_' (robust)
-        nums = []
-        for val in df["user_id"].astype(str).tolist():
-            try:
-                if isinstance(val, str) and val.startswith("U_"):
-                    nums.append(int(val.split("_", 1)[1]))
-            except Exception:
-                continue
-        next_num = max(nums) + 1 if nums else 1
-
-    new_id = f"U_{next_num:04d}"
-
-    # Append and persist: ensure we keep columns consistent
-    new_row = {
-        "user_id": new_id,
-        "name": str(user["name"]),
-        "age": str(user["age"]),
-        "city": str(user["city"]),
-        "email": str(user["email"]),
-        "phone_number": str(user["phone_number"]),
-    }
+        # Determine next id
+        new_id = f"U_{_next_user_num(df):04d}"
 
-    new_df = pd.DataFrame([new_row])
-    if df.empty:
-        out_df = new_df
-    else:
-        out_df = pd.concat([df, new_df], ignore_index=True)
+        # Append and persist: ensure we keep columns consistent
+        new_row = {
+            "user_id": new_id,
+            "name": str(user["name"]),
+            "age": str(user["age"]),
+            "city": str(user["city"]),
+            "email": str(user["email"]),
+            "phone_number": str(user["phone_number"]),
+        }
+
+        new_df = pd.DataFrame([new_row])
+        if df.empty:
+            out_df = new_df
+        else:
+            out_df = pd.concat([df, new_df], ignore_index=True)
 
-    # Write the data to file
-    out_df.to_csv (DEFAULT_CSV_PATH, index=False)    
+        # Write the data to file
+        _write_df(out_df, DEFAULT_CSV_PATH)
     return new_id
 
+
+def _next_user_num(df: pd.DataFrame) -> int:
+    if df.empty:
+        return 1
+    # Extract numeric part of user_id starting after 'U_' (robust)
+    nums = []
+    for val in df["user_id"].astype(str).tolist():
+        try:
+            if isinstance(val, str) and val.startswith("U_"):
+                nums.append(int(val.split("_", 1)[1]))
+        except Exception:
+            continue
+    return max(nums) + 1 if nums else 1
+
+
+# -------------------------
+# Batch API (one read + one write per batch)
+# -------------------------
+def add_users(users: List[Dict[str, Any]]) -> List[str]:
+    """
+    Add many users with a single file write.
+    Each user is a dict like for add_user. Returns the new user_ids in order.
+    """
+    required = {"name", "age", "city", "email", "phone_number"}
+    for i, user in enumerate(users):
+        missing = required - set(user.keys())
+        if missing:
+            raise ValueError(f"Missing fields for add_users (item {i}): {missing}")
+    if not users:
+        return []
+
+    with _WRITE_LOCK:
+        df = _read_df(DEFAULT_CSV_PATH)
+        next_num = _next_user_num(df)
+
+        new_rows = []
+        for i, user in enumerate(users):
+            new_rows.append({"user_id": f"U_{next_num + i:04d}",
+                             **{k: str(user[k]) for k in ["name", "age", "city", "email", "phone_number"]}})
+
+        new_df = pd.DataFrame(new_rows)
+        out_df = new_df if df.empty else pd.concat([df, new_df], ignore_index=True)
+
+        _write_df(out_df, DEFAULT_CSV_PATH)
+    return [r["user_id"] for r in new_rows]
+
+
+def update_users(updates: Iterable[Tuple[str, Dict[str, Any]]]) -> List[Tuple[int, str]]:
+    """
+    Apply many (user_id, fields) updates with a single file write.
+    Returns (status code, message) per update, as PATCH /user would answer it:
+    200 updated, 404 unknown id, 400 no updatable fields. Nothing is raised.
+    """
+    allowed = {"name", "age", "city", "email", "phone_number"}
+    with _WRITE_LOCK:
+        df = _read_df(DEFAULT_CSV_PATH)
+        positions = _build_index(df.astype(str))
+
+        results = []
+        changed = False
+        for user_id, fields in updates:
+            update_fields = {k: v for k, v in fields.items() if k in allowed}
+            pos = positions.get(user_id)
+            if pos is None:
+                results.append((404, f"user {user_id} not found"))
+                continue
+            if not update_fields:
+                results.append((400, "No updatable fields provided."))
+                continue
+            for col, val in update_fields.items():
+                df.iat[pos, df.columns.get_loc(col)] = str(val)
+            changed = True
+            results.append((200, f"user {user_id} updated successfully."))
+
+        if changed:
+            _write_df(df, DEFAULT_CSV_PATH)
+    return results
+
@@ -1,11 +1,22 @@
-from typing import Optional, Annotated
-from fastapi import FastAPI, HTTPException, Body, Query, status, Depends
+from typing import Optional, Annotated, Dict, Any, List
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Body, Query, Header, status, Depends
+from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel, Field, EmailStr, constr, StringConstraints
+from pydantic import BaseModel, ConfigDict, Field, EmailStr, constr, StringConstraints, ValidationError
+from pydantic import model_validator
 import uvicorn
+import asyncio
+import logging
+import time
 import os
 
-from User_Management import read_user, add_user, update_user
+from User_Management import read_user, add_user, update_user, list_users, load_table, DEFAULT_CSV_PATH
+from User_Management import add_users, update_users
+from Idempotency_Store import IdempotencyStore, IdempotencyConflict, fingerprint, store_path_for
+from Job_Manager import JobManager, QueueFullError, UnknownTaskError, TASKS
+
+logger = logging.getLogger("uvicorn.error")
 
 # This creates a security scheme for Swagger UI
 bearer_scheme = HTTPBearer(auto_error=True)
@@ -26,9 +37,6 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(bearer_sche
 PhoneRegex = r"^\+91-\d{5}-\d{5}$"
 PhoneNumber = Annotated[str, StringConstraints(pattern=PhoneRegex)]
 
-app = FastAPI(title="User Data Management")
-
-
 # -------------------------
 # Pydantic Models
 # -------------------------
@@ -49,6 +57,192 @@ class UserUpdateModel(BaseModel):
     phone_number: Optional[PhoneNumber] = None
 
 
+def _validation_detail(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(x) for x in err['loc'])}: {err['msg']}" for err in e.errors())
+
+
+# Items are validated one by one, so a bad row does not reject the whole batch
+MAX_BATCH_ITEMS = 1000
+
+class UserBatchModel(BaseModel):
+    adds: List[Dict[str, Any]] = Field(default_factory=list, max_length=MAX_BATCH_ITEMS)
+    updates: List[Dict[str, Any]] = Field(default_factory=list, max_length=MAX_BATCH_ITEMS)
+
+
+# Params per task, checked when the job is submitted rather than when it runs
+class CpuTaskParams(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    counter: int = Field(10_000_000, ge=1, le=1_000_000_000)
+
+
+class DelayTaskParams(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    seconds: float = Field(5, ge=0, le=3600)
+
+
+TASK_PARAMS = {"cpu_task": CpuTaskParams, "delay": DelayTaskParams}
+
+
+class JobCreateModel(BaseModel):
+    task: str = Field(..., description=f"One of: {', '.join(sorted(TASKS))}")
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+    @model_validator(mode="after")
+    def check_params(self):
+        # unknown task names are left to JobManager.submit (400)
+        params_model = TASK_PARAMS.get(self.task)
+        if params_model is not None:
+            try:
+                self.params = params_model.model_validate(self.params).model_dump()
+            except ValidationError as e:
+                raise ValueError(f"params for {self.task}: {_validation_detail(e)}")
+        return self
+
+
+# -------------------------
+# Idempotency
+# -------------------------
+# Key -> response store, persisted next to the user data
+IDEMPOTENCY_STORE = IdempotencyStore(
+    store_path_for(DEFAULT_CSV_PATH),
+    max_entries=int(os.environ.get("IDEMPOTENCY_MAX_KEYS", 10000)),
+    ttl_seconds=float(os.environ.get("IDEMPOTENCY_TTL_SECONDS", 24 * 60 * 60)),
+)
+
+
+def run_idempotent(scope: str, key: Optional[str], payload: Dict[str, Any],
+                   handler, success_code: int = 200):
+    """
+    Run handler() at most once per Idempotency-Key.
+    Without a key the handler simply runs. A retried key returns the stored
+    response (flagged with 'Idempotent-Replayed: true') without touching storage.
+    """
+    if not key:
+        return handler()
+
+    try:
+        code, body, replayed = IDEMPOTENCY_STORE.run(
+            f"{scope}:{key}", fingerprint(payload), lambda: (success_code, handler()))
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    headers = {"Idempotent-Replayed": "true"} if replayed else {}
+    return JSONResponse(status_code=code, content=body, headers=headers)
+
+
+# -------------------------
+# Warmup & readiness
+# -------------------------
+# Fallback record used to exercise the validators when the table is empty
+SAMPLE_USER = {
+    "name": "Sample User",
+    "age": 30,
+    "city": "Chennai",
+    "email": "sample.user@example.com",
+    "phone_number": "+91-98765-43210",
+}
+
+WARMUP_STATE: Dict[str, Any] = {
+    "ready": False,
+    "stage": "starting",
+    "steps": [],
+    "error": None,
+}
+
+
+def _warmup_step(name: str, fn):
+    """
+    Run one warmup step, record its duration and log progress.
+    """
+    WARMUP_STATE["stage"] = name
+    logger.info("warmup: %s ...", name)
+    t0 = time.perf_counter()
+    result = fn()
+    ms = round((time.perf_counter() - t0) * 1000, 2)
+    WARMUP_STATE["steps"].append({"step": name, "ms": ms})
+    logger.info("warmup: %s done in %s ms", name, ms)
+    return result
+
+
+def _sample_record(df) -> Dict[str, Any]:
+    # Take the first stored user as the sample, if it passes validation
+    if not df.empty:
+        row = df.iloc[0].to_dict()
+        sample = {k: row.get(k) for k in SAMPLE_USER}
+        try:
+            UserCreateModel.model_validate(sample)
+            return sample
+        except ValidationError:
+            pass
+    return dict(SAMPLE_USER)
+
+
+def run_warmup() -> None:
+    """
+    Preload the user table + index and warm the Pydantic validators,
+    so the first real request does not pay for it.
+    """
+    try:
+        df, index = _warmup_step("load_user_table", lambda: load_table(DEFAULT_CSV_PATH))
+        sample = _warmup_step("validate_sample", lambda: _sample_record(df))
+        _warmup_step("warm_update_schema",
+                     lambda: UserUpdateModel.model_validate({"user_id": "U_0000", **sample}))
+        if index:
+            _warmup_step("warm_read_path", lambda: read_user(next(iter(index))))
+
+        WARMUP_STATE["ready"] = True
+        WARMUP_STATE["stage"] = "ready"
+        logger.info("warmup: complete (%d users indexed)", len(index))
+
+    except Exception as e:
+        WARMUP_STATE["stage"] = "failed"
+        WARMUP_STATE["error"] = str(e)
+        logger.exception("warmup failed")
+
+
+# Background jobs: CPU work on a process pool, I/O work on the event loop
+JOB_MANAGER = JobManager(
+    cpu_workers=int(os.environ.get("JOB_CPU_WORKERS", 0)) or None,
+    io_workers=int(os.environ.get("JOB_IO_WORKERS", 32)),
+    queue_size=int(os.environ.get("JOB_QUEUE_SIZE", 100)),
+    result_ttl=float(os.environ.get("JOB_RESULT_TTL_SECONDS", 600)),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warmup runs in a worker thread, so /healthz answers while it is in progress
+    warmup_task = asyncio.create_task(asyncio.to_thread(run_warmup))
+    await JOB_MANAGER.start()
+    yield
+    await JOB_MANAGER.stop()
+    if not warmup_task.done():
+        warmup_task.cancel()
+
+
+app = FastAPI(title="User Data Management", lifespan=lifespan)
+
+
+# -------------------------
+# GET /healthz, /readyz
+# -------------------------
+@app.get("/healthz", summary="Liveness")
+def healthz():
+    """
+    Liveness probe: the process is up and serving.
+    """
+    return {"status": "ok"}
+
+
+@app.get("/readyz", summary="Readiness")
+def readyz():
+    """
+    Readiness probe: 200 only after warmup is complete, 503 otherwise.
+    """
+    code = status.HTTP_200_OK if WARMUP_STATE["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=code, content=WARMUP_STATE)
+
+
 # -------------------------
 # GET /user
 # -------------------------
@@ -70,15 +264,33 @@ def get_user(user_id: str = Query(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# -------------------------
+# GET /users
+# -------------------------
+@app.get("/users", summary="List Users")
+def get_users(cursor: Optional[str] = Query(None, description="user_id to start after (next_cursor of the previous page)"),
+              limit: int = Query(50, ge=1, le=500)):
+    """
+    Cursor paginated, masked user listing ordered by user_id.
+    Pass the returned next_cursor to get the following page; it is null on the last page.
+    """
+    try:
+        return list_users(cursor=cursor, limit=limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # -------------------------
 # PATCH /user
 # -------------------------
 @app.patch("/user", summary="Update User")
 def patch_user(payload: UserUpdateModel = Body(...),
-               token: str = Depends(verify_token)):
+               token: str = Depends(verify_token),
+               idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
     """
     Partial user update.
-    for given user id, the provided fields are updated in the DB
+    for given user id, the provided fields are updated in the DB.
+    Send an Idempotency-Key header to make client retries safe.
     """
     body = payload.model_dump (exclude_unset=True)
     user_id = body.pop("user_id")
@@ -88,17 +300,21 @@ def patch_user(payload: UserUpdateModel = Body(...),
     if not body:
         raise HTTPException(400, detail="No updatable fields provided")
 
-    try:
-        msg = update_user(user_id, **body)
+    def _update():
+        try:
+            msg = update_user(user_id, **body)
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to update user: {e}")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to update user: {e}")
+
+        updated_user = read_user(user_id)
+        if updated_user is None:
+            raise HTTPException(500, detail="Updated user not found")
+
+        return {"message": msg, "user": updated_user}
 
-    updated_user = read_user(user_id)
-    if updated_user is None:
-        raise HTTPException(500, detail="Updated user not found")
-    
-    return {"message": msg, "user": updated_user}
+    return run_idempotent("PATCH /user", idempotency_key,
+                          {"user_id": user_id, **body}, _update)
 
 
 # -------------------------
@@ -106,18 +322,123 @@ def patch_user(payload: UserUpdateModel = Body(...),
 # -------------------------
 @app.post("/add_user", summary="Add User", status_code=201)
 def create_user(payload: UserCreateModel = Body(...),
-                token: str = Depends(verify_token)):
+                token: str = Depends(verify_token),
+                idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
+    """
+    Create a new user. Provided the details, it adds to DB and returns the user id.
+    Send an Idempotency-Key header so a retried request does not add a duplicate user.
+    """
+    def _create():
+        try:
+            new_id = add_user(dict(payload))
+
+        except Exception as e:
+            raise HTTPException(500, detail=str(e))
+
+        return {"user_id": new_id}
+
+    return run_idempotent("POST /add_user", idempotency_key,
+                          payload.model_dump(), _create, success_code=201)
+
+
+# -------------------------
+# POST /users/batch
+# -------------------------
+
+@app.post("/users/batch", summary="Batch Add / Update Users")
+def batch_users(payload: UserBatchModel = Body(...),
+                token: str = Depends(verify_token),
+                idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
     """
-    Create a new user. Provided the details, it adds to DB and returns the user id
-    
+    Add and/or update up to 1000 users each in one request, with one file write per kind.
+    Returns a result per item, in input order:
+    {"adds": [{"ok", "status_code", "user_id" | "detail"}], "updates": [...]}
+    """
+    def _run():
+        add_results: List[Dict[str, Any]] = [{} for _ in payload.adds]
+        valid_adds = []
+        for i, item in enumerate(payload.adds):
+            try:
+                valid_adds.append((i, UserCreateModel.model_validate(item).model_dump()))
+            except ValidationError as e:
+                add_results[i] = {"ok": False, "status_code": 422, "detail": _validation_detail(e)}
+
+        update_results: List[Dict[str, Any]] = [{} for _ in payload.updates]
+        valid_updates = []
+        for i, item in enumerate(payload.updates):
+            try:
+                body = UserUpdateModel.model_validate(item).model_dump(exclude_unset=True)
+            except ValidationError as e:
+                update_results[i] = {"ok": False, "status_code": 422, "detail": _validation_detail(e)}
+                continue
+            user_id = body.pop("user_id")
+            valid_updates.append((i, user_id, {k: v for k, v in body.items() if v is not None}))
+
+        try:
+            new_ids = add_users([u for _, u in valid_adds])
+            outcomes = update_users([(uid, f) for _, uid, f in valid_updates])
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Batch failed: {e}")
+
+        for (i, _), new_id in zip(valid_adds, new_ids):
+            add_results[i] = {"ok": True, "status_code": 201, "user_id": new_id}
+        for (i, uid, _), (status_code, msg) in zip(valid_updates, outcomes):
+            update_results[i] = {"ok": status_code == 200, "status_code": status_code,
+                                 "user_id": uid, "detail": msg}
+
+        return {"adds": add_results, "updates": update_results}
+
+    return run_idempotent("POST /users/batch", idempotency_key, payload.model_dump(), _run)
+
+
+# -------------------------
+# Background jobs
+# -------------------------
+@app.post("/jobs", summary="Submit Job", status_code=202)
+async def submit_job(payload: JobCreateModel = Body(...),
+                     token: str = Depends(verify_token)):
+    """
+    Queue a long running task and return its job id immediately.
+    Poll GET /jobs/{job_id} for progress and result.
     """
     try:
-        new_id = add_user(dict(payload))
+        job = JOB_MANAGER.submit(payload.task, payload.params)
+    except UnknownTaskError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e))
+
+    return {"job_id": job.job_id, "status": job.status}
+
+
+@app.get("/jobs", summary="Job Stats")
+async def job_stats():
+    """
+    Job counts per state and current queue depth.
+    """
+    return JOB_MANAGER.stats()
 
-    except Exception as e:
-        raise HTTPException(500, detail=str(e))
 
-    return {"user_id": new_id}
+@app.get("/jobs/{job_id}", summary="Get Job")
+async def get_job(job_id: str):
+    """
+    Status, progress (0..1) and, once finished, the result or error of a job.
+    """
+    job = JOB_MANAGER.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"job {job_id} not found")
+    return job.to_dict()
+
+
+@app.delete("/jobs/{job_id}", summary="Cancel Job")
+async def cancel_job(job_id: str, token: str = Depends(verify_token)):
+    """
+    Cancel a queued or running job.
+    """
+    job = JOB_MANAGER.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"job {job_id} not found")
+    return job.to_dict()
 
 
 # -------------------------
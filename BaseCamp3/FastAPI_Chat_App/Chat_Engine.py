@@ -0,0 +1,178 @@
+"""
+Chat engine: personas, message building and the chat calls
+
+Shared by the Streamlit chat bot and by scripts (benchmarks, tests) that
+cannot import a Streamlit page. The LLM backend is a ChatProvider
+(LLM_Providers): Groq by default, or the offline fake with LLM_PROVIDER=fake.
+
+Every call is recorded in LLM_Telemetry (queue time, TTFT, latency, tokens,
+model). Callers that waited for a slot before calling put the wait in
+stats["queue_s"] first.
+
+Personas in GROUNDED_PERSONAS also get the most relevant passages of the
+local course docs (Doc_Retrieval), within DOC_TOKEN_BUDGET tokens.
+"""
+import os
+import time
+
+from Doc_Retrieval import get_doc_index
+from LLM_Providers import ChatProvider, get_provider
+from LLM_Telemetry import get_telemetry
+from Response_Cache import make_key
+
+
+# System prompt for Various Characters
+CHARACTER_SYSTEM_PROMPTS = {
+    "Philosopher": (
+        "You are a thoughtful philosopher. "
+        "Respond in a reflective, calm, and sometimes abstract terms, "
+        "providing analogies and deeper meaning."
+    ),
+    "Techie": (
+        "You are a practical, detail-oriented engineer. "
+        "Repond with explaining things clearly, with examples, and keep a technical tone."
+    ),
+    "Politician": (
+        "You are a diplomatic politician, who has a societal and patriotic view"
+        "You always spean in a careful, optimistic, and often in a balanced, "
+        "non-committal way."
+    ),
+    "Friend": (
+        "You are a warm, supportive friend. You are eager to understand and participate."
+        "You respond casually, with empathy and encouragement & some times witty"
+    ),
+    "Kid": (
+        "You are a curious kid. "
+        "You ask simple questions, use simple words, and sound playful."
+    ),
+}
+
+# Model and sampling params (also part of the response cache key)
+MODEL = "llama-3.3-70b-versatile"
+# Used when MODEL is failing or slow (see LLM_Resilience)
+FALLBACK_MODEL = "openai/gpt-oss-120b"
+SAMPLING_PARAMS = {"stop": None}
+
+ERROR_REPLY = "Error invoking LLM"
+
+
+# Personas answered with reference passages from the repo docs; 0 tokens turns it off
+GROUNDED_PERSONAS = {"Techie"}
+DOC_TOKEN_BUDGET = int(os.environ.get("CHAT_DOC_TOKENS", 600))
+
+
+def doc_context(character: str, prompt: str) -> str:
+    if character not in GROUNDED_PERSONAS or DOC_TOKEN_BUDGET <= 0:
+        return ""
+    return get_doc_index().context_for(prompt, DOC_TOKEN_BUDGET)
+
+
+def build_messages(character: str, prompt: str, history: list = None) -> list:
+    system_prompt = CHARACTER_SYSTEM_PROMPTS.get(character, "Respond to User Query")
+    docs = doc_context(character, prompt)
+    return [
+        {"role": "system", "content": system_prompt},
+        *([{"role": "system",
+            "content": "Reference notes from the course docs, use them where they help:\n\n" + docs}]
+          if docs else []),
+        *(history or []),
+        {"role": "user", "content": prompt},
+    ]
+
+
+def record_call(character: str, stats: dict, ok: bool, stream: bool, caller_queue_s: float) -> None:
+    # the provider's own rate-limiter wait is queue time, not request time
+    provider_queue_s = stats.get("queue_s", 0.0) - caller_queue_s
+    ttft = stats.get("ttft")
+    get_telemetry().record(
+        persona=character, model=stats.get("model"), ok=ok, stream=stream,
+        queue_s=stats.get("queue_s", 0.0),
+        ttft_s=None if ttft is None else ttft - provider_queue_s,
+        total_s=stats["total"] - provider_queue_s,
+        prompt_tokens=stats.get("prompt_tokens"), completion_tokens=stats.get("tokens"),
+    )
+
+
+# Chat Function
+# history: earlier turns to send before the prompt (see Chat_Context)
+# stats (optional dict) gets "model" and "tokens" when the provider reports them
+def chat(api_key: str, character: str, prompt: str, history: list = None,
+         provider: ChatProvider = None, stats: dict = None) -> str:
+
+    # Groq (pooled client + retries / fallback) unless another provider is given
+    provider = provider or get_provider(api_key, [MODEL, FALLBACK_MODEL])
+    stats = {} if stats is None else stats
+    caller_queue_s = stats.get("queue_s", 0.0)
+    t0 = time.perf_counter()
+    ok = False
+    try :
+        reply = provider.complete(build_messages(character, prompt, history), stats,
+                                  **SAMPLING_PARAMS)
+        ok = True
+        return reply
+    except Exception:
+        return ERROR_REPLY
+    finally:
+        stats["total"] = time.perf_counter() - t0
+        record_call(character, stats, ok, False, caller_queue_s)
+
+
+# Streaming Chat Function
+def chat_stream(api_key: str, character: str, prompt: str, stats: dict, history: list = None,
+                provider: ChatProvider = None):
+    """
+    Same request as chat(), streamed.
+    Yields the reply text piece by piece as tokens arrive and fills `stats` with
+    ttft (s), total (s), tokens, tokens_per_sec and model.
+    Retries / fallback happen before the first token; later errors are raised
+    to the caller, after whatever was already yielded.
+    """
+    provider = provider or get_provider(api_key, [MODEL, FALLBACK_MODEL])
+
+    caller_queue_s = stats.get("queue_s", 0.0)
+    t0 = time.perf_counter()
+    pieces = 0
+    ok = False
+    try:
+        for delta in provider.stream(build_messages(character, prompt, history), stats,
+                                     **SAMPLING_PARAMS):
+            if "ttft" not in stats:
+                stats["ttft"] = time.perf_counter() - t0
+            pieces += 1
+            yield delta
+        ok = True
+    except GeneratorExit:
+        ok = True           # the reader stopped early, the call itself was fine
+        raise
+    finally:
+        # also filled in for a stream that broke off part way
+        stats["total"] = time.perf_counter() - t0
+        stats.setdefault("tokens", pieces)
+        gen_time = stats["total"] - stats.get("ttft", 0.0)
+        stats["tokens_per_sec"] = stats["tokens"] / gen_time if gen_time > 0 else 0.0
+        record_call(character, stats, ok, True, caller_queue_s)
+
+
+def format_stats(stats: dict) -> str:
+    if "ttft" not in stats:
+        return ""
+    caption = (f"⏱ TTFT {stats['ttft']:.2f}s · {stats.get('tokens', 0)} tokens · "
+               f"{stats.get('tokens_per_sec', 0):.1f} tok/s · total {stats.get('total', 0):.2f}s")
+    if stats.get("model", MODEL) != MODEL:
+        caption += f" · {'fallback ' if stats['model'] == FALLBACK_MODEL else ''}{stats['model']}"
+    return caption
+
+
+def reply_cache_key(character: str, prompt: str, history: list) -> str:
+    # the context is part of the key: a follow-up only hits after the same conversation
+    system_prompt = CHARACTER_SYSTEM_PROMPTS.get(character, "Respond to User Query")
+    params = {**SAMPLING_PARAMS, "history": history}
+    if character in GROUNDED_PERSONAS and DOC_TOKEN_BUDGET > 0:
+        # so are the doc passages: a reply cached before the docs changed is not reused
+        params["docs"] = [get_doc_index().version(), DOC_TOKEN_BUDGET]
+    return make_key(MODEL, system_prompt, prompt, params)
+
+
+def cacheable_reply(reply: str, stats: dict) -> bool:
+    # the key names MODEL: a fallback model's reply stored under it would be served as MODEL's
+    return bool(reply) and reply != ERROR_REPLY and stats.get("model") == MODEL
@@ -0,0 +1,404 @@
+"""
+Local BM25 retrieval over the course docs (Markdown / HTML)
+
+Docs are split into passages (by heading, then ~MAX_PASSAGE_WORDS words) and
+indexed in an inverted index: term -> (passage ids, term counts), both
+compact arrays. A query only touches the postings of its own terms, and
+scores them with NumPy (summed per distinct matching id), so search cost
+follows the number of matching postings, not the corpus size.
+
+- update() re-stats the files and re-indexes only new / changed ones
+  (mtime + size), dropping passages of changed or deleted files
+- save() / DocIndex.load() keep the index in one binary file: postings as
+  delta-encoded uint32 ids + uint16 counts, passage lengths as uint32, zlib
+  compressed
+- context_for(query, token_budget) returns the best passages that fit the
+  budget, ready to put into a prompt
+- version() changes whenever the indexed files do: part of the cache key of
+  replies built on the passages
+
+get_doc_index() returns the shared index for the process, loaded from
+DOC_INDEX_PATH (rebuilt instead when it was made for other roots) and
+refreshed at most every REFRESH_SECONDS.
+"""
+import bisect
+import hashlib
+import html
+import json
+import math
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+DOC_INDEX_PATH = os.environ.get("DOC_INDEX_PATH", "doc_index.bm25")
+DOC_EXTENSIONS = (".md", ".html", ".htm")
+MAX_PASSAGE_WORDS = 120
+REFRESH_SECONDS = 30
+K1, B = 1.2, 0.75                   # BM25 parameters
+MAGIC = b"BM25IDX1"
+
+STOPWORDS = set("""a an and are as at be but by for from has have how i if in into is it its
+of on or that the their then there these this to was were what when which who why will with
+you your""".split())
+TOKEN_RE = re.compile(r"[a-z0-9_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def approx_tokens(text: str) -> int:
+    # LLM tokens, ~4 characters each (same estimate as Chat_Context)
+    return len(text) // 4 + 1
+
+
+def default_roots() -> List[str]:
+    """
+    DOC_ROOTS (os.pathsep separated), else the BaseCamp1 folder of this repo.
+    """
+    if os.environ.get("DOC_ROOTS"):
+        return [p for p in os.environ["DOC_ROOTS"].split(os.pathsep) if p]
+    here = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(here, "BaseCamp1")
+        if os.path.isdir(candidate):
+            return [candidate]
+        parent = os.path.dirname(here)
+        if parent == here:
+            return []
+        here = parent
+
+
+# -------------------------
+# Parsing
+# -------------------------
+def html_to_text(raw: str) -> str:
+    raw = re.sub(r"(?is)<(script|style)\b.*?</\1>", " ", raw)
+    raw = re.sub(r"(?i)<(h[1-6])\b[^>]*>", "\n# ", raw)
+    raw = re.sub(r"(?i)<(br|/p|/div|/li|/h[1-6]|/tr)\b[^>]*>", "\n", raw)
+    return html.unescape(re.sub(r"<[^>]+>", " ", raw))
+
+
+def split_passages(text: str) -> List[Tuple[str, str]]:
+    """
+    (heading, passage text) pairs: a new passage at each Markdown heading,
+    and paragraphs packed up to MAX_PASSAGE_WORDS words.
+    """
+    passages, heading, buf, words = [], "", [], 0
+
+    def flush():
+        nonlocal buf, words
+        body = "\n\n".join(buf).strip()
+        if body:
+            passages.append((heading, body))
+        buf, words = [], 0
+
+    for block in re.split(r"\n\s*\n", text):
+        block = block.strip()
+        if not block:
+            continue
+        m = re.match(r"^#{1,6}\s+(.*)", block)
+        if m:
+            flush()
+            heading = m.group(1).splitlines()[0].strip()
+            block = block[m.end(1):].strip()
+            if not block:
+                continue
+        n = len(block.split())
+        if words and words + n > MAX_PASSAGE_WORDS:
+            flush()
+        buf.append(block)
+        words += n
+    flush()
+    return passages
+
+
+def read_doc(path: str) -> str:
+    with open(path, encoding="utf-8", errors="replace") as f:
+        raw = f.read()
+    return html_to_text(raw) if path.lower().endswith((".html", ".htm")) else raw
+
+
+# -------------------------
+# Index
+# -------------------------
+class DocIndex:
+
+    def __init__(self, roots: Optional[Iterable[str]] = None):
+        self.roots = list(roots) if roots is not None else default_roots()
+        self.files: Dict[str, Tuple[int, int, List[int]]] = {}   # path -> (mtime_ns, size, passage ids)
+        self.passages: Dict[int, Tuple[str, str, str]] = {}      # id -> (path, heading, text)
+        self.lengths = array("I")                                # terms per passage, by id (0 = removed)
+        self.postings: Dict[str, Tuple[array, array]] = {}       # term -> (ids, counts)
+        self.total_length = 0
+        self.next_id = 0
+        self.dirty = False
+        self._version: Optional[str] = None
+        self._lock = threading.RLock()
+
+    # ---- building ----
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        found = {}
+        for root in self.roots:
+            if os.path.isfile(root):
+                st = os.stat(root)
+                found[os.path.abspath(root)] = (st.st_mtime_ns, st.st_size)
+                continue
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+                for name in filenames:
+                    if name.lower().endswith(DOC_EXTENSIONS):
+                        path = os.path.abspath(os.path.join(dirpath, name))
+                        st = os.stat(path)
+                        found[path] = (st.st_mtime_ns, st.st_size)
+        return found
+
+    def update(self) -> Dict[str, int]:
+        """
+        Bring the index in line with the files on disk; only changed files are read.
+        """
+        found = self._scan()
+        counts = {"added": 0, "changed": 0, "removed": 0}
+        with self._lock:
+            for path in [p for p in self.files if p not in found]:
+                self._remove_file(path)
+                counts["removed"] += 1
+            for path, (mtime, size) in found.items():
+                known = self.files.get(path)
+                if known is not None and known[:2] == (mtime, size):
+                    continue
+                if known is not None:
+                    self._remove_file(path)
+                counts["changed" if known is not None else "added"] += 1
+                self._add_file(path, mtime, size)
+        return counts
+
+    def _add_file(self, path: str, mtime: int, size: int) -> None:
+        ids = []
+        for heading, text in split_passages(read_doc(path)):
+            ids.append(self.add_passage(path, heading, text))
+        self.files[path] = (mtime, size, ids)
+        self.dirty = True
+        self._version = None
+
+    def add_passage(self, path: str, heading: str, text: str) -> int:
+        pid = self.next_id
+        self.next_id += 1
+        self._version = None
+        terms = tokenize(heading + " " + text)
+        self.passages[pid] = (path, heading, text)
+        self.lengths.append(len(terms))
+        self.total_length += len(terms)
+        counts: Dict[str, int] = {}
+        for t in terms:
+            counts[t] = counts.get(t, 0) + 1
+        for t, c in counts.items():
+            ids, tfs = self.postings.get(t) or self.postings.setdefault(t, (array("I"), array("H")))
+            ids.append(pid)                 # ids only grow, so postings stay sorted
+            tfs.append(min(c, 65535))
+        return pid
+
+    def _remove_file(self, path: str) -> None:
+        _, _, ids = self.files.pop(path)
+        self._version = None
+        if not ids:
+            self.dirty = True
+            return
+        # a file's passages got consecutive ids, so in every sorted posting
+        # they form one slice: find it with bisect and cut it out
+        lo, hi = ids[0], ids[-1] + 1
+        terms = set()
+        for pid in ids:
+            _, heading, text = self.passages.pop(pid)
+            self.total_length -= self.lengths[pid]
+            self.lengths[pid] = 0
+            terms.update(tokenize(heading + " " + text))
+        for t in terms:
+            post_ids, post_tfs = self.postings[t]
+            a, b = bisect.bisect_left(post_ids, lo), bisect.bisect_left(post_ids, hi)
+            del post_ids[a:b]
+            del post_tfs[a:b]
+            if not post_ids:
+                del self.postings[t]
+        self.dirty = True
+
+    # ---- search ----
+    def search(self, query: str, k: int = 5) -> List[Tuple[float, int]]:
+        """
+        Top k (score, passage id) by BM25.
+        """
+        with self._lock:
+            n = len(self.passages)
+            if not n:
+                return []
+            avgdl = self.total_length / n or 1.0
+            lengths = np.frombuffer(self.lengths, dtype=np.uint32)
+            all_ids, all_weights = [], []
+            for term in set(tokenize(query)):
+                posting = self.postings.get(term)
+                if posting is None:
+                    continue
+                # zero-copy views of the posting arrays
+                ids = np.frombuffer(posting[0], dtype=np.uint32)
+                tfs = np.frombuffer(posting[1], dtype=np.uint16).astype(np.float64)
+                idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+                norm = K1 * (1 - B + B * lengths[ids] / avgdl)
+                all_ids.append(ids)
+                all_weights.append(idf * tfs * (K1 + 1) / (tfs + norm))
+            if not all_ids:
+                return []
+            # sum per distinct matching id: sized by the postings read, not by the corpus
+            matched, slot = np.unique(np.concatenate(all_ids), return_inverse=True)
+            scores = np.bincount(slot, weights=np.concatenate(all_weights))
+        top = np.arange(len(matched))
+        if len(top) > k:
+            top = np.argpartition(scores, -k)[-k:]
+        return sorted(((float(scores[i]), int(matched[i])) for i in top), reverse=True)
+
+    def passage(self, pid: int) -> Tuple[str, str, str]:
+        return self.passages[pid]
+
+    def context_for(self, query: str, token_budget: int, k: int = 8) -> str:
+        """
+        Best passages for the query, most relevant first, within token_budget.
+        """
+        parts, used = [], 0
+        with self._lock:
+            # ids and passages from the same state: an update() in between could drop them
+            found = [self.passages[pid] for _, pid in self.search(query, k)]
+        for path, heading, text in found:
+            part = f"[{os.path.basename(path)}{' > ' + heading if heading else ''}]\n{text}"
+            cost = approx_tokens(part)
+            if used + cost > token_budget:
+                continue                # a shorter, lower ranked passage may still fit
+            parts.append(part)
+            used += cost
+        return "\n\n".join(parts)
+
+    def version(self) -> str:
+        """
+        Short hash of the indexed files (path, mtime, size): the same for the
+        same docs in every process, different as soon as a file changes.
+        """
+        with self._lock:
+            if self._version is None:
+                digest = hashlib.blake2b(digest_size=8)
+                digest.update(f"{len(self.passages)}\n".encode("utf-8"))
+                for path in sorted(self.files):
+                    mtime, size, _ = self.files[path]
+                    digest.update(f"{path}|{mtime}|{size}\n".encode("utf-8"))
+                self._version = digest.hexdigest()
+            return self._version
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"files": len(self.files), "passages": len(self.passages),
+                    "terms": len(self.postings)}
+
+    # ---- persistence ----
+    def save(self, path: str = DOC_INDEX_PATH) -> int:
+        """
+        Write the index to `path` (atomically). Returns the file size.
+        """
+        with self._lock:
+            meta = {
+                "roots": self.roots, "next_id": self.next_id,
+                "files": {p: [m, s, ids] for p, (m, s, ids) in self.files.items()},
+                "passages": [[pid, *self.passages[pid]] for pid in self.passages],
+            }
+            blob = bytearray()
+            for term, (ids, tfs) in self.postings.items():
+                raw = term.encode("utf-8")
+                deltas = np.diff(np.frombuffer(ids, dtype=np.uint32), prepend=np.uint32(0))
+                blob += struct.pack("<HI", len(raw), len(ids)) + raw
+                blob += deltas.astype(np.uint32).tobytes() + tfs.tobytes()
+            sections = [zlib.compress(json.dumps(meta).encode("utf-8")), zlib.compress(bytes(blob)),
+                        zlib.compress(self.lengths.tobytes())]
+            self.dirty = False
+
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            for section in sections:
+                f.write(struct.pack("<I", len(section)))
+                f.write(section)
+        os.replace(tmp, path)
+        return os.path.getsize(path)
+
+    @classmethod
+    def load(cls, path: str = DOC_INDEX_PATH) -> "DocIndex":
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a doc index")
+            sections = []
+            for _ in range(3):
+                (size,) = struct.unpack("<I", f.read(4))
+                sections.append(zlib.decompress(f.read(size)))
+
+        meta = json.loads(sections[0])
+        index = cls(meta["roots"])
+        index.next_id = meta["next_id"]
+        index.files = {p: (m, s, ids) for p, (m, s, ids) in meta["files"].items()}
+        index.lengths.frombytes(sections[2])
+        index.total_length = sum(index.lengths)
+        for pid, path_, heading, text in meta["passages"]:
+            index.passages[pid] = (path_, heading, text)
+
+        blob, pos = memoryview(sections[1]), 0
+        while pos < len(blob):
+            tlen, n = struct.unpack_from("<HI", blob, pos)
+            pos += 6
+            term = bytes(blob[pos:pos + tlen]).decode("utf-8")
+            pos += tlen
+            # undo the delta encoding
+            ids = array("I", np.cumsum(np.frombuffer(blob[pos:pos + 4 * n], dtype=np.uint32),
+                                       dtype=np.uint32).tobytes())
+            pos += 4 * n
+            tfs = array("H")
+            tfs.frombytes(blob[pos:pos + 2 * n])
+            pos += 2 * n
+            index.postings[term] = (ids, tfs)
+        return index
+
+
+def _same_roots(a: Iterable[str], b: Iterable[str]) -> bool:
+    return sorted(map(os.path.abspath, a)) == sorted(map(os.path.abspath, b))
+
+
+_INDEX: Optional[DocIndex] = None
+_INDEX_CHECKED = 0.0
+_INDEX_LOCK = threading.Lock()
+
+
+def get_doc_index(path: str = DOC_INDEX_PATH) -> DocIndex:
+    """
+    Shared index: loaded from `path` when present, otherwise built; changed
+    files are re-indexed (and the file re-saved) at most every REFRESH_SECONDS.
+    """
+    global _INDEX, _INDEX_CHECKED
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            try:
+                _INDEX = DocIndex.load(path)
+            except (OSError, ValueError):
+                _INDEX = DocIndex()
+            if not _same_roots(_INDEX.roots, default_roots()):
+                _INDEX = DocIndex()     # DOC_ROOTS changed since the file was saved: rebuild
+            _INDEX_CHECKED = 0.0
+        if time.monotonic() - _INDEX_CHECKED > REFRESH_SECONDS:
+            _INDEX_CHECKED = time.monotonic()
+            _INDEX.update()
+            if _INDEX.dirty:
+                try:
+                    _INDEX.save(path)
+                except OSError:
+                    pass                # a read-only folder still gets an in-memory index
+        return _INDEX
@@ -0,0 +1,99 @@
+"""
+Shared, pooled Groq clients
+
+Creating Groq(api_key=...) per message builds a new httpx client each time
+(SSL context, connection pool), so every turn pays a fresh TCP + TLS
+handshake. Here one client is kept per API key in a small module-level LRU,
+so the keep-alive connections are reused across turns and Streamlit reruns.
+A plain module-level cache (instead of st.cache_resource) also works from
+scripts and benchmarks that do not run under Streamlit.
+
+API keys are never stored as cache keys - only their SHA-256 hash is.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import httpx
+from groq import Groq
+
+
+DEFAULT_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 60))        # seconds, whole request
+CONNECT_TIMEOUT = float(os.environ.get("LLM_CONNECT_TIMEOUT", 5))
+MAX_CLIENTS = int(os.environ.get("LLM_MAX_CLIENTS", 16))          # distinct keys kept
+POOL_SIZE = 20                                                    # keep-alive connections per client
+KEEPALIVE_EXPIRY = 120                                            # seconds an idle connection is kept
+# at least one slot per persona, so the "compare all" fan-out (5 calls) never queues
+MAX_CONCURRENCY_PER_KEY = int(os.environ.get("LLM_MAX_CONCURRENCY_PER_KEY", 8))
+
+_LOCK = threading.Lock()
+_CLIENTS: "OrderedDict[str, Groq]" = OrderedDict()
+_STATS = {"hits": 0, "misses": 0, "evictions": 0}
+_LIMITERS = {}
+
+
+def _cache_key(api_key: str, base_url: Optional[str], timeout: float) -> str:
+    raw = f"{api_key}|{base_url or ''}|{timeout}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _new_client(api_key: str, base_url: Optional[str], timeout: float) -> Groq:
+    http_client = httpx.Client(
+        timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT),
+        limits=httpx.Limits(max_connections=POOL_SIZE,
+                            max_keepalive_connections=POOL_SIZE,
+                            keepalive_expiry=KEEPALIVE_EXPIRY),
+        follow_redirects=True,
+    )
+    return Groq(api_key=api_key, base_url=base_url, timeout=timeout, http_client=http_client)
+
+
+def get_groq_client(api_key: str, timeout: float = DEFAULT_TIMEOUT,
+                    base_url: Optional[str] = None) -> Groq:
+    """
+    Return the shared client for this API key (and base_url / timeout),
+    creating it on first use. At most MAX_CLIENTS are kept (least recently used out).
+    """
+    key = _cache_key(api_key, base_url, timeout)
+    with _LOCK:
+        client = _CLIENTS.get(key)
+        if client is not None:
+            _CLIENTS.move_to_end(key)
+            _STATS["hits"] += 1
+            return client
+
+        _STATS["misses"] += 1
+        client = _new_client(api_key, base_url, timeout)
+        _CLIENTS[key] = client
+        while len(_CLIENTS) > MAX_CLIENTS:
+            # evicted clients are not closed here: a stream may still be using
+            # one; their connections are released when they are garbage collected
+            _CLIENTS.popitem(last=False)
+            _STATS["evictions"] += 1
+        return client
+
+
+def key_limiter(api_key: str, limit: int = MAX_CONCURRENCY_PER_KEY) -> threading.BoundedSemaphore:
+    """
+    Process wide semaphore for one API key: caps in-flight calls made with
+    that key, across threads and sessions. Use as `with key_limiter(key): ...`
+    """
+    key = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    with _LOCK:
+        if key not in _LIMITERS:
+            _LIMITERS[key] = threading.BoundedSemaphore(limit)
+        return _LIMITERS[key]
+
+
+def client_stats() -> dict:
+    with _LOCK:
+        return {"clients": len(_CLIENTS), **_STATS}
+
+
+def clear_clients() -> None:
+    with _LOCK:
+        for client in _CLIENTS.values():
+            client.close()
+        _CLIENTS.clear()
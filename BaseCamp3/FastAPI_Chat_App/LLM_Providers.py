@@ -0,0 +1,158 @@
+"""
+Chat providers: one small interface over the LLM backend
+
+    complete(messages, stats=None, **params) -> reply text
+    stream(messages, stats=None, **params)   -> yields reply text pieces
+
+stats (optional dict) is filled with "model" and, when the backend reports
+usage, "tokens" (completion tokens) and "prompt_tokens". Time spent in the
+client-side rate limiter is added to "queue_s".
+
+GroqProvider   the real API: pooled client (LLM_Clients) + retries, breaker
+               and fallback (LLM_Resilience)
+FakeProvider   in-process and deterministic, no key or network: configurable
+               time-to-first-token, tokens/sec and failure injection, for
+               load tests and CI
+
+get_provider(api_key) picks one from the environment:
+    LLM_PROVIDER=groq (default) | fake
+    FAKE_LLM_TTFT, FAKE_LLM_TOKENS_PER_SEC, FAKE_LLM_REPLY_TOKENS,
+    FAKE_LLM_ERROR_RATE, FAKE_LLM_SEED     settings of the fake
+"""
+import hashlib
+import os
+import random
+import threading
+import time
+from typing import Iterator, List, Optional, Sequence
+
+from LLM_Clients import get_groq_client
+from LLM_Resilience import get_resilient_llm
+
+
+class ProviderError(Exception):
+    """
+    The provider could not produce a reply (injected failure in FakeProvider).
+    """
+
+
+class ChatProvider:
+    """
+    Base class; subclasses implement stream() and may override complete().
+    """
+    name = "base"
+
+    def stream(self, messages: List[dict], stats: Optional[dict] = None, **params) -> Iterator[str]:
+        raise NotImplementedError
+
+    def complete(self, messages: List[dict], stats: Optional[dict] = None, **params) -> str:
+        return "".join(self.stream(messages, stats, **params))
+
+
+class GroqProvider(ChatProvider):
+    name = "groq"
+
+    def __init__(self, api_key: str, models: Sequence[str], base_url: Optional[str] = None):
+        # shared client per key and shared health / breaker state per model list
+        self.client = get_groq_client(api_key, base_url=base_url)
+        self.llm = get_resilient_llm(models)
+
+    def complete(self, messages: List[dict], stats: Optional[dict] = None, **params) -> str:
+        completion, model = self.llm.complete(self.client, messages=messages, stats=stats, **params)
+        if stats is not None:
+            stats["model"] = model
+            if completion.usage is not None:
+                stats["tokens"] = completion.usage.completion_tokens
+                stats["prompt_tokens"] = completion.usage.prompt_tokens
+        return completion.choices[0].message.content
+
+    def stream(self, messages: List[dict], stats: Optional[dict] = None, **params) -> Iterator[str]:
+        stats = {} if stats is None else stats
+        for chunk in self.llm.stream(self.client, messages=messages, stats=stats, **params):
+            # Groq reports token usage on the last chunk (x_groq.usage)
+            usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or chunk.usage
+            if usage is not None:
+                stats["tokens"] = usage.completion_tokens
+                stats["prompt_tokens"] = usage.prompt_tokens
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+
+WORDS = ("this is a canned reply from the local fake model used for "
+         "benchmarks and tests of the chat stack").split()
+
+
+class FakeProvider(ChatProvider):
+    """
+    ttft            seconds before the first piece
+    tokens_per_sec  pace of the following pieces, 0 = no delay
+    reply_tokens    words per reply
+    error_rate      fraction of calls that raise ProviderError before the first piece
+    seed            same seed + same calls -> same failures
+
+    Replies depend only on the messages, so the same conversation always gets
+    the same answer.
+    """
+    name = "fake"
+
+    def __init__(self, ttft: float = 0.0, tokens_per_sec: float = 0.0, reply_tokens: int = 40,
+                 error_rate: float = 0.0, seed: Optional[int] = 0, model: str = "fake-model"):
+        self.ttft = ttft
+        self.tokens_per_sec = tokens_per_sec
+        self.reply_tokens = reply_tokens
+        self.error_rate = error_rate
+        self.model = model
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def reply_for(self, messages: List[dict]) -> List[str]:
+        digest = hashlib.sha256(repr(messages).encode("utf-8")).digest()
+        start = digest[0] % len(WORDS)
+        return [WORDS[(start + i) % len(WORDS)] + " " for i in range(self.reply_tokens)]
+
+    def stream(self, messages: List[dict], stats: Optional[dict] = None, **params) -> Iterator[str]:
+        with self._lock:
+            fail = self._rng.random() < self.error_rate
+        time.sleep(self.ttft)
+        if fail:
+            raise ProviderError("injected failure")
+
+        tokens = self.reply_for(messages)[:params.get("max_tokens") or None]
+        if stats is not None:
+            stats["model"] = self.model
+            stats["tokens"] = len(tokens)
+            # rough prompt size: 1 token ~ 4 characters
+            stats["prompt_tokens"] = sum(len(str(m.get("content", ""))) for m in messages) // 4 + 1
+        per_token = 1 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0
+        for i, token in enumerate(tokens):
+            if per_token and i:
+                time.sleep(per_token)
+            yield token
+
+
+def fake_provider_from_env() -> FakeProvider:
+    seed = os.environ.get("FAKE_LLM_SEED", "0")
+    return FakeProvider(
+        ttft=float(os.environ.get("FAKE_LLM_TTFT", 0.0)),
+        tokens_per_sec=float(os.environ.get("FAKE_LLM_TOKENS_PER_SEC", 0)),
+        reply_tokens=int(os.environ.get("FAKE_LLM_REPLY_TOKENS", 40)),
+        error_rate=float(os.environ.get("FAKE_LLM_ERROR_RATE", 0.0)),
+        seed=int(seed) if seed else None,
+    )
+
+
+_FAKE: Optional[FakeProvider] = None
+
+
+def get_provider(api_key: str, models: Sequence[str]) -> ChatProvider:
+    """
+    Provider selected by LLM_PROVIDER (groq by default). The fake is shared
+    by the whole process so its seeded failure sequence is not restarted per call.
+    """
+    global _FAKE
+    if os.environ.get("LLM_PROVIDER", "groq").lower() == "fake":
+        if _FAKE is None:
+            _FAKE = fake_provider_from_env()
+        return _FAKE
+    return GroqProvider(api_key, models)
@@ -0,0 +1,136 @@
+"""
+Persistent LLM response cache (SQLite)
+
+Replies are stored under a hash of (model, system prompt, normalized user
+prompt, sampling params), so the same persona + prompt is answered from disk
+in milliseconds instead of a network round trip.
+
+Eviction: entries older than the TTL are dropped, then least recently used
+entries are removed until the cache is under both max_entries and max_bytes.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+DEFAULT_PATH = os.environ.get("CHAT_CACHE_PATH", "chat_response_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Case and whitespace insensitive form of a prompt: ' What is  AI? ' == 'what is ai?'
+    """
+    return re.sub(r"\s+", " ", prompt).strip().casefold()
+
+
+def make_key(model: str, system_prompt: str, prompt: str,
+             params: Optional[Dict[str, Any]] = None) -> str:
+    raw = json.dumps({
+        "model": model,
+        "system": system_prompt,
+        "prompt": normalize_prompt(prompt),
+        "params": params or {},
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Thread safe key -> reply store on one SQLite file, with LRU / TTL eviction and a size cap.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key        TEXT PRIMARY KEY,
+                model      TEXT NOT NULL,
+                reply      TEXT NOT NULL,
+                bytes      INTEGER NOT NULL,
+                created    REAL NOT NULL,
+                last_used  REAL NOT NULL,
+                hits       INTEGER NOT NULL DEFAULT 0
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT reply, created FROM responses WHERE key = ?",
+                                   (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self._misses += 1
+                return None
+            self._db.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                             (now, key))
+            self._hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, reply: str) -> None:
+        now = time.time()
+        size = len(reply.encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, reply, bytes, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (key, model, reply, size, now, now))
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        count, total = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        # walk from least recently used and drop until under both limits
+        drop = []
+        for key, size in self._db.execute("SELECT key, bytes FROM responses ORDER BY last_used"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            drop.append((key,))
+            count -= 1
+            total -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", drop)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM responses").fetchone()
+            return {"entries": count, "bytes": total, "hits": self._hits, "misses": self._misses}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+
+
+_CACHES: Dict[str, ResponseCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_response_cache(path: str = DEFAULT_PATH) -> ResponseCache:
+    """
+    One shared cache object per file for the whole process.
+    """
+    with _CACHES_LOCK:
+        if path not in _CACHES:
+            _CACHES[path] = ResponseCache(path)
+        return _CACHES[path]
@@ -0,0 +1,373 @@
+"""
+Chat service: the persona chat behind one FastAPI process
+
+All Streamlit sessions (St_Chat_App) call this service instead of the LLM,
+so the whole deployment shares:
+  - one provider (pooled Groq client + retries / breaker / fallback, or the
+    offline fake with LLM_PROVIDER=fake) and the provider rate limit (LLM_RPM)
+  - a global semaphore: at most CHAT_MAX_CONCURRENCY provider calls in flight;
+    more requests wait up to CHAT_QUEUE_TIMEOUT seconds, then get 503
+  - per-user quotas: CHAT_USER_RPM requests per minute (bursts of
+    CHAT_USER_BURST, 429 + Retry-After past it) and at most
+    CHAT_USER_MAX_CONCURRENT calls in flight per user (extra calls queue)
+  - the response cache (opt-in per request)
+
+Endpoints:
+    POST /chat          reply as JSON
+    POST /chat/stream   reply as Server-Sent Events: data: {"delta": ...} per
+                        piece, then `event: done` with the stats, or `event: error`
+    GET  /personas, /stats, /healthz
+
+Who is a "user" for the quotas: X-User-Id is chosen by the caller, so it is
+only believed from a trusted front-end, one that sends the shared secret
+CHAT_SERVICE_TOKEN as "Authorization: Bearer ..." and has identified the
+user itself (St_Chat_App does). Any other request is counted against its
+client address, whatever X-User-Id it sends.
+
+The provider key comes from GROQ_API_KEY on the server, never from the browser.
+"""
+import asyncio
+import hmac
+import json
+import logging
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Literal
+
+import uvicorn
+from fastapi import Body, FastAPI, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from Chat_Engine import (CHARACTER_SYSTEM_PROMPTS, DOC_TOKEN_BUDGET, ERROR_REPLY, FALLBACK_MODEL,
+                         GROUNDED_PERSONAS, MODEL, cacheable_reply, chat, chat_stream,
+                         reply_cache_key)
+from LLM_Providers import get_provider
+from LLM_Resilience import TokenBucket
+from LLM_Telemetry import get_telemetry
+from Response_Cache import get_response_cache
+
+logger = logging.getLogger("uvicorn.error")
+
+API_KEY = os.environ.get("GROQ_API_KEY", "")
+MAX_CONCURRENCY = int(os.environ.get("CHAT_MAX_CONCURRENCY", 32))
+QUEUE_TIMEOUT = float(os.environ.get("CHAT_QUEUE_TIMEOUT", 30))
+USER_RPM = float(os.environ.get("CHAT_USER_RPM", 30))
+USER_BURST = float(os.environ.get("CHAT_USER_BURST", 10))
+# at least one slot per persona: the client's "compare all" sends all 5 at once for one user
+USER_MAX_CONCURRENT = int(os.environ.get("CHAT_USER_MAX_CONCURRENT", 8))
+MAX_TRACKED_USERS = 10000
+SERVICE_TOKEN = os.environ.get("CHAT_SERVICE_TOKEN", "")
+
+
+# -------------------------
+# Pydantic Models
+# -------------------------
+class Message(BaseModel):
+    role: Literal["system", "user", "assistant"]
+    content: str
+
+
+class ChatRequest(BaseModel):
+    character: str
+    prompt: str = Field(..., min_length=1, max_length=8000)
+    # earlier turns, already trimmed to the context budget by the client
+    history: List[Message] = Field(default_factory=list, max_length=200)
+    use_cache: bool = False
+
+
+# -------------------------
+# Concurrency and quotas
+# -------------------------
+class _UserState:
+    __slots__ = ("bucket", "slots", "active")
+
+    def __init__(self):
+        self.bucket = TokenBucket(USER_RPM / 60, USER_BURST)
+        self.slots = asyncio.Semaphore(USER_MAX_CONCURRENT)
+        self.active = 0             # requests admitted or waiting
+
+
+class UserQuotas:
+    """
+    Per-user rate (token bucket) and concurrency (semaphore). Only used from
+    the event loop thread, so no locking is needed.
+    """
+
+    def __init__(self):
+        self.users: Dict[str, _UserState] = {}
+
+    def get(self, user: str) -> _UserState:
+        state = self.users.get(user)
+        if state is None:
+            if len(self.users) >= MAX_TRACKED_USERS:
+                self._prune()
+            state = self.users[user] = _UserState()
+        return state
+
+    def _prune(self) -> None:
+        # idle users with a full bucket carry no state worth keeping
+        for user, state in list(self.users.items()):
+            state.bucket.try_acquire(0)         # refill up to now
+            if state.active == 0 and state.bucket.tokens >= state.bucket.capacity:
+                del self.users[user]
+
+
+def quota_user(request: Request, x_user_id: str) -> str:
+    """
+    Key the quotas are counted under: X-User-Id from a front-end holding
+    CHAT_SERVICE_TOKEN, else the client address.
+    """
+    auth = request.headers.get("authorization", "")
+    if SERVICE_TOKEN and hmac.compare_digest(auth, f"Bearer {SERVICE_TOKEN}"):
+        return f"user:{x_user_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+QUOTAS = UserQuotas()
+GATE = asyncio.Semaphore(MAX_CONCURRENCY)
+COUNTERS = {"served": 0, "cache_hits": 0, "rate_limited": 0, "busy": 0, "errors": 0,
+            "in_flight": 0, "waiting": 0}
+
+
+async def admit(user: str) -> _UserState:
+    """
+    Wait for a user slot and a global slot. Raises 429 (user over quota) or 503 (queue timeout).
+    """
+    state = QUOTAS.get(user)
+    retry_after = state.bucket.try_acquire()
+    if retry_after:
+        COUNTERS["rate_limited"] += 1
+        raise HTTPException(status_code=429,
+                            detail=f"Rate limit for user {user}: {USER_RPM:g} requests/minute",
+                            headers={"Retry-After": str(math.ceil(retry_after))})
+
+    deadline = time.monotonic() + QUEUE_TIMEOUT
+    state.active += 1
+    COUNTERS["waiting"] += 1
+    try:
+        await asyncio.wait_for(state.slots.acquire(), QUEUE_TIMEOUT)
+        try:
+            await asyncio.wait_for(GATE.acquire(), max(0.0, deadline - time.monotonic()))
+        except BaseException:
+            state.slots.release()
+            raise
+    except asyncio.TimeoutError:
+        state.active -= 1
+        COUNTERS["busy"] += 1
+        raise HTTPException(status_code=503, detail="Chat service busy, try again",
+                            headers={"Retry-After": "1"})
+    except BaseException:
+        state.active -= 1
+        raise
+    finally:
+        COUNTERS["waiting"] -= 1
+    COUNTERS["in_flight"] += 1
+    return state
+
+
+def release(state: _UserState) -> None:
+    COUNTERS["in_flight"] -= 1
+    GATE.release()
+    state.slots.release()
+    state.active -= 1
+
+
+def release_once(state: _UserState):
+    # release() callable from several places (stream end, response end), effective once
+    released = False
+
+    def done() -> None:
+        nonlocal released
+        if not released:
+            released = True
+            release(state)
+    return done
+
+
+class AdmittedStream(StreamingResponse):
+    """
+    StreamingResponse that holds slots taken by admit() and frees them when
+    the response is over, however it ends. The body generator's own finally
+    is not enough: if the client is gone before the first byte the generator
+    never starts, and Starlette skips background tasks on a disconnect.
+    """
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+
+# -------------------------
+# App
+# -------------------------
+PROVIDER = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global PROVIDER
+    # one shared provider (and with it one pooled HTTP client) for every request
+    PROVIDER = get_provider(API_KEY, [MODEL, FALLBACK_MODEL])
+    logger.info("chat service: provider=%s max_concurrency=%d", PROVIDER.name, MAX_CONCURRENCY)
+    if not SERVICE_TOKEN:
+        logger.warning("CHAT_SERVICE_TOKEN is not set: X-User-Id is ignored and quotas are per "
+                       "client address, so all users of one front-end server share one quota "
+                       "(%g requests/minute, %d concurrent)", USER_RPM, USER_MAX_CONCURRENT)
+    yield
+
+
+app = FastAPI(title="Persona Chat Service", lifespan=lifespan)
+
+
+def check_character(character: str) -> None:
+    if character not in CHARACTER_SYSTEM_PROMPTS:
+        raise HTTPException(status_code=404, detail=f"Unknown character {character}")
+
+
+def public_stats(stats: dict) -> dict:
+    out = {k: stats[k] for k in ("queue_s", "ttft", "total", "tokens", "tokens_per_sec", "model")
+           if k in stats}
+    out["primary"] = stats.get("model", MODEL) == MODEL
+    return out
+
+
+def cached_reply(req: ChatRequest, history: list):
+    if not req.use_cache:
+        return None, None
+    key = reply_cache_key(req.character, req.prompt, history)
+    reply = get_response_cache().get(key)
+    if reply is not None:
+        COUNTERS["cache_hits"] += 1
+    return key, reply
+
+
+@app.get("/healthz", summary="Liveness")
+async def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/personas", summary="List Characters")
+async def personas():
+    # doc_tokens: context the service adds to each prompt of that persona (doc
+    # passages), which clients must keep free when they trim the history
+    return {"personas": list(CHARACTER_SYSTEM_PROMPTS),
+            "doc_tokens": {name: DOC_TOKEN_BUDGET if name in GROUNDED_PERSONAS else 0
+                           for name in CHARACTER_SYSTEM_PROMPTS}}
+
+
+@app.get("/stats", summary="Service Stats")
+async def service_stats():
+    out = {**COUNTERS, "max_concurrency": MAX_CONCURRENCY, "users": len(QUOTAS.users),
+           "user_header_trusted": bool(SERVICE_TOKEN),
+           "provider": PROVIDER.name if PROVIDER else None}
+    llm = getattr(PROVIDER, "llm", None)
+    if llm is not None:
+        out["models"] = llm.stats()
+    out["telemetry"] = get_telemetry().summary()
+    return out
+
+
+@app.post("/chat", summary="Chat")
+async def chat_reply(request: Request, req: ChatRequest = Body(...),
+                     x_user_id: str = Header("anonymous", max_length=64)):
+    check_character(req.character)
+    history = [m.model_dump() for m in req.history]
+
+    key, reply = cached_reply(req, history)
+    if reply is not None:
+        return {"reply": reply, "cached": True, "stats": {}}
+
+    t_admit = time.perf_counter()
+    state = await admit(quota_user(request, x_user_id))
+    # time waiting for a user / global slot is queue time in the telemetry
+    stats = {"queue_s": time.perf_counter() - t_admit}
+    t0 = time.perf_counter()
+    try:
+        # provider calls are blocking: run them on the thread pool
+        reply = await run_in_threadpool(chat, API_KEY, req.character, req.prompt, history,
+                                        PROVIDER, stats)
+    finally:
+        release(state)
+    stats["total"] = time.perf_counter() - t0
+
+    if reply == ERROR_REPLY:
+        COUNTERS["errors"] += 1
+        raise HTTPException(status_code=502, detail=ERROR_REPLY)
+    COUNTERS["served"] += 1
+    if key and cacheable_reply(reply, stats):
+        get_response_cache().put(key, MODEL, reply)
+    return {"reply": reply, "cached": False, "stats": public_stats(stats)}
+
+
+def sse(data: dict, event: str = None) -> str:
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream", summary="Chat (Server-Sent Events)")
+async def chat_reply_stream(request: Request, req: ChatRequest = Body(...),
+                            x_user_id: str = Header("anonymous", max_length=64)):
+    check_character(req.character)
+    history = [m.model_dump() for m in req.history]
+
+    key, reply = cached_reply(req, history)
+    if reply is not None:
+        async def cached_events():
+            yield sse({"delta": reply})
+            yield sse({"cached": True}, event="done")
+        return StreamingResponse(cached_events(), media_type="text/event-stream")
+
+    # quota / queue errors are plain HTTP errors, raised before the stream starts
+    t_admit = time.perf_counter()
+    state = await admit(quota_user(request, x_user_id))
+    queue_s = time.perf_counter() - t_admit
+    done = release_once(state)
+
+    async def events():
+        stats, pieces = {"queue_s": queue_s}, []
+        try:
+            gen = chat_stream(API_KEY, req.character, req.prompt, stats, history=history,
+                              provider=PROVIDER)
+            async for delta in iterate_in_threadpool(gen):
+                pieces.append(delta)
+                yield sse({"delta": delta})
+        except Exception:
+            COUNTERS["errors"] += 1
+            yield sse({"detail": ERROR_REPLY, "partial": bool(pieces)}, event="error")
+            return
+        finally:
+            # free the slots as soon as the provider is done, not when the response is
+            done()
+        COUNTERS["served"] += 1
+        reply = "".join(pieces)
+        if key and cacheable_reply(reply, stats):
+            get_response_cache().put(key, MODEL, reply)
+        yield sse({"cached": False, **public_stats(stats)}, event="done")
+
+    try:
+        return AdmittedStream(events(), done, media_type="text/event-stream",
+                              headers={"Cache-Control": "no-cache"})
+    except BaseException:
+        done()
+        raise
+
+
+# -------------------------
+# Run the app
+# -------------------------
+if __name__ == "__main__":
+    port = int(os.environ.get("PORT", 5604))
+
+    uvicorn.run("app:app",
+                host="0.0.0.0",
+                port=port)
@@ -0,0 +1,303 @@
+"""
+Partitioned OHLC store: one columnar (Parquet) file per symbol + a manifest
+
+    index_store/
+        manifest.json               {"symbols": {name: {"file", "rows", "start", "end", "version",
+                                                        "base_version", "segments"}}}
+        NIFTY_50.<v>.parquet        Date, Open, High, Low, Close - sorted by Date
+        NIFTY_50.<n>.tail.parquet   bars appended since (see append)
+        ...
+
+The manifest answers "which symbols, which date ranges" without opening any
+data file, so listing a universe of thousands of symbols is one small JSON
+read. A symbol's rows are read only when it is asked for, and only the
+requested columns (Parquet is columnar).
+
+ingest_csv() splits a CSV with an "Index Name" (or "Symbol") column into the
+per-symbol files, merging with rows already stored (a re-sent date replaces
+the old row). Files and the manifest are written to a temp name and renamed,
+so a reader never sees a half-written file. A rewritten symbol gets a new
+file; the files it replaces are deleted only after the new manifest is in
+place, so a reader holding the old manifest still finds all the files it
+lists, and one that misses a deleted file re-reads the manifest (_retry).
+"version" changes on every write of a symbol; use it as a cache key.
+
+append() is the live path for new bars: they go to a small segment file
+next to the symbol's file instead of rewriting it, and read_tail() reads
+back only the rows after a given position. Every COMPACT_SEGMENTS appends
+the segments are merged into the main file. "base_version" changes only
+when existing rows may have changed (write_symbol / ingest, not append or
+compaction): a reader that saw the same base_version can just read the tail.
+
+    python Index_Store.py ingest index.csv
+    python Index_Store.py list
+"""
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+
+STORE_ROOT = os.environ.get("INDEX_STORE", "index_store")
+OHLC_COLUMNS = ["Open", "High", "Low", "Close"]
+SYMBOL_COLUMNS = ("Index Name", "Symbol")
+DATE_FORMAT = "%d-%b-%y"    # 28-Nov-25, as in index.csv
+COMPACT_SEGMENTS = 64
+
+
+def symbol_file(symbol: str, version: int, kind: str = "") -> str:
+    stem = re.sub(r"[^A-Za-z0-9_.-]+", "_", symbol).strip("_")
+    return f"{stem}.{version}{'.' + kind if kind else ''}.parquet"
+
+
+def _replace(path: str, write) -> None:
+    tmp = f"{path}.tmp{os.getpid()}"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+class IndexStore:
+
+    def __init__(self, root: str = STORE_ROOT):
+        self.root = root
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self._lock = threading.RLock()
+        self._manifest: Optional[Dict] = None
+        self._manifest_mtime = None
+
+    # -------------------------
+    # Manifest
+    # -------------------------
+    def manifest(self) -> Dict:
+        """
+        Symbol entries, re-read only when manifest.json changed on disk.
+        """
+        with self._lock:
+            try:
+                mtime = os.stat(self.manifest_path).st_mtime_ns
+            except FileNotFoundError:
+                return {}
+            if mtime != self._manifest_mtime:
+                with open(self.manifest_path, encoding="utf-8") as f:
+                    self._manifest = json.load(f)["symbols"]
+                self._manifest_mtime = mtime
+            return self._manifest
+
+    def _remove_files(self, names: Sequence[str]) -> None:
+        # files no manifest lists any more: call only after _write_manifest
+        for name in names:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except FileNotFoundError:
+                pass
+
+    def _write_manifest(self, symbols: Dict) -> None:
+        def write(tmp):
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"symbols": symbols}, f, indent=1, sort_keys=True)
+        _replace(self.manifest_path, write)
+        self._manifest, self._manifest_mtime = symbols, os.stat(self.manifest_path).st_mtime_ns
+
+    def symbols(self) -> List[str]:
+        return sorted(self.manifest())
+
+    def info(self, symbol: str) -> Dict:
+        return self.manifest()[symbol]
+
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_path)
+
+    # -------------------------
+    # Read
+    # -------------------------
+    def load(self, symbol: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        One symbol's bars, indexed by a sorted DatetimeIndex. Raises KeyError
+        for a symbol that is not in the manifest.
+        """
+        return self._retry(lambda: self._read(self.manifest()[symbol], columns)).set_index("Date")
+
+    def read_tail(self, symbol: str, start: int) -> pd.DataFrame:
+        """
+        Rows from position `start` on (0-based, in date order), e.g. the bars a
+        reader holding `start` rows has not seen. Only the segment files that
+        hold them are read, unless `start` lies inside the main file.
+        """
+        return self._retry(lambda: self._read_tail(self.manifest()[symbol], start))
+
+    def _read_tail(self, entry: Dict, start: int) -> pd.DataFrame:
+        segments = entry.get("segments", [])
+        first = entry["rows"] - sum(seg["rows"] for seg in segments)   # rows in the main file
+        if start < first:
+            return self._read(entry).iloc[start:].set_index("Date")
+        files, offset, skip = [], first, 0
+        for seg in segments:
+            if not files and start < offset + seg["rows"]:
+                skip = start - offset       # rows of the first segment already seen
+            if files or start < offset + seg["rows"]:
+                files.append(seg["file"])
+            offset += seg["rows"]
+        if not files:
+            return self._read(entry).iloc[:0].set_index("Date")
+        parts = [pd.read_parquet(os.path.join(self.root, f)) for f in files]
+        return pd.concat(parts, ignore_index=True).iloc[skip:].set_index("Date")
+
+    def _retry(self, read):
+        # a writer in another process may have compacted (removed) the segments
+        # listed in our copy of the manifest: re-read it once and try again
+        try:
+            return read()
+        except FileNotFoundError:
+            with self._lock:
+                self._manifest_mtime = None
+            return read()
+
+    def _read(self, entry: Dict, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        cols = ["Date", *(columns or OHLC_COLUMNS)]
+        parts = [pd.read_parquet(os.path.join(self.root, f), columns=cols)
+                 for f in [entry["file"], *(seg["file"] for seg in entry.get("segments", []))]]
+        return parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+
+    # -------------------------
+    # Write
+    # -------------------------
+    def write_symbol(self, symbol: str, bars: pd.DataFrame, merge: bool = True) -> Dict:
+        """
+        Store `bars` (Date index or column + OHLC columns) for one symbol,
+        merged with the stored rows unless merge=False. Returns the manifest entry.
+        """
+        with self._lock:
+            symbols, replaced = dict(self.manifest()), []
+            entry = self._write_file(symbol, bars, merge, symbols, replaced)
+            self._write_manifest(symbols)
+            self._remove_files(replaced)
+            return entry
+
+    def _write_file(self, symbol: str, bars: pd.DataFrame, merge: bool, symbols: Dict,
+                    replaced: List[str], base_version: Optional[int] = None) -> Dict:
+        """
+        Write the symbol's rows to a new main file and update its entry in
+        `symbols`. The files of the old entry are added to `replaced`: readers
+        may still use them until the caller has written the manifest.
+        """
+        bars = bars.reset_index() if "Date" not in bars.columns else bars
+        bars = bars[["Date", *OHLC_COLUMNS]]
+        os.makedirs(self.root, exist_ok=True)
+        entry = symbols.get(symbol)
+        if merge and entry is not None:
+            bars = pd.concat([self._read(entry), bars], ignore_index=True)
+        bars = (bars.drop_duplicates("Date", keep="last")
+                    .sort_values("Date", kind="stable")
+                    .reset_index(drop=True))
+
+        version = time.time_ns()
+        name = symbol_file(symbol, version)
+        _replace(os.path.join(self.root, name), lambda tmp: bars.to_parquet(tmp, index=False))
+        if entry is not None:
+            # old main file and segments: merged into the new file (or dropped with merge=False)
+            replaced += [entry["file"], *(seg["file"] for seg in entry.get("segments", []))]
+        entry = {"file": name, "rows": len(bars),
+                 "start": bars["Date"].iloc[0].isoformat() if len(bars) else None,
+                 "end": bars["Date"].iloc[-1].isoformat() if len(bars) else None,
+                 "version": version, "base_version": base_version or version}
+        symbols[symbol] = entry
+        return entry
+
+    def append(self, symbol: str, bars: pd.DataFrame) -> Dict:
+        """
+        Add bars dated after the symbol's last bar, written as a segment file
+        (the main file is not rewritten). Raises ValueError for older dates:
+        backfills go through write_symbol(), which merges.
+        """
+        bars = bars.reset_index() if "Date" not in bars.columns else bars
+        bars = (bars[["Date", *OHLC_COLUMNS]]
+                .drop_duplicates("Date", keep="last")
+                .sort_values("Date", kind="stable")
+                .reset_index(drop=True))
+        with self._lock:
+            symbols = dict(self.manifest())
+            entry = symbols.get(symbol)
+            if entry is None or not entry["rows"]:
+                return self.write_symbol(symbol, bars)
+            if len(bars) == 0:
+                return entry
+            if bars["Date"].iloc[0] <= pd.Timestamp(entry["end"]):
+                raise ValueError(f"{symbol}: bar {bars['Date'].iloc[0]} is not after the last "
+                                 f"stored bar {entry['end']}")
+
+            version = time.time_ns()
+            name = symbol_file(symbol, version, "tail")
+            _replace(os.path.join(self.root, name), lambda tmp: bars.to_parquet(tmp, index=False))
+            entry = {**entry, "rows": entry["rows"] + len(bars),
+                     "end": bars["Date"].iloc[-1].isoformat(), "version": version,
+                     "segments": [*entry.get("segments", []), {"file": name, "rows": len(bars)}]}
+            symbols[symbol] = entry
+            replaced = []
+            if len(entry["segments"]) >= COMPACT_SEGMENTS:
+                # same rows, one file: readers keep their position
+                entry = self._write_file(symbol, bars.iloc[:0], True, symbols, replaced,
+                                         base_version=entry.get("base_version"))
+            self._write_manifest(symbols)
+            self._remove_files(replaced)
+            return entry
+
+    def ingest_csv(self, csv_path: str, date_format: Optional[str] = DATE_FORMAT,
+                   default_symbol: Optional[str] = None) -> Dict[str, int]:
+        """
+        Split a CSV into per-symbol files. The symbol comes from an "Index Name"
+        or "Symbol" column, else default_symbol (the file name without extension).
+        Returns {symbol: rows stored}.
+        """
+        df = pd.read_csv(csv_path)
+        # every symbol repeats the same dates: parse each distinct string once
+        codes, uniques = pd.factorize(df["Date"])
+        df["Date"] = pd.to_datetime(uniques, format=date_format)[codes]
+        column = next((c for c in SYMBOL_COLUMNS if c in df.columns), None)
+        if column is None:
+            symbol = default_symbol or os.path.splitext(os.path.basename(csv_path))[0]
+            groups = [(symbol, df)]
+        else:
+            groups = df.groupby(column, sort=False)
+        with self._lock:
+            # one manifest write for the whole file, however many symbols it holds
+            symbols, replaced = dict(self.manifest()), []
+            rows = {str(symbol): self._write_file(str(symbol), part, True, symbols, replaced)["rows"]
+                    for symbol, part in groups}
+            self._write_manifest(symbols)
+            self._remove_files(replaced)
+        return rows
+
+
+_STORES: Dict[str, IndexStore] = {}
+
+
+def get_index_store(root: str = STORE_ROOT) -> IndexStore:
+    store = _STORES.get(root)
+    if store is None:
+        store = _STORES.setdefault(root, IndexStore(root))
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-symbol OHLC store")
+    parser.add_argument("command", choices=["ingest", "list"])
+    parser.add_argument("csv", nargs="*", help="CSV files to ingest")
+    parser.add_argument("--root", default=STORE_ROOT)
+    parser.add_argument("--date-format", default=DATE_FORMAT,
+                        help="strftime format of the Date column ('' to infer)")
+    args = parser.parse_args()
+
+    store = IndexStore(args.root)
+    if args.command == "ingest":
+        for path in args.csv:
+            for symbol, rows in store.ingest_csv(path, args.date_format or None).items():
+                print(f"{symbol}: {rows} rows")
+    else:
+        for symbol in store.symbols():
+            entry = store.info(symbol)
+            print(f"{symbol:<30} {entry['rows']:>8} rows  {entry['start'][:10]} .. {entry['end'][:10]}")
@@ -0,0 +1,378 @@
+"""
+Resilient LLM calls: retries, circuit breaker, rate limiter, model fallback
+
+Wraps chat.completions.create on a (pooled) Groq client:
+  - retries rate limits (429), timeouts, connection errors and 5xx with
+    full-jitter exponential backoff, honouring Retry-After when sent
+  - one circuit breaker per model: after N failures in a row the model is
+    skipped for a cool-down period, then one trial call is let through
+  - a client-side token bucket per API key (key_bucket), so bursts wait
+    locally instead of being rejected by the API with 429; the provider's
+    limit is per key, so callers with their own key never wait on each other
+  - failover: models are tried in order, and a model whose recent p95 latency
+    or error rate is over the threshold is moved behind the healthy ones
+
+Other errors (bad request, auth) are not retried - they fail the same way on
+every model - and do not count against a model's breaker or health: one
+caller's bad key must not push everyone else onto the fallback. A single
+shared ResilientLLM per model list is kept for the whole process
+(get_resilient_llm), so health and breaker state survive Streamlit reruns.
+
+Settings from the environment:
+    LLM_MAX_RETRIES          retries per model                   (default 2)
+    LLM_RPM                  requests per minute and API key,
+                             0 = unlimited                        (default 30)
+    LLM_P95_THRESHOLD        seconds                              (default 20)
+    LLM_ERROR_RATE_THRESHOLD fraction of recent calls             (default 0.5)
+"""
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import groq
+
+
+MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 2))
+BASE_DELAY = 0.5                    # seconds, first backoff step
+MAX_DELAY = 8.0                     # seconds, cap for one backoff sleep
+RPM = float(os.environ.get("LLM_RPM", 30))
+P95_THRESHOLD = float(os.environ.get("LLM_P95_THRESHOLD", 20))
+ERROR_RATE_THRESHOLD = float(os.environ.get("LLM_ERROR_RATE_THRESHOLD", 0.5))
+HEALTH_WINDOW = 50                  # recent calls kept per model
+MIN_SAMPLES = 5                     # calls needed before health is judged
+PROBE_AFTER = 30.0                  # seconds before an unhealthy model gets a trial call again
+BREAKER_FAILURES = 5                # failures in a row that open a breaker
+BREAKER_RESET = 30.0                # seconds a breaker stays open
+
+RETRYABLE = (groq.RateLimitError, groq.APITimeoutError, groq.APIConnectionError,
+             groq.InternalServerError)
+
+
+class AllModelsFailed(Exception):
+    """
+    No model produced a reply; `errors` holds (model, exception) per attempt.
+    """
+
+    def __init__(self, errors: List[Tuple[str, BaseException]]):
+        self.errors = errors
+        detail = "; ".join(f"{model}: {type(err).__name__}" for model, err in errors) or "all circuits open"
+        super().__init__(f"All models failed ({detail})")
+
+
+def backoff_delay(attempt: int, error: Optional[BaseException] = None) -> float:
+    """
+    Full jitter: uniform(0, min(MAX_DELAY, BASE_DELAY * 2**attempt)).
+    A Retry-After header on the error response wins when present.
+    """
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return min(float(response.headers.get("retry-after")), MAX_DELAY)
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt))
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second, bursts up to `capacity`. acquire() blocks until a token is free.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take `tokens`, sleeping as long as needed. Returns the seconds waited.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def charge(self, tokens: float) -> None:
+        """
+        Take (or with a negative value, give back) tokens without waiting; the
+        balance may go below zero. For correcting an estimate after the fact.
+        """
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens - tokens)
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Non-blocking: take `tokens` and return 0.0, or return the seconds until they are available.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failures` errors in a row; open -> half-open after
+    `reset_after` seconds, when one trial call decides between closed and open again.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_after: float = BREAKER_RESET):
+        self.failures = failures
+        self.reset_after = reset_after
+        self.state = "closed"
+        self.errors_in_row = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_after:
+                self.state = "half-open"
+                return True
+            return False            # open, or half-open with the trial call in flight
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.errors_in_row = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.errors_in_row += 1
+            if self.state == "half-open" or self.errors_in_row >= self.failures:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """
+        The call failed for a reason that says nothing about the model (bad
+        request, auth): a half-open trial slot is handed back, nothing is counted.
+        """
+        with self._lock:
+            if self.state == "half-open":
+                self.state = "open"         # opened_at already expired: next call is the trial
+
+
+class ModelHealth:
+    """
+    Latency and outcome of the last `window` calls to one model.
+    """
+
+    def __init__(self, window: int = HEALTH_WINDOW):
+        self.calls: deque = deque(maxlen=window)      # (seconds, ok)
+        self.last_call = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.calls.append((seconds, ok))
+            self.last_call = time.monotonic()
+
+    def p95(self) -> float:
+        with self._lock:
+            times = sorted(s for s, ok in self.calls if ok)
+        return times[int(0.95 * (len(times) - 1))] if times else 0.0
+
+    def error_rate(self) -> float:
+        with self._lock:
+            calls = list(self.calls)
+        return sum(not ok for _, ok in calls) / len(calls) if calls else 0.0
+
+    def healthy(self, p95_threshold: float, error_rate_threshold: float) -> bool:
+        if len(self.calls) < MIN_SAMPLES:
+            return True
+        # a demoted model gets no traffic, so let a call through now and
+        # then to find out whether it recovered
+        if time.monotonic() - self.last_call > PROBE_AFTER:
+            return True
+        return self.p95() <= p95_threshold and self.error_rate() <= error_rate_threshold
+
+
+_BUCKETS: Dict[Tuple[str, float], TokenBucket] = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def key_bucket(api_key: str, rpm: float = RPM) -> TokenBucket:
+    """
+    Process wide rate limiter for one API key, shared by every model list and
+    session using that key. Keyed by the key's SHA-256, never the key itself.
+    """
+    key = (hashlib.sha256(api_key.encode("utf-8")).hexdigest(), rpm)
+    with _BUCKETS_LOCK:
+        if key not in _BUCKETS:
+            _BUCKETS[key] = TokenBucket(rpm / 60, max(1.0, rpm / 6))
+        return _BUCKETS[key]
+
+
+class ResilientLLM:
+    """
+    Chat completions over an ordered list of models (primary first).
+    """
+
+    def __init__(self, models: Sequence[str], max_retries: int = MAX_RETRIES, rpm: float = RPM,
+                 p95_threshold: float = P95_THRESHOLD,
+                 error_rate_threshold: float = ERROR_RATE_THRESHOLD):
+        self.models = list(models)
+        self.max_retries = max_retries
+        self.p95_threshold = p95_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.rpm = rpm          # per API key (key_bucket); breakers and health are per model
+        self.breakers = {m: CircuitBreaker() for m in self.models}
+        self.health = {m: ModelHealth() for m in self.models}
+        self.counters = {"calls": 0, "retries": 0, "failovers": 0, "failures": 0, "throttled_s": 0.0}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self.counters[name] += amount
+
+    def model_order(self) -> List[str]:
+        """
+        Healthy models first, each group in the configured order.
+        """
+        healthy = [m for m in self.models
+                   if self.health[m].healthy(self.p95_threshold, self.error_rate_threshold)]
+        return healthy + [m for m in self.models if m not in healthy]
+
+    def _attempts(self) -> Iterator[Tuple[str, int]]:
+        """
+        (model, attempt) pairs to try, skipping models whose breaker is open.
+        """
+        for model in self.model_order():
+            for attempt in range(self.max_retries + 1):
+                if not self.breakers[model].allow():
+                    break
+                yield model, attempt
+
+    def _create(self, client: groq.Groq, model: str, messages: list, stats: Optional[dict] = None,
+                **params):
+        if self.rpm > 0:
+            waited = key_bucket(client.api_key, self.rpm).acquire()
+            self._count("throttled_s", waited)
+            if stats is not None:
+                stats["queue_s"] = stats.get("queue_s", 0.0) + waited
+        # retries are done here, not by the SDK, so they count against the breaker
+        return client.with_options(max_retries=0).chat.completions.create(
+            messages=messages, model=model, **params)
+
+    def _failed(self, model: str, attempt: int, error: BaseException, t0: float,
+                errors: list) -> None:
+        if not isinstance(error, RETRYABLE):
+            # the caller's fault, not the model's: shared health and breaker state untouched
+            self.breakers[model].release()
+            raise error
+        self.health[model].record(time.perf_counter() - t0, False)
+        self.breakers[model].record_failure()
+        errors.append((model, error))
+        if attempt < self.max_retries:
+            self._count("retries")
+            time.sleep(backoff_delay(attempt, error))
+        else:
+            self._count("failovers")
+
+    def complete(self, client: groq.Groq, messages: list, stats: Optional[dict] = None, **params):
+        """
+        Non-streaming call. Returns (completion, model used); raises AllModelsFailed.
+        Time spent waiting for the rate limiter is added to stats["queue_s"].
+        """
+        self._count("calls")
+        errors: List[Tuple[str, BaseException]] = []
+        for model, attempt in self._attempts():
+            t0 = time.perf_counter()
+            try:
+                completion = self._create(client, model, messages, stats, **params)
+            except Exception as error:
+                self._failed(model, attempt, error, t0, errors)
+                continue
+            self.health[model].record(time.perf_counter() - t0, True)
+            self.breakers[model].record_success()
+            return completion, model
+        self._count("failures")
+        raise AllModelsFailed(errors)
+
+    def stream(self, client: groq.Groq, messages: list, stats: Optional[dict] = None, **params):
+        """
+        Streaming call: yields chunks. Retries and failover happen only until the
+        first chunk arrived; an error after that is raised to the caller, since
+        part of the reply is already shown. stats["model"] is set to the model used,
+        rate limiter waits are added to stats["queue_s"].
+        """
+        self._count("calls")
+        errors: List[Tuple[str, BaseException]] = []
+        for model, attempt in self._attempts():
+            t0 = time.perf_counter()
+            try:
+                chunks = iter(self._create(client, model, messages, stats, stream=True, **params))
+                first = next(chunks)
+            except StopIteration:
+                first = None
+            except Exception as error:
+                self._failed(model, attempt, error, t0, errors)
+                continue
+            # health gets the time to the first chunk: a long reply is not a slow model
+            ttfb = time.perf_counter() - t0
+
+            if stats is not None:
+                stats["model"] = model
+            ok = False
+            try:
+                if first is not None:
+                    yield first
+                    yield from chunks
+                ok = True
+            except GeneratorExit:
+                ok = True           # the caller stopped reading - not the model's fault
+                raise
+            finally:
+                self.health[model].record(ttfb, ok)
+                if ok:
+                    self.breakers[model].record_success()
+                else:
+                    self.breakers[model].record_failure()
+            return
+        self._count("failures")
+        raise AllModelsFailed(errors)
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            out = {"counters": dict(self.counters)}
+        for m in self.models:
+            out[m] = {"state": self.breakers[m].state, "p95_s": round(self.health[m].p95(), 3),
+                      "error_rate": round(self.health[m].error_rate(), 3),
+                      "calls": len(self.health[m].calls)}
+        return out
+
+
+_LLMS: Dict[Tuple[str, ...], ResilientLLM] = {}
+_LLMS_LOCK = threading.Lock()
+
+
+def get_resilient_llm(models: Sequence[str]) -> ResilientLLM:
+    """
+    One shared ResilientLLM per model list for the whole process.
+    """
+    key = tuple(models)
+    with _LLMS_LOCK:
+        if key not in _LLMS:
+            _LLMS[key] = ResilientLLM(key)
+        return _LLMS[key]
@@ -0,0 +1,135 @@
+"""
+Per-call LLM telemetry: where does the time of a chat turn go?
+
+Every call records one row:
+
+    {"ts", "persona", "model", "stream", "ok", "queue_s", "ttft_s", "total_s",
+     "prompt_tokens", "completion_tokens"}
+
+queue_s   time spent waiting before the request went out (rate limiter,
+          per-key / per-user slots) - our side
+ttft_s    request sent -> first token (streaming only) - mostly the provider
+total_s   request sent -> last token
+
+Rows go to a bounded in-memory ring buffer (recent calls, for the sidebar
+summary) and to an append-only JSONL file for later analysis. Recording is a
+deque append plus a buffered write; the file is flushed at most once a
+second and at exit, so a call pays a few microseconds.
+
+    LLM_METRICS_PATH      metrics file (default llm_metrics.jsonl, empty = memory only)
+    LLM_METRICS_CAPACITY  calls kept in memory (default 2000)
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+
+METRICS_PATH = os.environ.get("LLM_METRICS_PATH", "llm_metrics.jsonl")
+METRICS_CAPACITY = int(os.environ.get("LLM_METRICS_CAPACITY", 2000))
+FLUSH_EVERY_S = 1.0
+
+# list prices, USD per 1M tokens (prompt, completion); unknown models cost 0
+PRICE_PER_MTOK = {
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "openai/gpt-oss-120b": (0.15, 0.75),
+}
+
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    price_in, price_out = PRICE_PER_MTOK.get(model, (0.0, 0.0))
+    return ((prompt_tokens or 0) * price_in + (completion_tokens or 0) * price_out) / 1e6
+
+
+def _pct(values: List[float], q: float) -> Optional[float]:
+    return values[int(q * (len(values) - 1))] if values else None
+
+
+class Telemetry:
+
+    def __init__(self, path: Optional[str] = METRICS_PATH, capacity: int = METRICS_CAPACITY):
+        self.path = path or None
+        self.calls = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._file = None
+        self._last_flush = 0.0
+        if self.path:
+            self._file = open(self.path, "a", encoding="utf-8", buffering=64 * 1024)
+            atexit.register(self.close)
+
+    def record(self, persona: str, model: Optional[str], ok: bool, total_s: float,
+               ttft_s: Optional[float] = None, queue_s: float = 0.0,
+               prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None,
+               stream: bool = False) -> Dict:
+        row = {"ts": round(time.time(), 3), "persona": persona, "model": model,
+               "stream": stream, "ok": ok, "queue_s": round(queue_s, 4),
+               "ttft_s": None if ttft_s is None else round(ttft_s, 4), "total_s": round(total_s, 4),
+               "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+        with self._lock:
+            self.calls.append(row)
+            if self._file is not None:
+                self._file.write(json.dumps(row) + "\n")
+                now = time.monotonic()
+                if now - self._last_flush >= FLUSH_EVERY_S:
+                    self._file.flush()
+                    self._last_flush = now
+        return row
+
+    def summary(self) -> List[Dict]:
+        """
+        One row per (persona, model) over the calls in memory: call and error
+        counts, p50 / p95 latency, p50 TTFT and queue time, generation speed
+        (completion tokens / time after the first token), tokens and cost.
+        """
+        with self._lock:
+            calls = list(self.calls)
+        groups: Dict[Tuple[str, str], List[Dict]] = {}
+        for row in calls:
+            groups.setdefault((row["persona"], row["model"] or "-"), []).append(row)
+
+        out = []
+        for (persona, model), rows in sorted(groups.items()):
+            ok = [r for r in rows if r["ok"]]
+            total = sorted(r["total_s"] for r in ok)
+            ttft = sorted(r["ttft_s"] for r in ok if r["ttft_s"] is not None)
+            queue = sorted(r["queue_s"] for r in rows)
+            prompt_tokens = sum(r["prompt_tokens"] or 0 for r in ok)
+            completion_tokens = sum(r["completion_tokens"] or 0 for r in ok)
+            # speed after the first token, from streamed calls (the others have no TTFT)
+            streamed = [r for r in ok if r["ttft_s"] is not None and r["completion_tokens"]]
+            gen_s = sum(r["total_s"] - r["ttft_s"] for r in streamed)
+            out.append({
+                "persona": persona, "model": model, "calls": len(rows),
+                "errors": len(rows) - len(ok),
+                "p50_s": _pct(total, 0.50), "p95_s": _pct(total, 0.95),
+                "ttft_p50_s": _pct(ttft, 0.50), "queue_p50_s": _pct(queue, 0.50),
+                "tokens_per_sec": (sum(r["completion_tokens"] for r in streamed) / gen_s
+                                   if gen_s > 0 else None),
+                "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "cost_usd": call_cost(model, prompt_tokens, completion_tokens),
+            })
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_TELEMETRY: Optional[Telemetry] = None
+_TELEMETRY_LOCK = threading.Lock()
+
+
+def get_telemetry() -> Telemetry:
+    """
+    Process-wide recorder shared by every session / request.
+    """
+    global _TELEMETRY
+    with _TELEMETRY_LOCK:
+        if _TELEMETRY is None:
+            _TELEMETRY = Telemetry()
+        return _TELEMETRY
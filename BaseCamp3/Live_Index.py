@@ -0,0 +1,232 @@
+"""
+Live index data: new bars are appended to the store and folded into the
+in-memory series without recomputing the history
+
+LiveSeries holds one symbol in growable NumPy column buffers (dates, OHLC,
+returns, day-trend codes) plus, for each window set asked for, the
+volatility surface and a RollingVolState. refresh() reads only the bars
+appended to the store since the last call (Index_Store.read_tail), computes
+their returns and trend codes, and pushes each return through the rolling
+state: O(len(windows)) per new bar, whatever the length of the history.
+frame() and surface() return views of the buffers, no copies.
+
+If the stored history itself changed (a backfill through write_symbol, seen
+as a new base_version in the manifest) the series is reloaded in full.
+
+Ingestion:
+    python Live_Index.py append "NIFTY 50" new_bars.csv
+    python Live_Index.py simulate "NIFTY 50" --every 1      # a random bar per second
+"""
+import argparse
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from Index_Store import DATE_FORMAT, OHLC_COLUMNS, IndexStore, get_index_store
+from Vol_Engine import TRADING_DAYS, RollingVolState, cached_vol_surface
+
+
+# 0.25% threshold:
+# Green: Close >= Open * (1 + 0.0025)
+# Red  : Close <= Open * (1 - 0.0025)
+# Amber: otherwise
+TREND_THRESHOLD = 0.0025  # 0.25%
+TREND_CIRCLES = ["🟢", "🔴", "🟡"]
+TREND_TEXT = ["Green", "Red", "Amber"]
+
+MAX_SURFACES = 4            # window sets kept up to date per symbol
+
+
+def trend_codes(open_: np.ndarray, close: np.ndarray) -> np.ndarray:
+    # 0 green, 1 red, 2 amber - indexes into TREND_CIRCLES / TREND_TEXT
+    is_green = close >= open_ * (1 + TREND_THRESHOLD)
+    is_red = close <= open_ * (1 - TREND_THRESHOLD)
+    return np.select([is_green, is_red], [0, 1], default=2).astype(np.int8)
+
+
+class LiveSeries:
+
+    def __init__(self, symbol: str, store: Optional[IndexStore] = None,
+                 annualize: float = TRADING_DAYS):
+        self.symbol = symbol
+        self.store = store or get_index_store()
+        self.annualize = annualize
+        self._lock = threading.Lock()
+        self._reload()
+
+    # -------------------------
+    # Buffers
+    # -------------------------
+    def _reload(self) -> None:
+        entry = self.store.info(self.symbol)
+        bars = self.store.load(self.symbol)
+        self.base_version = entry.get("base_version")
+        self.n = 0
+        self._allocate(max(64, len(bars) + len(bars) // 4))
+        self._surfaces = OrderedDict()      # windows -> [z buffer, RollingVolState]
+        self._extend(bars)
+
+    def _allocate(self, capacity: int) -> None:
+        old = getattr(self, "dates", None)
+        self.capacity = capacity
+        grown = {
+            "dates": np.empty(capacity, dtype="datetime64[us]"),
+            "ohlc": {c: np.empty(capacity) for c in OHLC_COLUMNS},
+            "returns": np.empty(capacity),
+            "codes": np.empty(capacity, dtype=np.int8),
+        }
+        if old is not None:
+            # earlier views (frames handed out before) keep the old arrays
+            n = self.n
+            grown["dates"][:n] = self.dates[:n]
+            for c in OHLC_COLUMNS:
+                grown["ohlc"][c][:n] = self.ohlc[c][:n]
+            grown["returns"][:n] = self.returns[:n]
+            grown["codes"][:n] = self.codes[:n]
+            for slot in self._surfaces.values():
+                z = np.full((slot[0].shape[0], capacity), np.nan)
+                z[:, :n] = slot[0][:, :n]
+                slot[0] = z
+        self.dates, self.ohlc = grown["dates"], grown["ohlc"]
+        self.returns, self.codes = grown["returns"], grown["codes"]
+
+    def _extend(self, bars: pd.DataFrame) -> None:
+        m = len(bars)
+        if m == 0:
+            return
+        n = self.n
+        if n + m > self.capacity:
+            self._allocate(max(2 * self.capacity, n + m))
+        end = n + m
+        self.dates[n:end] = bars.index.to_numpy(dtype="datetime64[us]")
+        for c in OHLC_COLUMNS:
+            self.ohlc[c][n:end] = bars[c].to_numpy(dtype=np.float64)
+        close = self.ohlc["Close"]
+        # returns as pct_change() over the whole history: the first uses the previous close
+        prev = close[n - 1:end - 1] if n else np.concatenate(([np.nan], close[:end - 1]))
+        np.divide(close[n:end], prev, out=self.returns[n:end])
+        self.returns[n:end] -= 1.0
+        self.codes[n:end] = trend_codes(self.ohlc["Open"][n:end], close[n:end])
+
+        # O(windows) per new bar for every surface being tracked
+        for z, state in self._surfaces.values():
+            for i in range(n, end):
+                z[:, i] = state.push(self.returns[i])
+        self.n = end
+
+    # -------------------------
+    # Public
+    # -------------------------
+    def refresh(self) -> int:
+        """
+        Pull bars added to the store since the last call. Returns how many
+        rows were added (a full reload counts as all rows).
+        """
+        with self._lock:
+            entry = self.store.info(self.symbol)
+            if entry.get("base_version") != self.base_version or entry["rows"] < self.n:
+                self._reload()
+                return self.n
+            if entry["rows"] == self.n:
+                return 0
+            before = self.n
+            self._extend(self.store.read_tail(self.symbol, self.n))
+            return self.n - before
+
+    def frame(self) -> pd.DataFrame:
+        """
+        Date-indexed frame over the first n rows of the buffers: Open, High,
+        Low, Close, Return, Day_Trend, Day_Trend_Text. Views, not copies - read-only.
+        """
+        with self._lock:
+            n = self.n
+            columns = {c: self.ohlc[c][:n] for c in OHLC_COLUMNS}
+            columns["Return"] = self.returns[:n]
+            codes = self.codes[:n]
+            columns["Day_Trend"] = pd.Categorical.from_codes(codes, TREND_CIRCLES, validate=False)
+            columns["Day_Trend_Text"] = pd.Categorical.from_codes(codes, TREND_TEXT, validate=False)
+            index = pd.DatetimeIndex(self.dates[:n], name="Date", copy=False)
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    def surface(self, windows: Sequence[int]) -> np.ndarray:
+        """
+        Volatility surface (len(windows) x n) for these windows. The first
+        request computes it for the whole history (Vol_Engine); after that
+        new bars only add columns.
+        """
+        key = tuple(int(w) for w in windows)
+        with self._lock:
+            slot = self._surfaces.get(key)
+            if slot is None:
+                n = self.n
+                z = np.full((len(key), self.capacity), np.nan)
+                z[:, :n] = cached_vol_surface(self.returns[:n], key, self.annualize)
+                state = RollingVolState.from_returns(self.returns[:n], key, self.annualize)
+                slot = self._surfaces[key] = [z, state]
+                while len(self._surfaces) > MAX_SURFACES:
+                    self._surfaces.popitem(last=False)
+            self._surfaces.move_to_end(key)
+            return slot[0][:, :self.n]
+
+    def last_bar(self) -> Optional[pd.Timestamp]:
+        return pd.Timestamp(self.dates[self.n - 1]) if self.n else None
+
+
+# -------------------------
+# Ingestion
+# -------------------------
+def append_csv(store: IndexStore, symbol: str, csv_path: str,
+               date_format: Optional[str] = DATE_FORMAT) -> dict:
+    bars = pd.read_csv(csv_path)
+    bars["Date"] = pd.to_datetime(bars["Date"], format=date_format)
+    return store.append(symbol, bars)
+
+
+def simulate(store: IndexStore, symbol: str, every: float, count: int, seed: int = 0) -> None:
+    """
+    Append a random-walk daily bar after the last stored one every `every`
+    seconds (count=0: until interrupted).
+    """
+    rng = np.random.default_rng(seed)
+    last = store.load(symbol).iloc[-1]
+    date, close = store.info(symbol)["end"], float(last["Close"])
+    done = 0
+    while not count or done < count:
+        date = pd.Timestamp(date) + pd.offsets.BDay(1)
+        open_ = close * (1 + rng.normal(0, 0.003))
+        close = open_ * (1 + rng.normal(0, 0.008))
+        high = max(open_, close) * (1 + abs(rng.normal(0, 0.002)))
+        low = min(open_, close) * (1 - abs(rng.normal(0, 0.002)))
+        store.append(symbol, pd.DataFrame({"Date": [date], "Open": [open_], "High": [high],
+                                           "Low": [low], "Close": [close]}))
+        done += 1
+        print(f"{symbol} {date:%Y-%m-%d}  O {open_:.2f}  H {high:.2f}  L {low:.2f}  C {close:.2f}")
+        time.sleep(every)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append bars to the index store")
+    parser.add_argument("command", choices=["append", "simulate"])
+    parser.add_argument("symbol")
+    parser.add_argument("csv", nargs="?", help="append: CSV with Date, Open, High, Low, Close")
+    parser.add_argument("--root", default=None, help="store folder (default: INDEX_STORE / index_store)")
+    parser.add_argument("--date-format", default=DATE_FORMAT)
+    parser.add_argument("--every", type=float, default=1.0, help="simulate: seconds between bars")
+    parser.add_argument("--count", type=int, default=0, help="simulate: bars to add, 0 = forever")
+    args = parser.parse_args()
+
+    store = IndexStore(args.root) if args.root else get_index_store()
+    if args.command == "append":
+        if not args.csv:
+            parser.error("append needs a CSV file")
+        entry = append_csv(store, args.symbol, args.csv, args.date_format or None)
+        print(f"{args.symbol}: {entry['rows']} rows, last bar {entry['end'][:10]}")
+    else:
+        try:
+            simulate(store, args.symbol, args.every, args.count)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,163 @@
+"""
+Client for the chat service (FastAPI_Chat_App)
+
+- One keep-alive connection pool per client (httpx), reused across turns
+- chat() for a JSON reply, stream() for the Server-Sent Events reply
+- 429 / 503 (quota or busy service) are retried with Retry-After / jittered
+  backoff before any reply text arrived; other failures raise ChatApiError
+
+Usage:
+    client = ChatApiClient("http://127.0.0.1:5604", user_id="alice",
+                           token=os.environ.get("CHAT_SERVICE_TOKEN"))
+    for piece in client.stream("Techie", "What is a socket?", stats=stats):
+        print(piece, end="")
+"""
+import json
+import random
+import time
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+
+
+RETRY_STATUS = {429, 503}
+
+
+class ChatApiError(Exception):
+    """
+    The service did not return a (complete) reply. status_code is 0 for
+    connection errors; partial is True when part of a streamed reply arrived.
+    """
+
+    def __init__(self, message: str, status_code: int = 0, partial: bool = False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.partial = partial
+
+
+class ChatApiClient:
+
+    def __init__(self, base_url: str, user_id: str = "anonymous", timeout: float = 120.0,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 pool_size: int = 20, token: Optional[str] = None):
+        # token: the service's CHAT_SERVICE_TOKEN; without it the service counts
+        # quotas per client address and ignores user_id
+        self.base_url = (base_url or "").rstrip("/")
+        self.user_id = user_id
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._client = httpx.Client(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            headers={"X-User-Id": user_id,
+                     **({"Authorization": f"Bearer {token}"} if token else {})},
+        )
+
+    def _backoff(self, attempt: int, resp: Optional[httpx.Response]) -> float:
+        retry_after = resp.headers.get("Retry-After") if resp is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _body(character: str, prompt: str, history: Optional[List[Dict]], use_cache: bool) -> Dict:
+        return {"character": character, "prompt": prompt, "history": history or [],
+                "use_cache": use_cache}
+
+    @staticmethod
+    def _error(resp: httpx.Response) -> ChatApiError:
+        try:
+            detail = resp.json().get("detail", resp.text)
+        except ValueError:
+            detail = resp.text
+        return ChatApiError(f"{resp.status_code}: {detail}", status_code=resp.status_code)
+
+    def personas(self) -> List[str]:
+        return self.persona_info()["personas"]
+
+    def persona_info(self) -> Dict:
+        """
+        {"personas": [...], "doc_tokens": {persona: tokens the service adds to its prompts}}
+        """
+        try:
+            resp = self._client.get("/personas")
+        except httpx.HTTPError as exc:
+            raise ChatApiError(f"chat service unreachable: {exc}") from exc
+        if resp.status_code != 200:
+            raise self._error(resp)
+        return resp.json()
+
+    def chat(self, character: str, prompt: str, history: Optional[List[Dict]] = None,
+             use_cache: bool = False) -> Dict:
+        """
+        Returns {"reply", "cached", "stats"}.
+        """
+        body = self._body(character, prompt, history, use_cache)
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = self._client.post("/chat", json=body)
+            except httpx.HTTPError as exc:
+                raise ChatApiError(f"chat service unreachable: {exc}") from exc
+            if resp.status_code in RETRY_STATUS and attempt < self.max_retries:
+                time.sleep(self._backoff(attempt, resp))
+                continue
+            if resp.status_code != 200:
+                raise self._error(resp)
+            return resp.json()
+
+    def stream(self, character: str, prompt: str, history: Optional[List[Dict]] = None,
+               use_cache: bool = False, stats: Optional[Dict] = None) -> Iterator[str]:
+        """
+        Yields the reply piece by piece. On success `stats` gets the service's
+        `done` event (ttft, total, tokens, tokens_per_sec, model, cached).
+        """
+        body = self._body(character, prompt, history, use_cache)
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._client.stream("POST", "/chat/stream", json=body) as resp:
+                    if resp.status_code in RETRY_STATUS and attempt < self.max_retries:
+                        delay = self._backoff(attempt, resp)
+                    elif resp.status_code != 200:
+                        resp.read()
+                        raise self._error(resp)
+                    else:
+                        yield from self._events(resp, stats)
+                        return
+            except httpx.HTTPError as exc:
+                raise ChatApiError(f"chat service unreachable: {exc}") from exc
+            time.sleep(delay)
+
+    @staticmethod
+    def _events(resp: httpx.Response, stats: Optional[Dict]) -> Iterator[str]:
+        event, got_text = "message", False
+        for line in resp.iter_lines():
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[5:])
+                if event == "error":
+                    raise ChatApiError(data.get("detail", "chat failed"), status_code=502,
+                                       partial=data.get("partial", got_text))
+                if event == "done":
+                    if stats is not None:
+                        stats.update(data)
+                    return
+                got_text = True
+                yield data["delta"]
+            elif not line:
+                event = "message"
+        raise ChatApiError("stream ended without a reply", status_code=502, partial=got_text)
+
+    def service_stats(self) -> Dict:
+        try:
+            return self._client.get("/stats").json()
+        except (httpx.HTTPError, ValueError):
+            return {}
+
+    def close(self) -> None:
+        self._client.close()
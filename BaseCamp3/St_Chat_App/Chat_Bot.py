@@ -1,5 +1,11 @@
 import streamlit as st
-from groq import Groq
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from Chat_Api_Client import ChatApiClient, ChatApiError
+from Chat_Context import ConversationContext, count_tokens
+from Chat_History import ChatLog, new_session_id, valid_session_id
 
 # -------------------------------------------------------
 # App config
@@ -10,93 +16,234 @@ st.set_page_config(
     layout="wide",
 )
 
-# System prompt for Various Characters
-CHARACTER_SYSTEM_PROMPTS = {
-    "Philosopher": (
-        "You are a thoughtful philosopher. "
-        "Respond in a reflective, calm, and sometimes abstract terms, "
-        "providing analogies and deeper meaning."
-    ),
-    "Techie": (
-        "You are a practical, detail-oriented engineer. "
-        "Repond with explaining things clearly, with examples, and keep a technical tone."
-    ),
-    "Politician": (
-        "You are a diplomatic politician, who has a societal and patriotic view"
-        "You always spean in a careful, optimistic, and often in a balanced, "
-        "non-committal way."
-    ),
-    "Friend": (
-        "You are a warm, supportive friend. You are eager to understand and participate."
-        "You respond casually, with empathy and encouragement & some times witty"
-    ),
-    "Kid": (
-        "You are a curious kid. "
-        "You ask simple questions, use simple words, and sound playful."
-    ),
-}
-
-# Chat Function
-def chat(api_key: str, character: str, prompt: str) -> str:
-
-    system_prompt = CHARACTER_SYSTEM_PROMPTS.get(character, "Respond to User Query")
-
-    # Client Created with the API provided
-    Client = Groq (api_key = api_key)
-
-    messages=[
-        {
-            "role": "system",
-            "content": system_prompt,
-        },
-        # {
-        #     "role": "system",
-        #     "content": "where ncessary provide response as markdown text",
-        # },        
-        {
-            "role": "user",
-            "content": prompt,
-        }
-    ]
-    try :
-        
-        completion = Client.chat.completions.create(
-            messages=messages,    
-            model="llama-3.3-70b-versatile",
-            # model="openai/gpt-oss-120b",
-            stop=None,
-        )
-
-        return completion.choices[0].message.content
-    
-    except Exception:
-
-        return "Error invoking LLM"
+
+# The LLM calls, personas, response cache and rate limits live in the chat
+# service (FastAPI_Chat_App); this app only renders and keeps the session.
+#
+# Run from BaseCamp3 (same secret on both sides):
+#   (cd FastAPI_Chat_App && CHAT_SERVICE_TOKEN=<secret> GROQ_API_KEY=<key> python app.py)
+#   CHAT_API_URL=http://127.0.0.1:5604 CHAT_SERVICE_TOKEN=<secret> streamlit run St_Chat_App/Chat_Bot.py
+# CHAT_API_URL       base URL of the chat service
+# CHAT_SERVICE_TOKEN shared secret; without it the service ignores our user ids and
+#                    counts every user of this app as one (this server's address)
+CHAT_API_URL = os.environ.get("CHAT_API_URL", "http://127.0.0.1:5604")
+ERROR_REPLY = "Error invoking LLM"
+SYSTEM_PROMPT_RESERVE = 64      # tokens kept free for the persona prompt added by the service
+# shared secret of the chat service: with it, the service trusts the user id we send
+SERVICE_TOKEN = os.environ.get("CHAT_SERVICE_TOKEN", "")
+MAX_CLIENTS = 256
+
+
+@st.cache_resource(max_entries=MAX_CLIENTS)
+def get_client(base_url: str, user_id: str) -> ChatApiClient:
+    # one pooled client per (service, user) for all reruns
+    return ChatApiClient(base_url, user_id=user_id, token=SERVICE_TOKEN or None)
+
+
+def current_user() -> str:
+    """
+    The user the service's quotas apply to, decided here rather than typed
+    in: the signed-in account when Streamlit auth is configured, else the
+    browser's address, else this session.
+    """
+    if getattr(st.user, "is_logged_in", False):
+        return str(st.user.get("email") or st.user.get("sub"))
+    ip = st.context.ip_address      # None on localhost
+    return ip if isinstance(ip, str) and ip else st.session_state.session_id[:8]
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_personas(base_url: str) -> dict:
+    # personas + the doc-passage tokens the service adds for each (the service's defaults
+    # when it cannot be reached)
+    try:
+        info = ChatApiClient(base_url).persona_info()
+        return {"personas": info["personas"], "doc_tokens": info.get("doc_tokens", {})}
+    except ChatApiError:
+        return {"personas": ["Philosopher", "Techie", "Politician", "Friend", "Kid"],
+                "doc_tokens": {"Techie": 600}}
+
+
+def format_stats(stats: dict) -> str:
+    if stats.get("cached"):
+        return "⚡ from cache"
+    if "ttft" in stats:
+        caption = (f"⏱ TTFT {stats['ttft']:.2f}s · {stats.get('tokens', 0)} tokens · "
+                   f"{stats.get('tokens_per_sec', 0):.1f} tok/s · total {stats.get('total', 0):.2f}s")
+    elif "total" in stats:
+        # non-streamed reply: no time to first token
+        caption = f"⏱ {stats.get('tokens', 0)} tokens · total {stats['total']:.2f}s"
+    else:
+        return ""
+    if not stats.get("primary", True):
+        caption += f" · {stats.get('model')}"
+    return caption
+
+
+def stream_reply(client: ChatApiClient, character: str, prompt: str, on_complete=None,
+                 history: list = None, use_cache: bool = False):
+    """
+    Render the reply into the current chat message while it streams.
+    Returns (reply text, stats caption). Partial output is kept if the stream fails.
+    on_complete(text) is called only when the whole reply arrived.
+    """
+    stats = {}
+    reply = f"**{character}**:  "
+    body = ""
+    placeholder = st.empty()
+    try:
+        for piece in client.stream(character, prompt, history=history, use_cache=use_cache,
+                                   stats=stats):
+            body += piece
+            placeholder.markdown(reply + body + "▌")
+        if on_complete is not None:
+            on_complete(body)
+    except ChatApiError as exc:
+        body += f"\n\n⚠️ {ERROR_REPLY}: {exc}" + (" (reply is partial)" if body else "")
+    reply += body
+    placeholder.markdown(reply)
+
+    caption = format_stats(stats)
+    if caption:
+        st.caption(caption)
+    return reply, caption
+
+
+def fan_out_reply(client: ChatApiClient, personas: list, prompt: str, use_cache: bool):
+    """
+    Send the prompt to every persona at once and render the answers side by
+    side as each one completes. Calls run on a thread pool; the service caps
+    them per user (CHAT_USER_MAX_CONCURRENT, 8 by default) and globally, so while
+    both caps cover all personas wall time is the slowest persona, not the sum.
+    Returns (combined reply text, stats caption).
+    """
+
+    slots = {}
+    for col, name in zip(st.columns(len(personas)), personas):
+        with col:
+            st.markdown(f"**{name}**")
+            slots[name] = (st.empty(), st.empty())
+            slots[name][0].markdown("_thinking ..._")
+
+    # runs on a worker thread: no st.* calls in here
+    def ask(name):
+        t0 = time.perf_counter()
+        try:
+            res = client.chat(name, prompt, use_cache=use_cache)
+            reply, cached = res["reply"], res["cached"]
+        except ChatApiError as exc:
+            reply, cached = f"⚠️ {ERROR_REPLY}: {exc}", False
+        return name, reply, time.perf_counter() - t0, cached
+
+    t0 = time.perf_counter()
+    replies, seconds = {}, {}
+    with ThreadPoolExecutor(max_workers=len(personas)) as pool:
+        for future in as_completed([pool.submit(ask, name) for name in personas]):
+            name, reply, secs, cached = future.result()
+            replies[name], seconds[name] = reply, secs
+            body, caption = slots[name]
+            body.markdown(reply)
+            caption.caption("⚡ from cache" if cached else f"{secs:.2f}s")
+    wall = time.perf_counter() - t0
+
+    stats = f"⏱ all {len(personas)} personas in {wall:.2f}s (sum of calls {sum(seconds.values()):.2f}s)"
+    st.caption(stats)
+    combined = "\n\n".join(f"**{name}**:  {replies[name]}" for name in personas)
+    return combined, stats
 
 
 # -------------------------------------------------------
 # Session state for chat history
 # -------------------------------------------------------
-if "messages" not in st.session_state:
-    st.session_state.messages = []  # list of dicts: {role: "user"/"assistant", "content": str}
+# Messages are appended to a per-session log on disk (Chat_History); the
+# session id is kept in the URL (?session=...) so a refresh restores the chat.
+# Only the last `show_count` messages are read and rendered on each rerun.
+RENDER_LAST = 30            # messages shown when a session is opened
+PAGE_SIZE = 30              # older messages loaded per "Load older" click
+CONTEXT_RESTORE = 200       # most recent messages replayed into the context on restore
+
+
+def open_session(session_id: str) -> None:
+    log = ChatLog(session_id)
+    st.session_state.session_id = session_id
+    st.session_state.chat_log = log
+    st.session_state.show_count = RENDER_LAST
+    st.query_params["session"] = session_id
 
+    # Turns sent to the model, within a token budget (older turns folded into a summary).
+    # Rebuilt from a bounded tail of the log: entries carry "ctx" when they went into the context
+    context = ConversationContext()
+    for msg in log.tail(CONTEXT_RESTORE):
+        if msg.get("ctx"):
+            context.add(msg["role"], msg["ctx"])
+    st.session_state.context = context
 
-# Sidebar: API key + character
+
+def load_older() -> None:
+    st.session_state.show_count += PAGE_SIZE
+
+
+if "chat_log" not in st.session_state:
+    session_id = st.query_params.get("session")
+    open_session(session_id if valid_session_id(session_id) else new_session_id())
+
+
+# Sidebar: chat service + character
 with st.sidebar:
     st.header("Settings")
 
-    api_key = st.text_input(
-        "API Key",
-        type="password",            # 🔐 hides characters
-        help="Your API key for groq",
-    )
+    api_url = st.text_input("Chat service", value=CHAT_API_URL,
+                            help="Base URL of the chat service (FastAPI_Chat_App)")
+    user_id = current_user()[:64]
+    st.caption(f"User: {user_id} · rate limits and quotas are applied per user")
+    if not SERVICE_TOKEN:
+        st.warning("CHAT_SERVICE_TOKEN is not set: the chat service counts all users of "
+                   "this app against one shared quota.", icon="⚠️")
+    client = get_client(api_url, user_id)
+    persona_info = get_personas(api_url)
+    personas = persona_info["personas"]
 
     character = st.selectbox(
         "Character",
-        options=["Philosopher", "Techie", "Politician", "Friend", "Kid"],
+        options=personas,
         index=0,  # default to Techie
     )
 
+    streaming = st.toggle("Stream replies", value=True,
+                          help="Show tokens as they arrive, with time-to-first-token and tokens/sec")
+
+    compare_all = st.toggle("Compare all personas", value=False,
+                            help="Ask every character at once and show the answers side by side "
+                                 "(no conversation history is sent in this mode)")
+
+    context = st.session_state.context
+    context.budget = st.number_input("Context budget (tokens)", min_value=200, max_value=32000,
+                                     value=context.budget, step=200,
+                                     help="Upper bound on prompt size: recent turns that fit are sent, "
+                                          "older ones are folded into a summary")
+    ctx = context.stats()
+    st.caption(f"Context: {ctx['turns']} turns · {ctx['turn_tokens']} tokens · "
+               f"summary {ctx['summary_tokens']} tokens ({ctx['folded_turns']} turns folded)")
+
+    use_cache = st.toggle("Cache replies", value=False,
+                          help="Answer a repeated (character, prompt) from the service's response "
+                               "cache, without calling the LLM")
+
+    # Load on the shared service (all users)
+    svc = client.service_stats()
+    if svc:
+        st.caption(f"Service: {svc['in_flight']}/{svc['max_concurrency']} in flight · "
+                   f"{svc['waiting']} waiting · {svc['served']} served · "
+                   f"{svc['cache_hits']} cache hits")
+    else:
+        st.caption(f"⚠️ Chat service not reachable at {api_url}")
+
+    chat_log = st.session_state.chat_log
+    st.caption(f"Session {chat_log.session_id[:8]} · {len(chat_log)} messages")
+    if st.button("New chat"):
+        open_session(new_session_id())
+        st.rerun()
+
     st.markdown("---")
     st.caption(
         "Tip: Change the character and send another message to see how tone changes."
@@ -113,29 +260,73 @@ st.write(
 )
 st.markdown("---")
 
-# Show chat history
-for msg in st.session_state.messages:
+# Show chat history: only the newest show_count messages, older ones on demand
+chat_log = st.session_state.chat_log
+if len(chat_log) > st.session_state.show_count:
+    hidden = len(chat_log) - st.session_state.show_count
+    st.button(f"Load older messages ({hidden} not shown)", on_click=load_older)
+
+for msg in chat_log.tail(st.session_state.show_count):
     with st.chat_message(msg["role"]):
         st.markdown(msg["content"])
+        if msg.get("stats"):
+            st.caption(msg["stats"])
 
 # Chat input (Enter to send)
 user_prompt = st.chat_input("Type your message and press Enter...")
 
 if user_prompt:
     #  Show user message
-    st.session_state.messages.append({"role": "user", "content": user_prompt})
+    # "ctx": this message also goes into the model context (not in compare mode)
+    chat_log.append({"role": "user", "content": user_prompt,
+                     **({} if compare_all else {"ctx": user_prompt})})
     with st.chat_message("user"):
         st.markdown(user_prompt)
 
-    # Check API key
-    if not api_key:
-        assistant_reply = "⚠️ Please provide an API key in the sidebar."
-    else:
-        # Call backend chat()
-        assistant_reply = chat(api_key=api_key, character=character, prompt=user_prompt)
-        assistant_reply = f"**{character}**:  "+assistant_reply
+if user_prompt and compare_all:
+    with st.chat_message("assistant"):
+        assistant_reply, reply_stats = fan_out_reply(client, personas, user_prompt, use_cache)
+    chat_log.append({"role": "assistant", "content": assistant_reply, "stats": reply_stats})
+
+elif user_prompt:
+    # Earlier turns that fit the budget, next to the system prompt and this prompt
+    reserve = SYSTEM_PROMPT_RESERVE + count_tokens(user_prompt)
+    # room for the doc passages the service adds for grounded personas (Techie)
+    reserve += persona_info["doc_tokens"].get(character, 0)
+    history = context.history(reserve=reserve)
+
+    completed = []   # the reply text, once it arrived in full
+
+    def save_reply(text):
+        if text:
+            completed.append(text)
 
-    # Show assistant reply
-    st.session_state.messages.append({"role": "assistant", "content": assistant_reply})
     with st.chat_message("assistant"):
-        st.markdown(assistant_reply)
+        reply_stats = ""
+        if streaming:
+            # Tokens are rendered as they arrive
+            assistant_reply, reply_stats = stream_reply(client, character, user_prompt,
+                                                        on_complete=save_reply, history=history,
+                                                        use_cache=use_cache)
+        else:
+            # One JSON reply from the service
+            try:
+                res = client.chat(character, user_prompt, history=history, use_cache=use_cache)
+                save_reply(res["reply"])
+                reply_text = res["reply"]
+                reply_stats = format_stats({**res["stats"], "cached": res["cached"]})
+            except ChatApiError as exc:
+                reply_text = f"⚠️ {ERROR_REPLY}: {exc}"
+            assistant_reply = f"**{character}**:  "+reply_text
+            st.markdown(assistant_reply)
+            if reply_stats:
+                st.caption(reply_stats)
+
+    # Keep assistant reply in history
+    chat_log.append({"role": "assistant", "content": assistant_reply, "stats": reply_stats,
+                     **({"ctx": completed[0]} if completed else {})})
+
+    # Update the model context (token counts are added incrementally)
+    context.add("user", user_prompt)
+    if completed:
+        context.add("assistant", completed[0])
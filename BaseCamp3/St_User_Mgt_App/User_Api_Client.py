@@ -0,0 +1,320 @@
+"""
+Client SDK for the User Data Management API (FastAPI_App)
+
+- One keep-alive connection pool per client (httpx), reused across calls
+- Sync (UserApiClient) and async (AsyncUserApiClient) interfaces
+- Retries with jittered exponential backoff on 429 / 503 and connection errors
+- Batch helpers with bounded concurrency, and POST /users/batch when the server has it
+- Typed results (ApiResult) instead of raw responses
+
+Usage:
+    client = UserApiClient("http://127.0.0.1:5603", token="...")
+    res = client.get_user("U_0001")
+    if res.ok:
+        print(res.data)
+"""
+import asyncio
+import copy
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+
+
+RETRY_STATUS = {429, 503}
+
+# POST / PATCH are retried only with an Idempotency-Key, so a retry never duplicates a write
+WRITE_METHODS = {"POST", "PATCH"}
+
+
+# -------------------------
+# Result type
+# -------------------------
+@dataclass
+class ApiResult:
+    """
+    Outcome of one API call (after retries).
+    status_code is 0 when no HTTP response was received (connection error / timeout).
+    """
+    status_code: int
+    data: Any = None
+    attempts: int = 1
+    elapsed_ms: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status_code < 300
+
+
+# -------------------------
+# Shared logic
+# -------------------------
+class _BaseUserApiClient:
+
+    def __init__(self, base_url: str, token: Optional[str] = None, timeout: float = 10.0,
+                 max_retries: int = 3, backoff_base: float = 0.25, backoff_max: float = 4.0,
+                 pool_size: int = 20):
+        self.base_url = (base_url or "").rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limits = httpx.Limits(max_connections=pool_size,
+                                   max_keepalive_connections=pool_size)
+        self._paths: Optional[Dict[str, Any]] = None   # OpenAPI paths, fetched once
+
+    def with_token(self, token: Optional[str]):
+        """
+        The same client - connection pool included - sending another bearer token.
+        Cheap, so one pooled client per server can serve many users. Closing it
+        closes the shared pool.
+        """
+        view = copy.copy(self)
+        view.token = token
+        return view
+
+    def _headers(self, auth: bool, method: str, idempotency_key: Optional[str]) -> Dict[str, str]:
+        headers = {"Accept": "application/json"}
+        if auth and self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        if method in WRITE_METHODS:
+            headers["Idempotency-Key"] = idempotency_key or uuid.uuid4().hex
+        return headers
+
+    def _backoff(self, attempt: int, resp: Optional[httpx.Response]) -> float:
+        """
+        Delay before the next attempt: Retry-After if the server sent one,
+        otherwise full-jitter exponential backoff.
+        """
+        if resp is not None:
+            retry_after = resp.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(self.backoff_max, float(retry_after))
+                except ValueError:
+                    pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def _parse(resp: httpx.Response) -> Any:
+        try:
+            return resp.json()
+        except ValueError:
+            return resp.text
+
+    def _result(self, resp: Optional[httpx.Response], error: Optional[str],
+                attempts: int, t0: float) -> ApiResult:
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        if resp is None:
+            return ApiResult(status_code=0, attempts=attempts, elapsed_ms=elapsed_ms, error=error)
+        return ApiResult(status_code=resp.status_code, data=self._parse(resp),
+                         attempts=attempts, elapsed_ms=elapsed_ms)
+
+    def _has(self, method: str, path: str) -> bool:
+        return method.lower() in (self._paths or {}).get(path, {})
+
+    def _set_paths(self, res: ApiResult) -> None:
+        # a failed fetch is not remembered, so the next call asks again
+        if res.ok and isinstance(res.data, dict):
+            self._paths = res.data.get("paths", {})
+
+    @staticmethod
+    def _page_params(cursor: Optional[str], limit: int) -> Dict[str, Any]:
+        params: Dict[str, Any] = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        return params
+
+    @staticmethod
+    def _patch_body(user_id: str, fields: Dict[str, Any]) -> Dict[str, Any]:
+        body = {k: v for k, v in fields.items() if v not in ("", None)}
+        body["user_id"] = user_id
+        return body
+
+
+# -------------------------
+# Sync client
+# -------------------------
+class UserApiClient(_BaseUserApiClient):
+    """
+    Blocking client. Safe to share between threads (e.g. st.cache_resource).
+    """
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self._client = httpx.Client(base_url=self.base_url, timeout=self.timeout,
+                                    limits=self.limits)
+
+    def request(self, method: str, path: str, *, auth: bool = False,
+                idempotency_key: Optional[str] = None, **kwargs) -> ApiResult:
+        headers = self._headers(auth, method, idempotency_key)
+        t0 = time.perf_counter()
+        resp, error = None, None
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp, error = self._client.request(method, path, headers=headers, **kwargs), None
+                if resp.status_code not in RETRY_STATUS:
+                    break
+            except httpx.TransportError as e:
+                resp, error = None, f"{type(e).__name__}: {e}"
+            if attempt < self.max_retries:
+                time.sleep(self._backoff(attempt, resp))
+        return self._result(resp, error, attempt + 1, t0)
+
+    # ---- end points ----
+    def get_user(self, user_id: str) -> ApiResult:
+        return self.request("GET", "/user", params={"user_id": user_id})
+
+    def list_users(self, cursor: Optional[str] = None, limit: int = 50) -> ApiResult:
+        """
+        One page of GET /users; data is {"users", "next_cursor", "total"}.
+        """
+        return self.request("GET", "/users", params=self._page_params(cursor, limit))
+
+    def update_user(self, user_id: str, idempotency_key: Optional[str] = None, **fields) -> ApiResult:
+        return self.request("PATCH", "/user", auth=True, idempotency_key=idempotency_key,
+                            json=self._patch_body(user_id, fields))
+
+    def add_user(self, user: Dict[str, Any], idempotency_key: Optional[str] = None) -> ApiResult:
+        return self.request("POST", "/add_user", auth=True, idempotency_key=idempotency_key,
+                            json=user)
+
+    def batch_users(self, adds: Optional[List[Dict[str, Any]]] = None,
+                    updates: Optional[List[Dict[str, Any]]] = None,
+                    idempotency_key: Optional[str] = None) -> ApiResult:
+        """
+        POST /users/batch; data is {"adds": [...], "updates": [...]} with one result per item.
+        """
+        return self.request("POST", "/users/batch", auth=True, idempotency_key=idempotency_key,
+                            json={"adds": adds or [], "updates": updates or []})
+
+    def has_endpoint(self, method: str, path: str) -> bool:
+        """
+        True if the server's OpenAPI spec lists method + path (spec is fetched once).
+        """
+        if self._paths is None:
+            self._set_paths(self.request("GET", "/openapi.json"))
+        return self._has(method, path)
+
+    # ---- batch helpers ----
+    def get_users(self, user_ids: Iterable[str], concurrency: int = 8) -> List[ApiResult]:
+        with ThreadPoolExecutor(max_workers=concurrency) as ex:
+            return list(ex.map(self.get_user, user_ids))
+
+    def add_users(self, users: Iterable[Dict[str, Any]], concurrency: int = 8) -> List[ApiResult]:
+        with ThreadPoolExecutor(max_workers=concurrency) as ex:
+            return list(ex.map(self.add_user, users))
+
+    def update_users(self, updates: Iterable[Dict[str, Any]], concurrency: int = 8) -> List[ApiResult]:
+        """
+        updates: dicts with 'user_id' plus the fields to change.
+        """
+        def _one(u: Dict[str, Any]) -> ApiResult:
+            u = dict(u)
+            return self.update_user(u.pop("user_id"), **u)
+
+        with ThreadPoolExecutor(max_workers=concurrency) as ex:
+            return list(ex.map(_one, updates))
+
+    def close(self) -> None:
+        self._client.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# -------------------------
+# Async client
+# -------------------------
+class AsyncUserApiClient(_BaseUserApiClient):
+    """
+    asyncio client with the same end points and retry policy.
+    """
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(base_url, **kwargs)
+        self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout,
+                                         limits=self.limits)
+
+    async def request(self, method: str, path: str, *, auth: bool = False,
+                      idempotency_key: Optional[str] = None, **kwargs) -> ApiResult:
+        headers = self._headers(auth, method, idempotency_key)
+        t0 = time.perf_counter()
+        resp, error = None, None
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp, error = await self._client.request(method, path, headers=headers, **kwargs), None
+                if resp.status_code not in RETRY_STATUS:
+                    break
+            except httpx.TransportError as e:
+                resp, error = None, f"{type(e).__name__}: {e}"
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt, resp))
+        return self._result(resp, error, attempt + 1, t0)
+
+    # ---- end points ----
+    async def get_user(self, user_id: str) -> ApiResult:
+        return await self.request("GET", "/user", params={"user_id": user_id})
+
+    async def list_users(self, cursor: Optional[str] = None, limit: int = 50) -> ApiResult:
+        return await self.request("GET", "/users", params=self._page_params(cursor, limit))
+
+    async def update_user(self, user_id: str, idempotency_key: Optional[str] = None, **fields) -> ApiResult:
+        return await self.request("PATCH", "/user", auth=True, idempotency_key=idempotency_key,
+                                  json=self._patch_body(user_id, fields))
+
+    async def add_user(self, user: Dict[str, Any], idempotency_key: Optional[str] = None) -> ApiResult:
+        return await self.request("POST", "/add_user", auth=True, idempotency_key=idempotency_key,
+                                  json=user)
+
+    async def batch_users(self, adds: Optional[List[Dict[str, Any]]] = None,
+                          updates: Optional[List[Dict[str, Any]]] = None,
+                          idempotency_key: Optional[str] = None) -> ApiResult:
+        return await self.request("POST", "/users/batch", auth=True, idempotency_key=idempotency_key,
+                                  json={"adds": adds or [], "updates": updates or []})
+
+    async def has_endpoint(self, method: str, path: str) -> bool:
+        if self._paths is None:
+            self._set_paths(await self.request("GET", "/openapi.json"))
+        return self._has(method, path)
+
+    # ---- batch helpers ----
+    async def _bounded(self, coros, concurrency: int) -> List[ApiResult]:
+        sem = asyncio.Semaphore(concurrency)
+
+        async def _run(coro):
+            async with sem:
+                return await coro
+
+        return list(await asyncio.gather(*(_run(c) for c in coros)))
+
+    async def get_users(self, user_ids: Iterable[str], concurrency: int = 16) -> List[ApiResult]:
+        return await self._bounded([self.get_user(u) for u in user_ids], concurrency)
+
+    async def add_users(self, users: Iterable[Dict[str, Any]], concurrency: int = 16) -> List[ApiResult]:
+        return await self._bounded([self.add_user(u) for u in users], concurrency)
+
+    async def update_users(self, updates: Iterable[Dict[str, Any]], concurrency: int = 16) -> List[ApiResult]:
+        coros = []
+        for u in updates:
+            u = dict(u)
+            coros.append(self.update_user(u.pop("user_id"), **u))
+        return await self._bounded(coros, concurrency)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
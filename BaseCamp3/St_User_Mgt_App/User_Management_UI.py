@@ -1,6 +1,12 @@
 import streamlit as st
-import requests
+import pandas as pd
+import hashlib
 import json
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from User_Api_Client import UserApiClient
 
 st.set_option('client.showErrorDetails', False)
 
@@ -21,7 +27,7 @@ token_input = st.sidebar.text_input("Bearer token", type="password", help="Enter
 # ----------------------
 # Action selection
 # ----------------------
-action = st.selectbox("Select action", ["user GET", "user PATCH", "add_user POST"])
+action = st.selectbox("Select action", ["user GET", "user PATCH", "add_user POST", "Bulk CSV"])
 
 # ----------------------
 # Helpers
@@ -32,20 +38,99 @@ def pretty(obj):
     except Exception:
         return str(obj)
 
-def get_headers(require_auth: bool):
-    headers = {"Accept": "application/json"}
-    if require_auth and token_input:
-        headers["Authorization"] = f"Bearer {token_input}"
-    return headers
+# One pooled, retrying client per URL, kept across reruns; each session adds its own token
+@st.cache_resource(max_entries=8)
+def get_client(base_url: str) -> UserApiClient:
+    return UserApiClient(base_url, timeout=10)
 
-def show_response(resp):
-    st.write("Status:", resp.status_code)
-    try:
-        data = resp.json()
-        st.json(data)
-        # st.text_area("Raw response (JSON)", pretty(data), height=240)
-    except Exception:
-        st.text_area("Raw response (text)", str(resp), height=200)
+def show_response(res):
+    if res.error:
+        st.error(f"Request failed: {res.error}")
+        return
+    st.write("Status:", res.status_code)
+    st.caption(f"{res.elapsed_ms:.0f} ms, {res.attempts} attempt(s)")
+    if isinstance(res.data, (dict, list)):
+        st.json(res.data)
+        # st.text_area("Raw response (JSON)", pretty(res.data), height=240)
+    else:
+        st.text_area("Raw response (text)", str(res.data), height=200)
+
+client = get_client(BASE_URL).with_token(token_input or None)
+
+# ----------------------
+# Bulk helpers
+# ----------------------
+USER_FIELDS = ["name", "age", "city", "email", "phone_number"]
+BATCH_CHUNK = 100   # rows per POST /users/batch call
+
+def bulk_rows(df, op):
+    """
+    CSV rows -> request payloads; empty cells are not sent.
+    """
+    cols = USER_FIELDS + (["user_id"] if op == "update" else [])
+    return [{k: v for k, v in rec.items() if k in cols and v != ""}
+            for rec in df.to_dict("records")]
+
+def _row_result(i, op, res, item=None):
+    item = item or {}
+    data = res.data if isinstance(res.data, dict) else {}
+    detail = item.get("detail") or data.get("detail") or data.get("message") or res.error or ""
+    return {
+        "row": i + 1,
+        "op": op,
+        "user_id": item.get("user_id") or data.get("user_id") or data.get("user", {}).get("user_id", ""),
+        "ok": item.get("ok", res.ok),
+        "status_code": item.get("status_code", res.status_code),
+        "attempts": res.attempts,
+        "ms": round(res.elapsed_ms, 1),
+        "detail": detail if isinstance(detail, str) else json.dumps(detail),
+    }
+
+def run_bulk(op, rows, file_digest, concurrency, on_progress):
+    """
+    Send all rows with bounded concurrency over the pooled client.
+    Uses POST /users/batch in chunks when the server offers it, else one call per row.
+    Idempotency keys are derived from the file + row, so re-running the same
+    file after a partial failure does not duplicate writes.
+    Returns one result dict per row, in input order.
+    """
+    results = [None] * len(rows)
+    use_batch = client.has_endpoint("post", "/users/batch")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {}
+        if use_batch:
+            for start in range(0, len(rows), BATCH_CHUNK):
+                chunk = rows[start:start + BATCH_CHUNK]
+                kwargs = {"adds": chunk} if op == "add" else {"updates": chunk}
+                key = f"bulk-{file_digest}-{op}-{start}"
+                fut = pool.submit(client.batch_users, idempotency_key=key, **kwargs)
+                futures[fut] = range(start, start + len(chunk))
+        else:
+            for i, row in enumerate(rows):
+                key = f"bulk-{file_digest}-{op}-{i}"
+                if op == "add":
+                    fut = pool.submit(client.add_user, row, idempotency_key=key)
+                else:
+                    fields = {k: v for k, v in row.items() if k != "user_id"}
+                    fut = pool.submit(client.update_user, row.get("user_id", ""),
+                                      idempotency_key=key, **fields)
+                futures[fut] = range(i, i + 1)
+
+        done = 0
+        for fut in as_completed(futures):
+            res, idx = fut.result(), futures[fut]
+            if use_batch and res.ok:
+                items = res.data["adds" if op == "add" else "updates"]
+                for i, item in zip(idx, items):
+                    results[i] = _row_result(i, op, res, item)
+            else:
+                for i in idx:
+                    results[i] = _row_result(i, op, res)
+            done += len(idx)
+            on_progress(done, use_batch)
+
+    return results
 
 
 # ----------------------
@@ -55,13 +140,7 @@ if action == "user GET":
     st.subheader("GET /user")
     user_id = st.text_input("user_id", value="")
     if st.button("Fetch user"):
-        params = {"user_id": user_id}
-        try:
-            resp = requests.get(f"{BASE_URL}/user", params=params, headers=get_headers(False), timeout=10)
-            show_response(resp)
-        except requests.RequestException as e:
-            st.error(f"Request failed: {e}")
-            pass
+        show_response(client.get_user(user_id))
 
 elif action == "user PATCH":
     st.subheader("PATCH /user")
@@ -88,11 +167,43 @@ elif action == "user PATCH":
         payload = {k : v for k, v in payload.items () if v != ""}
         # print ("After cleaning : \n", payload)
         
-        try:
-            resp = requests.patch(f"{BASE_URL}/user", json=payload, headers=get_headers(require_auth=True), timeout=10)
-            show_response(resp)
-        except requests.RequestException as e:
-            st.error(f"Request failed: {e}")
+        payload.pop("user_id", None)
+        show_response(client.update_user(user_id, **payload))
+
+elif action == "Bulk CSV":
+    st.subheader("Bulk add / update from CSV")
+    st.write("Add: columns name, age, city, email, phone_number.  "
+             "Update: user_id plus any of those columns (empty cells are left unchanged).")
+    op_label = st.radio("Operation", ["add_user POST", "user PATCH"], horizontal=True)
+    op = "add" if op_label == "add_user POST" else "update"
+    upload = st.file_uploader("CSV file", type=["csv"])
+    concurrency = st.slider("Concurrent requests", 1, 32, 8)
+
+    if upload is not None:
+        raw = upload.getvalue()
+        rows_df = pd.read_csv(io.BytesIO(raw), dtype=str).fillna("")
+        st.caption(f"{len(rows_df)} rows")
+        st.dataframe(rows_df.head(20), width="stretch")
+
+        if st.button("Run bulk"):
+            rows = bulk_rows(rows_df, op)
+            bar = st.progress(0.0, text="Starting ...")
+            t0 = time.perf_counter()
+
+            def on_progress(done, batched):
+                rate = done / max(time.perf_counter() - t0, 1e-6)
+                mode = "batch endpoint" if batched else "per-row calls"
+                bar.progress(done / max(len(rows), 1),
+                             text=f"{done}/{len(rows)} rows · {rate:,.0f} rows/s · {mode}")
+
+            results = pd.DataFrame(run_bulk(op, rows, hashlib.sha256(raw).hexdigest()[:16],
+                                            concurrency, on_progress))
+            ok = int(results["ok"].sum()) if not results.empty else 0
+            st.write(f"Done in {time.perf_counter() - t0:.2f}s: {ok} ok, {len(results) - ok} failed "
+                     "(429 / 503 / connection errors were retried with backoff)")
+            st.dataframe(results, width="stretch", hide_index=True)
+            st.download_button("Download results CSV", results.to_csv(index=False).encode("utf-8"),
+                               file_name=f"bulk_{op}_results.csv", mime="text/csv")
 
 else:  # add_user POST
     st.subheader("POST /add_user")
@@ -111,11 +222,7 @@ else:  # add_user POST
             "phone_number": phone_number,
             "email": email,
         }
-        try:
-            resp = requests.post(f"{BASE_URL}/add_user", json=payload, headers=get_headers(require_auth=True), timeout=10)
-            show_response(resp)
-        except requests.RequestException as e:
-            st.error(f"Request failed: {e}")
+        show_response(client.add_user(payload))
 
 # ----------------------
 # Footer
@@ -0,0 +1,246 @@
+"""
+Rolling volatility for many windows at once
+
+rolling_vol_surface(returns, windows) gives the same numbers as
+
+    [returns.rolling(w).std() * sqrt(250) for w in windows]
+
+from a single NumPy pass over the data: prefix sums of the returns and of
+the squared returns give the sum and sum of squares of every window by
+subtracting two shifted slices, so each extra window costs a few vector
+operations, O(n), with no rolling state and no loop per row.
+
+Numerics: the returns are centred on their mean before the prefix sums
+(variance does not change under a shift, and the sums stay small, which
+limits the cancellation of E[x^2] - E[x]^2), the prefix sums carry a
+separate compensation term so a window sum is accurate to its own size
+rather than to the size of the whole prefix, tiny negative variances from
+rounding are clipped to 0 and constant windows give exactly 0, as in pandas.
+
+NaN handling follows pandas' default min_periods=window: a window that
+contains a NaN (e.g. the first pct_change value) gives NaN, as does any
+window shorter than 2.
+
+cached_vol_surface() memoises the surface on (hash of the data, windows,
+annualisation), so a Streamlit rerun with unchanged inputs costs a hash.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+TRADING_DAYS = 250
+CACHE_SIZE = 16
+
+
+def pct_returns(close: np.ndarray) -> np.ndarray:
+    """
+    Same as Series.pct_change(): NaN first, then close[i] / close[i-1] - 1.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    out = np.empty_like(close)
+    out[:1] = np.nan
+    np.divide(close[1:], close[:-1], out=out[1:])
+    out[1:] -= 1.0
+    return out
+
+
+def _prefix_sum(x: np.ndarray):
+    """
+    Prefix sums with a leading 0, as a (hi, lo) pair: hi is the plain
+    running sum, lo the accumulated rounding error of each step (recovered
+    exactly with two-sum). Window sums are taken as (hi[b] - hi[a]) +
+    (lo[b] - lo[a]) so the error does not scale with the whole prefix.
+    """
+    hi = np.empty(len(x) + 1)
+    hi[0] = 0.0
+    np.cumsum(x, out=hi[1:])
+    prev = hi[:-1]
+    b = hi[1:] - prev
+    err = (prev - (hi[1:] - b)) + (x - b)
+    lo = np.empty_like(hi)
+    lo[0] = 0.0
+    np.cumsum(err, out=lo[1:])
+    return hi, lo
+
+
+def rolling_vol_surface(returns: np.ndarray, windows: Sequence[int],
+                        annualize: float = TRADING_DAYS) -> np.ndarray:
+    """
+    Rolling sample standard deviation (ddof=1) of `returns` for every window,
+    times sqrt(annualize). Returns an array of shape (len(windows), len(returns)).
+    """
+    x = np.asarray(returns, dtype=np.float64)
+    n = len(x)
+    out = np.full((len(windows), n), np.nan)
+
+    # one pass over the data: prefix sums, NaN counts and runs of equal values
+    finite = np.isfinite(x)
+    centred = np.where(finite, x - (x[finite].mean() if finite.any() else 0.0), 0.0)
+    hi1, lo1 = _prefix_sum(centred)
+    hi2, lo2 = _prefix_sum(centred * centred)
+    bad = np.concatenate(([0], np.cumsum(~finite)))
+    # run_start[i]: first row of the run of equal values ending at i (pandas
+    # reports exactly 0 for a constant window, rounding would give ~1e-9)
+    run_start = np.zeros(n, dtype=np.int64)
+    if n > 1:
+        changed = np.flatnonzero(x[1:] != x[:-1]) + 1
+        run_start[changed] = changed
+        np.maximum.accumulate(run_start, out=run_start)
+
+    # then per window only slices of those arrays: row i uses prefix [i + 1 - w, i + 1)
+    for row, w in enumerate(int(w) for w in windows):
+        if w < 2 or w > n:
+            continue
+        total = (hi1[w:] - hi1[:-w]) + (lo1[w:] - lo1[:-w])
+        var = (hi2[w:] - hi2[:-w]) + (lo2[w:] - lo2[:-w])
+        var -= total * total / w
+        var *= annualize / (w - 1)
+        np.maximum(var, 0.0, out=var)
+        var[run_start[w - 1:] <= np.arange(n - w + 1)] = 0.0
+        var[bad[w:] != bad[:-w]] = np.nan
+        np.sqrt(var, out=out[row, w - 1:])
+    return out
+
+
+def data_hash(values: np.ndarray) -> str:
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    return hashlib.blake2b(values.view(np.uint8), digest_size=16).hexdigest()
+
+
+_CACHE: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def cached_vol_surface(returns: np.ndarray, windows: Sequence[int],
+                       annualize: float = TRADING_DAYS, key: Optional[str] = None) -> np.ndarray:
+    """
+    rolling_vol_surface() behind a small LRU cache keyed on (data hash,
+    windows, annualize). Pass `key` when the caller already knows a hash of
+    the data (e.g. computed once at load time) to skip hashing the returns.
+    The returned array is shared: treat it as read-only.
+    """
+    cache_key = (key or data_hash(returns), tuple(int(w) for w in windows), float(annualize))
+    with _CACHE_LOCK:
+        surface = _CACHE.get(cache_key)
+        if surface is not None:
+            _CACHE.move_to_end(cache_key)
+            return surface
+
+    surface = rolling_vol_surface(returns, cache_key[1], annualize)
+    surface.flags.writeable = False
+    with _CACHE_LOCK:
+        _CACHE[cache_key] = surface
+        while len(_CACHE) > CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    return surface
+
+
+class RollingVolState:
+    """
+    The last column of rolling_vol_surface(), kept up to date one return at
+    a time: per window a running sum, sum of squares and NaN count, plus a
+    ring buffer of the last max(windows) returns to know what leaves each
+    window. push() costs O(len(windows)), independent of the history length.
+
+    Running sums drift by rounding, so every `resync_every` pushes they are
+    recomputed exactly from the ring buffer (O(max(windows)), amortised away).
+    """
+
+    def __init__(self, windows: Sequence[int], annualize: float = TRADING_DAYS,
+                 shift: float = 0.0, resync_every: int = 1000):
+        self.windows = np.asarray(windows, dtype=np.int64)
+        self.annualize = annualize
+        self.shift = shift              # returns are centred on this, as in rolling_vol_surface
+        self.resync_every = resync_every
+        self.size = max(int(self.windows.max(initial=1)), 1)
+        self.buf = np.full(self.size, np.nan)   # centred returns, ring
+        self.pos = 0                    # next slot in buf
+        self.count = 0                  # returns pushed so far (whole history)
+        self.run = 0                    # length of the run of equal values ending at the last one
+        self.last = np.nan
+        self.s1 = np.zeros(len(self.windows))
+        self.s2 = np.zeros(len(self.windows))
+        self.bad = np.zeros(len(self.windows), dtype=np.int64)
+        self._since_resync = 0
+
+    @classmethod
+    def from_returns(cls, returns: np.ndarray, windows: Sequence[int],
+                     annualize: float = TRADING_DAYS, **kwargs) -> "RollingVolState":
+        """
+        State after the whole `returns` history, reading only its tail.
+        """
+        x = np.asarray(returns, dtype=np.float64)
+        finite = np.isfinite(x)
+        state = cls(windows, annualize, shift=x[finite].mean() if finite.any() else 0.0, **kwargs)
+        tail = x[-state.size:]
+        state.buf[:len(tail)] = tail - state.shift
+        state.pos = len(tail) % state.size
+        state.count = len(x)
+        if len(x):
+            state.last = x[-1]
+            same = np.flatnonzero(x[::-1] != x[-1])
+            state.run = int(same[0]) if len(same) else len(x)
+        state.resync()
+        return state
+
+    def _ordered(self) -> np.ndarray:
+        # ring buffer oldest -> newest (only the last min(count, size) are real)
+        return np.concatenate((self.buf[self.pos:], self.buf[:self.pos]))
+
+    def resync(self) -> None:
+        recent = self._ordered()[::-1]          # newest first
+        finite = np.isfinite(recent)
+        clean = np.where(finite, recent, 0.0)
+        c1 = np.concatenate(([0.0], np.cumsum(clean)))
+        c2 = np.concatenate(([0.0], np.cumsum(clean * clean)))
+        cb = np.concatenate(([0], np.cumsum(~finite)))
+        w = np.minimum(self.windows, min(self.count, self.size))
+        self.s1, self.s2, self.bad = c1[w], c2[w], cb[w]
+        self._since_resync = 0
+
+    def push(self, r: float) -> np.ndarray:
+        """
+        Add the next return; returns the annualised volatility for every
+        window at this row (NaN where rolling_vol_surface gives NaN).
+        """
+        w = self.windows
+        x = r - self.shift
+        finite = np.isfinite(x)
+
+        # the value that falls out of each window that was already full
+        full = self.count >= w
+        leaving = self.buf[(self.pos - w) % self.size]
+        leaving_ok = full & np.isfinite(leaving)
+        self.s1 -= np.where(leaving_ok, leaving, 0.0)
+        self.s2 -= np.where(leaving_ok, leaving * leaving, 0.0)
+        self.bad -= full & ~np.isfinite(leaving)
+
+        if finite:
+            self.s1 += x
+            self.s2 += x * x
+        else:
+            self.bad += 1
+        self.buf[self.pos] = x
+        self.pos = (self.pos + 1) % self.size
+        self.count += 1
+        self.run = self.run + 1 if r == self.last else 1
+        self.last = r
+
+        self._since_resync += 1
+        if self._since_resync >= self.resync_every:
+            self.resync()
+        return self.values()
+
+    def values(self) -> np.ndarray:
+        w = self.windows
+        wf = w.astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = (self.s2 - self.s1 * self.s1 / wf) * (self.annualize / (wf - 1))
+        np.maximum(var, 0.0, out=var)
+        var[self.run >= w] = 0.0
+        var[(self.count < w) | (self.bad > 0) | (w < 2)] = np.nan
+        return np.sqrt(var)